@@ -1,27 +1,58 @@
 import asyncio
-import json
 from aio_pika import connect_robust, IncomingMessage, ExchangeType
+from pydantic import ValidationError
 from app.core.config import settings
 from app.consumer.event_handler import handle_journey_event
+from app.consumer.dispatcher import dispatcher, partition_key
+from app.services.dedup import deduplicator, event_key
+from app.core.metrics import EVENTS, MESSAGES_IN_FLIGHT
+from app.models.events import EVENT_MODELS, JourneyBookedEvent, JourneyCanceledEvent, UnknownEventType, decode_event
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+async def process_message(message: IncomingMessage, event: JourneyBookedEvent | JourneyCanceledEvent):
+    try:
+        async with message.process():
+            try:
+                processed = None
+                if settings.DEDUP_ENABLED:
+                    if await deduplicator.seen(event):
+                        EVENTS.labels(event.event_type, "duplicate").inc()
+                        logger.info(
+                            f"[consumer] Skipping duplicate {event.event_type} for journey {event.journey_id}")
+                        return
+                    processed = event_key(event)
+                await handle_journey_event(event, processed)
+            except Exception as e:
+                logger.error(f"[consumer] Error handling message: {e}")
+    finally:
+        MESSAGES_IN_FLIGHT.dec()
+
+
 async def on_message(message: IncomingMessage):
-    async with message.process():
-        try:
-            payload = json.loads(message.body.decode())
-            logger.info(f"[consumer] Received message: {payload}")
-            await handle_journey_event(payload)
-        except Exception as e:
-            logger.error(f"[consumer] Error handling message: {e}")
+    try:
+        event = decode_event(message.body, message.routing_key)
+    except (ValidationError, UnknownEventType) as e:
+        event_type = message.routing_key if message.routing_key in EVENT_MODELS else "unknown"
+        EVENTS.labels(event_type, "malformed").inc()
+        logger.error(
+            f"[consumer] Rejecting malformed message with key {message.routing_key}: {e}")
+        await message.reject()
+        return
+    MESSAGES_IN_FLIGHT.inc()
+    logger.info(
+        f"[consumer] Received {event.event_type} for journey {event.journey_id}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[consumer] Message body: {message.body!r}")
+    await dispatcher.submit(partition_key(event), lambda: process_message(message, event))
 
 
 async def start_consumer():
     connection = await connect_robust(settings.RABBITMQ_URL)
     channel = await connection.channel()
-    await channel.set_qos(prefetch_count=10)
+    await channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH)
 
     exchange = await channel.declare_exchange(
         settings.EXCHANGE_NAME,
@@ -36,5 +67,24 @@ async def start_consumer():
     await queue.bind(exchange, routing_key=settings.ROUTING_KEY)
     await queue.bind(exchange, routing_key=settings.ROUTING_KEY2)
 
+    dispatcher.start()
     logger.info(f"[consumer] Listening on queue: {settings.QUEUE_NAME}")
-    await queue.consume(on_message)
+    consumer_tag = await queue.consume(on_message)
+    _consuming.update(connection=connection, queue=queue, tag=consumer_tag)
+
+
+_consuming: dict = {}
+
+
+async def stop_consumer():
+    """
+    Stops new deliveries, lets the lanes finish what was already received
+    and closes the connection; unacked prefetched messages are requeued.
+    """
+    if not _consuming:
+        return
+    await _consuming["queue"].cancel(_consuming["tag"])
+    await dispatcher.stop()
+    await _consuming["connection"].close()
+    _consuming.clear()
+    logger.info(f"[consumer] Stopped consuming {settings.QUEUE_NAME}")
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import zlib
+from typing import Awaitable, Callable
+from app.core.config import settings
+from app.models.events import JourneyBookedEvent, JourneyCanceledEvent
+from app.services.slot_service import slot_bucket
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+def _origin_key(event: JourneyBookedEvent) -> str:
+    """
+    The whole-degree cell of the origin: computed from the event alone, so
+    picking a lane never geocodes on the event loop.
+    """
+    return f"{round(event.origin_lat)},{round(event.origin_lon)}"
+
+
+def partition_key(event: JourneyBookedEvent | JourneyCanceledEvent) -> str:
+    """
+    Key of the rows an event is likely to contend on. Bookings are keyed on
+    origin (see _origin_key) and slot bucket of the scheduled time, the
+    slot rows they reserve; cancellations on their journey id. With group
+    commit, bookings are keyed on their journey id too: keeping bookings of
+    the same rows on one lane would stop them from ever reaching
+    group_committer together, which locks those rows once per group.
+    """
+    if isinstance(event, JourneyBookedEvent) and not settings.GROUP_COMMIT_ENABLED:
+        try:
+            return f"{_origin_key(event)}|{slot_bucket(event.scheduled_time).isoformat()}"
+        except Exception as e:
+            logger.warning(
+                f"[dispatcher] Could not key booking {event.journey_id} by origin, keying by journey: {e}")
+    return f"{event.event_type}|{event.journey_id}"
+
+
+class LaneDispatcher:
+    """
+    Runs jobs on a fixed number of worker lanes. Jobs with the same key always
+    land on the same lane and run one after another, while different lanes run
+    concurrently. Each lane has a bounded queue, so submit() applies
+    backpressure when a lane falls behind.
+    """
+
+    def __init__(self, lanes: int, queue_size: int):
+        self.queues: list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(lanes)]
+        self.workers: list[asyncio.Task] = []
+
+    def lane_for(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % len(self.queues)
+
+    def start(self) -> None:
+        if self.workers:
+            return
+        self.workers = [
+            asyncio.create_task(self._run_lane(i), name=f"consumer-lane-{i}")
+            for i in range(len(self.queues))
+        ]
+        logger.info(f"[dispatcher] Started {len(self.workers)} lanes")
+
+    async def submit(self, key: str, job: Job) -> None:
+        await self.queues[self.lane_for(key)].put(job)
+
+    def depth(self) -> list[int]:
+        return [queue.qsize() for queue in self.queues]
+
+    async def _run_lane(self, lane: int) -> None:
+        queue = self.queues[lane]
+        while True:
+            job = await queue.get()
+            try:
+                await job()
+            except Exception as e:
+                logger.exception(f"[dispatcher] Lane {lane} job failed: {e}")
+            finally:
+                queue.task_done()
+
+    async def stop(self) -> None:
+        for queue in self.queues:
+            await queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+
+dispatcher = LaneDispatcher(
+    settings.CONSUMER_LANES, settings.CONSUMER_LANE_QUEUE_SIZE)
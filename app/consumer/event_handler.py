@@ -1,15 +1,22 @@
-import json
+import asyncio
+import functools
 import logging
 from datetime import datetime, timezone
 from app.domain.route_generator import generate_route, generate_city_route
-from app.domain.country_mapper import coordinates_to_country_info
+from app.domain.route_engine import get_route_engine
+from app.domain.geocode_batcher import geocode_batcher
+from app.core.config import settings
 from app.messaging.publisher import publisher
+from app.messaging.outbox_relay import outbox_relay
 from app.models.db_models import RegionType
 from app.models.db_models import Route, Slot
-from fastapi.concurrency import run_in_threadpool
-from app.services.slot_service import replicate_geo
-from app.services.saga_orchestrator import saga_reservation, saga_release_slots
-from app.db.database import SessionLocal
+from app.services.slot_service import slot_bucket, slot_stripes, get_remaining_capacity, get_remaining_capacity_async
+from app.services.group_commit import group_committer
+from app.services.saga_orchestrator import saga_reservation, saga_release_slots, saga_reservation_async, saga_release_slots_async, reject_journey, reject_journey_async, saga_cancel_route, saga_cancel_route_async
+from app.services.slot_capacity_cache import slot_capacity_cache
+from app.services.dedup import DuplicateEvent
+from app.core.metrics import EVENTS, stage_timer
+from app.db.database import SessionLocal, AsyncSessionLocal
 from sqlalchemy.future import select
 from app.models.events import const_events, JourneyApprovedEvent, JourneyRejectedEvent, JourneyBookedEvent, JourneyCanceledEvent
 
@@ -17,94 +24,170 @@ from app.models.events import const_events, JourneyApprovedEvent, JourneyRejecte
 logger = logging.getLogger(__name__)
 
 
-async def handle_journey_event(event: dict):
-    try:
-        if event['event_type'] == const_events['journey.booked']:
-            await handle_booking_event(event)
-        elif event['event_type'] == const_events['journey.canceled']:
-            await handle_canceling_event(event)
-    except Exception as e:
-        logger.exception(f"Error handling journey event: {e}")
+def _load_remaining_capacity(region_type: RegionType, slot_time: datetime, regions: list[str] | None) -> dict[str, int]:
+    with SessionLocal() as db:
+        return get_remaining_capacity(db, region_type, slot_time, regions)
 
 
-async def handle_canceling_event(event: dict):
-    event_instance: JourneyCanceledEvent = JourneyCanceledEvent.model_validate(
-        event)
+async def load_remaining_capacity(region_type: RegionType, slot_time: datetime, regions: list[str] | None = None) -> dict[str, int]:
+    if settings.DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            return await get_remaining_capacity_async(db, region_type, slot_time, regions)
+    return await asyncio.to_thread(_load_remaining_capacity, region_type, slot_time, regions)
 
-    db = SessionLocal()
-    try:
-        result = await run_in_threadpool(
-            db.execute, select(Route).where(
-                Route.journey_id == event_instance.journey_id)
-        )
-        route_entry = result.scalar_one_or_none()
-        if not route_entry:
-            logger.error(
-                f"No route found for journey {event_instance.journey_id}")
-            return
-
-        route = route_entry.route
-
-        sample_region = route[0]
-        result_slot = await run_in_threadpool(
-            db.execute, select(Slot).where(
-                Slot.region_identifier == sample_region,
-                Slot.slot_time == event_instance.scheduled_time
-            )
-        )
-        sample_slot = result_slot.scalar_one_or_none()
-        if sample_slot:
-            region_type = sample_slot.region_type
-        else:
-            region_type = RegionType.country
 
-        saga_steps = []
-        for region in route:
-            step = {"region": region}
+def _graph_routes(region_type: RegionType, origin: str, destination: str, country_code: str | None, capacity: dict[str, int]) -> list[list[str]]:
+    engine = get_route_engine()
+    if region_type == RegionType.city:
+        return engine.city_routes(
+            country_code, origin, destination, settings.ROUTE_ALTERNATIVES, capacity)
+    return engine.country_routes(
+        origin, destination, settings.ROUTE_ALTERNATIVES, capacity)
+
+
+async def plan_routes(region_type: RegionType, origin: str, destination: str, slot_time: datetime, country_code: str | None = None) -> list[list[str]]:
+    """
+    Candidate routes, best first. The graph engine returns up to
+    ROUTE_ALTERNATIVES capacity-aware routes; the legacy generators one.
+    City routes stay within country_code, the geocoded country of both ends.
+    """
+    if settings.ROUTE_ENGINE == "graph":
+        with stage_timer("capacity_lookup"):
+            # Country routes may use any country; city routes only the
+            # country's graph nodes, so only their slots are read.
+            regions = None
             if region_type == RegionType.city:
-                step["continent"] = sample_slot.continent if sample_slot else "Unknown"
-            saga_steps.append(step)
+                regions = await asyncio.to_thread(
+                    get_route_engine().city_candidates, country_code, origin, destination)
+            capacity = await load_remaining_capacity(region_type, slot_time, regions)
+        with stage_timer("route_generation"):
+            routes = await asyncio.to_thread(
+                _graph_routes, region_type, origin, destination, country_code, capacity)
+        if routes:
+            return routes
+        logger.warning(
+            f"No graph route from {origin} to {destination}, falling back to random stops.")
+    with stage_timer("route_generation"):
+        if region_type == RegionType.city:
+            return [generate_city_route(origin, destination, country_code=country_code)]
+        return [generate_route(origin, destination)]
 
-        released = await run_in_threadpool(
-            saga_release_slots, db,
-            event_instance.journey_id, saga_steps, region_type, event_instance.scheduled_time
-        )
-        if released:
-            logger.info(
-                f"Slots successfully released for canceled journey {event_instance.journey_id}")
-            cancelled_event = JourneyCanceledEvent(
-                journey_id=event_instance.journey_id,
-                user_id=event_instance.user_id,
-                scheduled_time=event_instance.scheduled_time,
-                timestamp=datetime.now(timezone.utc)
-            )
-            # await publisher.publish_event(
-            #     cancelled_event.model_dump(), routing_key="journey.canceled.v1"
-            # )
+
+def _release_steps(route: list[str], sample_slot: Slot | None) -> tuple[RegionType, list[dict]]:
+    if sample_slot:
+        region_type = sample_slot.region_type
+    else:
+        region_type = RegionType.country
+
+    saga_steps = []
+    for region in route:
+        step = {"region": region}
+        if region_type == RegionType.city:
+            step["continent"] = sample_slot.continent if sample_slot else "Unknown"
+        saga_steps.append(step)
+    return region_type, saga_steps
+
+
+def _release_journey(db, event_instance: JourneyCanceledEvent, processed: tuple | None = None) -> bool | None:
+    released = saga_cancel_route(db, event_instance.journey_id, processed)
+    if released is not None:
+        return released
+    route_entry = db.execute(select(Route).where(
+        Route.journey_id == event_instance.journey_id)).scalar_one_or_none()
+    if not route_entry:
+        return None
+    route = route_entry.route
+    sample_slot = db.execute(select(Slot).where(
+        Slot.region_identifier == route[0],
+        Slot.slot_time == event_instance.scheduled_time
+    )).scalar_one_or_none()
+    region_type, saga_steps = _release_steps(route, sample_slot)
+    # End the transaction the lookups began, so saga_release_slots runs in
+    # its own and its conflicts are retried rather than left to a savepoint.
+    db.rollback()
+    return saga_release_slots(
+        db, event_instance.journey_id, saga_steps, region_type, event_instance.scheduled_time, processed)
+
+
+async def _release_journey_async(db, event_instance: JourneyCanceledEvent, processed: tuple | None = None) -> bool | None:
+    released = await saga_cancel_route_async(db, event_instance.journey_id, processed)
+    if released is not None:
+        return released
+    route_entry = (await db.execute(select(Route).where(
+        Route.journey_id == event_instance.journey_id))).scalar_one_or_none()
+    if not route_entry:
+        return None
+    route = route_entry.route
+    sample_slot = (await db.execute(select(Slot).where(
+        Slot.region_identifier == route[0],
+        Slot.slot_time == event_instance.scheduled_time
+    ))).scalar_one_or_none()
+    region_type, saga_steps = _release_steps(route, sample_slot)
+    await db.rollback()
+    return await saga_release_slots_async(
+        db, event_instance.journey_id, saga_steps, region_type, event_instance.scheduled_time, processed)
+
+
+async def handle_canceling_event(event_instance: JourneyCanceledEvent, processed: tuple | None = None):
+
+    with stage_timer("release"):
+        if settings.DB_ASYNC:
+            async with AsyncSessionLocal() as db:
+                released = await _release_journey_async(db, event_instance, processed)
         else:
-            logger.error(
-                f"Failed to release slots for canceled journey {event_instance.journey_id}")
+            db = SessionLocal()
+            try:
+                released = await asyncio.to_thread(_release_journey, db, event_instance, processed)
+            finally:
+                await asyncio.to_thread(db.close)
+
+    outcome = "not_found" if released is None else "released" if released else "failed"
+    EVENTS.labels(event_instance.event_type, outcome).inc()
+    if released is None:
+        logger.error(
+            f"No route found for journey {event_instance.journey_id}")
+    elif released:
+        logger.info(
+            f"Slots successfully released for canceled journey {event_instance.journey_id}")
+        cancelled_event = JourneyCanceledEvent(
+            journey_id=event_instance.journey_id,
+            user_id=event_instance.user_id,
+            scheduled_time=event_instance.scheduled_time,
+            timestamp=datetime.now(timezone.utc)
+        )
+        # await publisher.publish_event(
+        #     cancelled_event.model_dump(), routing_key="journey.canceled.v1"
+        # )
+    else:
+        logger.error(
+            f"Failed to release slots for canceled journey {event_instance.journey_id}")
 
-    finally:
-        await run_in_threadpool(db.close)
 
+def _outbox_entry(routing_key: str, event) -> tuple[str, dict] | None:
+    if not settings.OUTBOX_ENABLED:
+        return None
+    return routing_key, event.model_dump(mode="json")
 
-async def handle_booking_event(event: dict):
-    event_instance: JourneyBookedEvent = JourneyBookedEvent.model_validate(
-        event)
+
+async def handle_booking_event(event_instance: JourneyBookedEvent, processed: tuple | None = None):
 
     if None in (event_instance.origin_lat, event_instance.origin_lon, event_instance.destination_lat, event_instance.destination_lon):
-        logger.error(f"Missing coordinate(s) in journey event: {event}")
+        logger.error(f"Missing coordinate(s) in journey event: {event_instance}")
+        EVENTS.labels(event_instance.event_type, "invalid").inc()
         return
 
-    origin_info = coordinates_to_country_info(
-        event_instance.origin_lat, event_instance.origin_lon)
-    destination_info = coordinates_to_country_info(
-        event_instance.destination_lat, event_instance.destination_lon)
+    slot_time = slot_bucket(event_instance.scheduled_time)
+    with stage_timer("geocode"):
+        origin_info, destination_info = await asyncio.gather(
+            geocode_batcher.locate(event_instance.origin_lat, event_instance.origin_lon),
+            geocode_batcher.locate(event_instance.destination_lat,
+                         event_instance.destination_lon)
+        )
 
     if origin_info is None or destination_info is None:
         logger.error(
-            f"Could not determine location info for journey event: {event}")
+            f"Could not determine location info for journey event: {event_instance}")
+        EVENTS.labels(event_instance.event_type, "invalid").inc()
         return
 
     origin_country = origin_info[1]
@@ -114,54 +197,140 @@ async def handle_booking_event(event: dict):
     origin_continent = origin_info[2]
     destination_continent = destination_info[2]
 
-    db = SessionLocal()
-
     if origin_country == destination_country:
         logger.info(
             f"Both locations in {origin_country} – using city-to-city routing.")
-        route = generate_city_route(origin_city, destination_city)
         region_type = RegionType.city
+        routes = await plan_routes(region_type, origin_city, destination_city, slot_time, origin_country)
     else:
         logger.info(
             f"Different countries ({origin_country} vs {destination_country}) – using country-to-country routing.")
-        route = generate_route(origin_country, destination_country)
         region_type = RegionType.country
+        routes = await plan_routes(region_type, origin_country, destination_country, slot_time)
+
+    replicate_continents = None
+    if region_type == RegionType.country:
         continents_in_route = {origin_continent, destination_continent}
         if len(continents_in_route) > 1:
-            await run_in_threadpool(replicate_geo, db, route, list(continents_in_route))
+            replicate_continents = list(continents_in_route)
 
-    logger.info(
-        f"Route approved for journey {event_instance.journey_id}: {route}")
+    current_time = datetime.now(timezone.utc)
+    rejected_event = JourneyRejectedEvent(
+        journey_id=event_instance.journey_id,
+        user_id=event_instance.user_id,
+        timestamp=current_time,
+        scheduled_time=event_instance.scheduled_time
+    )
 
-    saga_steps = []
-    for region in route:
-        step = {"region": region}
-        if region_type == RegionType.city:
-            step["continent"] = origin_continent
-        saga_steps.append(step)
+    if settings.DB_ASYNC:
+        db = AsyncSessionLocal()
+    else:
+        db = SessionLocal()
 
-    confirmed = await run_in_threadpool(saga_reservation, db, event_instance.journey_id, saga_steps, region_type, route, event_instance.scheduled_time)
-    current_time = datetime.now(timezone.utc)
+    confirmed = False
+    attempted = False
+    try:
+        for attempt, route in enumerate(routes):
+            full_regions = slot_capacity_cache.full_regions(
+                route, slot_time)
+            if full_regions:
+                logger.warning(
+                    f"Skipping route {attempt} for journey {event_instance.journey_id}: no capacity in {full_regions}.")
+                continue
+            if attempted:
+                logger.warning(
+                    f"Retrying journey {event_instance.journey_id} on alternative route {attempt}.")
+            attempted = True
+            logger.info(
+                f"Route approved for journey {event_instance.journey_id}: {route}")
+
+            saga_steps = []
+            for region in route:
+                step = {"region": region}
+                if region_type == RegionType.city:
+                    step["continent"] = origin_continent
+                saga_steps.append(step)
+
+            approved_event = JourneyApprovedEvent(
+                journey_id=event_instance.journey_id,
+                user_id=event_instance.user_id,
+                route=route,
+                timestamp=current_time,
+                scheduled_time=event_instance.scheduled_time
+            )
+            args = (db, event_instance.journey_id, saga_steps, region_type,
+                    route, slot_time,
+                    _outbox_entry("journey.approved.v1", approved_event),
+                    replicate_continents, processed)
+            with stage_timer("saga_reservation"):
+                if settings.GROUP_COMMIT_ENABLED and slot_stripes(region_type) == 1:
+                    confirmed = await group_committer.reserve(*args[1:])
+                elif settings.DB_ASYNC:
+                    confirmed = await saga_reservation_async(*args)
+                else:
+                    confirmed = await asyncio.to_thread(saga_reservation, *args)
+            if confirmed:
+                break
+        if not confirmed and (settings.OUTBOX_ENABLED or not attempted or processed is not None):
+            outbox_entry = _outbox_entry("journey.rejected.v1", rejected_event)
+            with stage_timer("reject"):
+                if settings.DB_ASYNC:
+                    await reject_journey_async(db, event_instance.journey_id, outbox_entry, processed)
+                else:
+                    await asyncio.to_thread(reject_journey, db, event_instance.journey_id, outbox_entry, processed)
+    finally:
+        if settings.DB_ASYNC:
+            await db.close()
+        else:
+            await asyncio.to_thread(db.close)
 
+    EVENTS.labels(event_instance.event_type,
+                  "approved" if confirmed else "rejected").inc()
     if confirmed:
         logger.info(
             f"Journey {event_instance.journey_id} confirmed and slots reserved.")
-        approved_event = JourneyApprovedEvent(
-            journey_id=event_instance.journey_id,
-            user_id=event_instance.user_id,
-            route=route,
-            timestamp=current_time,
-            scheduled_time=event_instance.scheduled_time
-        )
-        await publisher.publish_event(approved_event.model_dump(), routing_key="journey.approved.v1")
     else:
         logger.error(
             f"Journey {event_instance.journey_id} reservation failed. Marked as rejected.")
-        rejected_event = JourneyRejectedEvent(
-            journey_id=event_instance.journey_id,
-            user_id=event_instance.user_id,
-            timestamp=current_time,
-            scheduled_time=event_instance.scheduled_time
-        )
-        await publisher.publish_event(rejected_event.model_dump(), routing_key="journey.rejected.v1")
-    await run_in_threadpool(db.close)
+
+    if settings.OUTBOX_ENABLED:
+        outbox_relay.notify()
+    else:
+        routing_key, event = (const_events['journey.approved'], approved_event) if confirmed else (
+            const_events['journey.rejected'], rejected_event)
+        confirmation = await publisher.publish_event(event.model_dump(), routing_key=routing_key)
+        confirmation.add_done_callback(functools.partial(
+            _count_publish_failure, routing_key, event.journey_id))
+
+
+def _count_publish_failure(routing_key: str, journey_id, confirmation: asyncio.Future) -> None:
+    if confirmation.cancelled() or confirmation.exception() is None:
+        return
+    EVENTS.labels(routing_key, "publish_failed").inc()
+    logger.error(
+        f"Could not publish {routing_key} for journey {journey_id}: {confirmation.exception()}")
+
+
+EVENT_HANDLERS = {
+    const_events['journey.booked']: handle_booking_event,
+    const_events['journey.canceled']: handle_canceling_event,
+}
+
+
+async def handle_journey_event(event: JourneyBookedEvent | JourneyCanceledEvent, processed: tuple | None = None):
+    """
+    processed is the event's dedup key (app/services/dedup.py), recorded in
+    the transaction that commits the event's outcome.
+    """
+    handler = EVENT_HANDLERS.get(event.event_type)
+    if handler is None:
+        logger.warning(f"No handler for event type {event.event_type}")
+        return
+    try:
+        await handler(event, processed)
+    except DuplicateEvent:
+        EVENTS.labels(event.event_type, "duplicate").inc()
+        logger.info(
+            f"Skipping {event.event_type} for journey {event.journey_id}, already processed by another delivery")
+    except Exception as e:
+        logger.exception(f"Error handling journey event: {e}")
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs, urlsplit
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+Response = tuple[int, str, bytes]
+Handler = Callable[[dict[str, list[str]]], Awaitable[Response]]
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpServer:
+    """
+    Minimal HTTP/1.1 server for GET endpoints, running on the consumer's
+    event loop. Handlers receive the parsed query string and return
+    (status, content type, body); each connection serves one request.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, Handler] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    def route(self, path: str):
+        def register(handler: Handler) -> Handler:
+            self.routes[path] = handler
+            return handler
+        return register
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"[http] Listening on {host}:{port}")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            while (await asyncio.wait_for(reader.readline(), 10)) not in (b"\r\n", b"\n", b""):
+                pass
+            status, content_type, body = await self._dispatch(request_line)
+        except Exception as e:
+            logger.error(f"[http] Error handling request: {e}")
+            status, content_type, body = 500, "text/plain", b"internal error\n"
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n")
+        try:
+            writer.write(head.encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request_line: bytes) -> Response:
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return 400, "text/plain", b"bad request\n"
+        method, target, _ = parts
+        if method != "GET":
+            return 405, "text/plain", b"method not allowed\n"
+        url = urlsplit(target)
+        handler = self.routes.get(url.path)
+        if handler is None:
+            return 404, "text/plain", b"not found\n"
+        return await handler(parse_qs(url.query))
+
+
+http_server = HttpServer()
+
+
+@http_server.route("/metrics")
+async def metrics(query: dict[str, list[str]]) -> Response:
+    return 200, "text/plain; version=0.0.4; charset=utf-8", registry.render().encode()
+
+
+@http_server.route("/health")
+async def health(query: dict[str, list[str]]) -> Response:
+    return 200, "text/plain", b"ok\n"
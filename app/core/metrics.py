@@ -0,0 +1,268 @@
+import bisect
+import threading
+import time
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Timer:
+    def __init__(self, histogram: "_HistogramChild"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metric:
+    """
+    A named metric family. Metrics without label names are used directly;
+    labelled ones hand out one child per label combination via labels().
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self):
+        if not self.labelnames:
+            yield (), self._default
+        else:
+            yield from list(self._children.items())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._samples():
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Reads the value from `function` at scrape time instead.
+        """
+        self.function = function
+
+    def render(self, name, labelnames, key):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return []
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(value)}"]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default.set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(
+                labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, key)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS: Histogram = registry.register(Histogram(
+    "traffic_stage_seconds", "Time spent per event handling stage.", ("stage",)))
+EVENTS: Counter = registry.register(Counter(
+    "traffic_events_total", "Journey events handled, by type and outcome.", ("event_type", "outcome")))
+RETRIES: Counter = registry.register(Counter(
+    "traffic_retries_total", "Retries of operations (tenacity and transaction retries).", ("operation",)))
+TXN_RETRIES: Histogram = registry.register(Histogram(
+    "traffic_transaction_retries", "Retries each database transaction needed before it committed or gave up.",
+    ("operation",), buckets=(0, 1, 2, 3, 5, 8)))
+MESSAGES_IN_FLIGHT: Gauge = registry.register(Gauge(
+    "traffic_messages_in_flight", "Messages received and not yet acked."))
+DB_POOL: Gauge = registry.register(Gauge(
+    "traffic_db_pool_connections", "Database pool connections by engine and state.", ("engine", "state")))
+
+GEOCODE_BATCH_SIZE: Histogram = registry.register(Histogram(
+    "traffic_geocode_batch_size", "Distinct lookups resolved per geocoding batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)))
+
+GROUP_COMMIT_SIZE: Histogram = registry.register(Histogram(
+    "traffic_group_commit_size", "Reservations committed per group-commit transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)))
+
+
+def stage_timer(stage: str) -> _Timer:
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def count_retry(operation: str):
+    """
+    A tenacity before_sleep callback counting retries of `operation`.
+    """
+    child = RETRIES.labels(operation)
+
+    def before_sleep(retry_state) -> None:
+        child.inc()
+    return before_sleep
+
+
+def track_pool(name: str, pool) -> None:
+    DB_POOL.labels(name, "checked_out").set_function(pool.checkedout)
+    DB_POOL.labels(name, "idle").set_function(pool.checkedin)
+    DB_POOL.labels(name, "overflow").set_function(pool.overflow)
+    DB_POOL.labels(name, "size").set_function(pool.size)
@@ -0,0 +1,98 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase takes, from `started` (taken before
+    the heavy imports) until the consumer is ready.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.last = started
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self) -> None:
+        phases = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        logger.info(
+            f"[startup] Ready in {(self.last - self.started) * 1000:.0f}ms ({phases})")
+
+
+def warm_geodata() -> None:
+    """
+    Builds the offline geocoder, city index and country graph so the first
+    event does not pay for them.
+    """
+    from app.domain.reverse_geocoder import get_reverse_geocoder
+    from app.domain.route_engine import get_route_engine
+    get_reverse_geocoder()
+    get_route_engine()
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """
+    (module, self us, cumulative us) for every module imported by a fresh
+    interpreter importing `module`, from python -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ.copy())
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    if not rows:
+        raise RuntimeError(result.stderr.strip() or f"Could not import {module}")
+    return rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Report where service start-up time goes.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rows = import_times(args.module)
+    total = next((cumulative for name, _, cumulative in rows if name == args.module), 0)
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    print(f"Importing {args.module}: {total / 1000:.0f}ms, {len(rows)} modules\n")
+    print("Self time by top-level package:")
+    for package, self_us in sorted(by_package.items(), key=lambda i: -i[1])[:args.top]:
+        print(f"  {package:<32}{self_us / 1000:>9.1f}ms")
+    print("\nSlowest app modules (cumulative):")
+    app_rows = [row for row in rows if row[0].startswith("app.")]
+    for name, _, cumulative_us in sorted(app_rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {name:<40}{cumulative_us / 1000:>9.1f}ms")
+
+    from app.domain.geodata import get_snapshot
+    started = time.perf_counter()
+    snapshot = get_snapshot()
+    loaded = time.perf_counter()
+    warm_geodata()
+    warmed = time.perf_counter()
+    source = snapshot.path if snapshot else "geonamescache (no GEODATA_SNAPSHOT)"
+    print(f"\nGeodata from {source}: load {(loaded - started) * 1000:.0f}ms, "
+          f"index build {(warmed - loaded) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
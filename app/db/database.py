@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import track_pool
 
 DATABASE_URL = settings.DATABASE_URL
 
@@ -8,6 +10,25 @@ engine = create_engine(
     DATABASE_URL,
     echo=settings.DEBUG,
     connect_args={"sslmode": "disable"},
-    isolation_level="SERIALIZABLE"
+    isolation_level="SERIALIZABLE",
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
 )
 SessionLocal = sessionmaker(bind=engine)
+
+# cockroachdb+psycopg resolves to the psycopg async dialect here.
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    echo=settings.DEBUG,
+    connect_args={"sslmode": "disable"},
+    isolation_level="SERIALIZABLE",
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, expire_on_commit=False)
+
+track_pool("sync", engine.pool)
+track_pool("async", async_engine.pool)
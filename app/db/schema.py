@@ -0,0 +1,49 @@
+from sqlalchemy import inspect
+from app.core.config import settings
+from app.db.database import engine
+
+MIGRATION = "migrations/001_slot_metadata_outbox_dedup.sql"
+
+
+def _required() -> dict[str, set[str]]:
+    """
+    Tables and columns added by migrations the enabled features depend on.
+    """
+    required = {
+        "routes": {"region_type", "slot_time", "continents"},
+        "slots": {"replicated_continents", "stripes"},
+        "slot_stripes": {"region_identifier", "slot_time", "stripe", "slots", "reserved"},
+    }
+    if settings.OUTBOX_ENABLED:
+        required["outbox_events"] = {"id", "routing_key", "payload", "created_at", "claimed_until"}
+    if settings.DEDUP_ENABLED:
+        required["processed_events"] = {"id", "journey_id", "event_type", "event_timestamp", "processed_at"}
+    return required
+
+
+def missing_schema() -> list[str]:
+    """
+    Required tables and table.columns the database does not have.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table, columns in _required().items():
+        if table not in tables:
+            missing.append(table)
+            continue
+        present = {column["name"] for column in inspector.get_columns(table)}
+        missing.extend(f"{table}.{column}" for column in sorted(columns - present))
+    return missing
+
+
+def check_schema() -> None:
+    """
+    Fails startup when the database has not been migrated, instead of every
+    booking failing later with an undefined column error.
+    """
+    missing = missing_schema()
+    if missing:
+        raise RuntimeError(
+            f"Database schema is out of date, missing {', '.join(missing)}; "
+            f"apply {MIGRATION} (see README) before starting the service")
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import RETRIES, TXN_RETRIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# serialization_failure (CockroachDB's "restart transaction"),
+# deadlock_detected (PostgreSQL aborting one of two bulk UPDATEs locking
+# rows in different orders) and lock_not_available (FOR UPDATE NOWAIT on a
+# held row). All leave the transaction aborted, so the only remedy is to
+# run it again.
+RETRYABLE_SQLSTATES = {"40001", "40P01", "55P03"}
+
+
+def is_retryable(error: BaseException | None) -> bool:
+    """
+    Whether error, or any DBAPI error it wraps, is a conflict that rerunning
+    the transaction can resolve.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if getattr(error, "sqlstate", None) in RETRYABLE_SQLSTATES:
+            return True
+        error = getattr(error, "orig", None) or error.__cause__ or error.__context__
+    return False
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all transactions of the process: every
+    transaction deposits `ratio` tokens and every retry spends one, so under
+    a conflict storm retries stay at about `ratio` of the transaction rate
+    instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+retry_budget = RetryBudget(
+    settings.TXN_RETRY_BUDGET_RATIO, settings.TXN_RETRY_BUDGET_MAX)
+
+
+def backoff(retry: int) -> float:
+    """
+    Full-jitter exponential backoff before the given retry (1-based).
+    """
+    ceiling = min(settings.TXN_RETRY_MAX_DELAY,
+                  settings.TXN_RETRY_BASE_DELAY * 2 ** (retry - 1))
+    return random.uniform(0, ceiling)
+
+
+def _should_retry(error: Exception, retries: int, operation: str) -> bool:
+    if not is_retryable(error):
+        return False
+    if retries >= settings.TXN_MAX_RETRIES:
+        logger.warning(
+            f"[transactions] {operation} gave up after {retries} retries: {error}")
+        return False
+    if not retry_budget.withdraw():
+        logger.warning(
+            f"[transactions] {operation} not retried, retry budget exhausted: {error}")
+        return False
+    return True
+
+
+def run_transaction(db: Session, body: Callable[[], T], operation: str) -> T:
+    """
+    Runs body() in a transaction on db and commits it. On a serialization
+    conflict (including one reported at commit) the transaction is rolled
+    back and body() runs again in a new one after a jittered backoff, up to
+    TXN_MAX_RETRIES times and within the shared retry budget.
+
+    body() must only touch the database through db and must not commit. If
+    db is already inside a transaction, body() runs once in a savepoint:
+    the conflict aborts the outer transaction, so retrying is left to its
+    owner.
+    """
+    if db.in_transaction():
+        with db.begin_nested():
+            return body()
+    retry_budget.deposit()
+    retries = 0
+    while True:
+        try:
+            with db.begin():
+                result = body()
+        except Exception as e:
+            if not _should_retry(e, retries, operation):
+                TXN_RETRIES.labels(operation).observe(retries)
+                raise
+            retries += 1
+            RETRIES.labels(operation).inc()
+            logger.info(
+                f"[transactions] Retrying {operation} (retry {retries}): {e}")
+            time.sleep(backoff(retries))
+            continue
+        TXN_RETRIES.labels(operation).observe(retries)
+        return result
+
+
+async def run_transaction_async(db: AsyncSession, body: Callable[[], Awaitable[T]], operation: str) -> T:
+    """
+    Async counterpart of run_transaction; the backoff does not block the
+    event loop.
+    """
+    if db.in_transaction():
+        async with db.begin_nested():
+            return await body()
+    retry_budget.deposit()
+    retries = 0
+    while True:
+        try:
+            async with db.begin():
+                result = await body()
+        except Exception as e:
+            if not _should_retry(e, retries, operation):
+                TXN_RETRIES.labels(operation).observe(retries)
+                raise
+            retries += 1
+            RETRIES.labels(operation).inc()
+            logger.info(
+                f"[transactions] Retrying {operation} (retry {retries}): {e}")
+            await asyncio.sleep(backoff(retries))
+            continue
+        TXN_RETRIES.labels(operation).observe(retries)
+        return result
@@ -1,13 +1,22 @@
-from geopy.geocoders import Nominatim
-import pycountry_convert as pc
 import logging
+from app.domain.geocode_cache import geocode_cache
+from app.domain.rate_limiter import nominatim_limiter
 
 logger = logging.getLogger(__name__)
 
 
 def city_to_country(city: str) -> str | None:
+    return geocode_cache.get_or_compute(
+        geocode_cache.city_key("country_code", city),
+        lambda: _geocode_city_country(city)
+    )
+
+
+def _geocode_city_country(city: str) -> str | None:
+    from geopy.geocoders import Nominatim
     try:
         geolocator = Nominatim(user_agent="traffic-service/1.0")
+        nominatim_limiter.wait()
         location = geolocator.geocode(city)
         if location and location.raw.get("address"):
             address = location.raw["address"]
@@ -21,10 +30,20 @@ def city_to_country(city: str) -> str | None:
 
 
 def coordinates_to_country_info(latitude: float, longitude: float) -> list[str] | None:
+    return geocode_cache.get_or_compute(
+        geocode_cache.coordinate_key(latitude, longitude),
+        lambda: _reverse_geocode(latitude, longitude)
+    )
+
+
+def _reverse_geocode(latitude: float, longitude: float) -> list[str] | None:
+    from geopy.geocoders import Nominatim
+    import pycountry_convert as pc
     try:
         geolocator = Nominatim(
             user_agent="traffic-service/1.0 (https://github.com/GeoBookr/traffic-service)"
         )
+        nominatim_limiter.wait()
         location = geolocator.reverse(
             (latitude, longitude), language="en", timeout=10)
         if location:
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from app.core.config import settings
+from app.core.metrics import GEOCODE_BATCH_SIZE
+from app.domain.geocode_cache import geocode_cache
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodeBatcher:
+    """
+    Collects the offline coordinate lookups of all events being handled at
+    once and resolves them in one vectorised nearest-city pass. A batch is
+    flushed `window` seconds after its first request or as soon as it holds
+    `max_batch` distinct keys.
+
+    Remote lookups (coordinates with the nominatim backend, city continents
+    always) are not batched: after the geocode cache, they run in threads,
+    at most `concurrency` at a time, each paced by the Nominatim rate
+    limiter. Identical requests in flight share one future either way.
+    """
+
+    def __init__(self, window: float, max_batch: int, concurrency: int):
+        self.window = window
+        self.max_batch = max_batch
+        self.concurrency = concurrency
+        self._pending: dict[tuple, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._remote: dict[tuple, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def locate(self, latitude: float, longitude: float) -> list[str] | None:
+        """
+        [country, country_code, continent, city] for the coordinates, or None.
+        """
+        if settings.GEOCODER_BACKEND == "offline":
+            return await self._request(("point", latitude, longitude))
+        from app.domain.country_mapper import coordinates_to_country_info
+        cache_key = geocode_cache.coordinate_key(latitude, longitude)
+        return await self._lookup(
+            cache_key, None, coordinates_to_country_info, latitude, longitude)
+
+    async def city_continent(self, city: str) -> str:
+        from app.services.slot_service import get_continent_for_city
+        return await self._lookup(
+            geocode_cache.city_key("continent", city), "Unknown", get_continent_for_city, city)
+
+    async def city_continents(self, cities: list[str]) -> dict[str, str]:
+        unique = list(dict.fromkeys(cities))
+        continents = await asyncio.gather(*(self.city_continent(city) for city in unique))
+        return dict(zip(unique, continents))
+
+    async def _request(self, key: tuple):
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch or self.window <= 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: dict[tuple, asyncio.Future]) -> None:
+        GEOCODE_BATCH_SIZE.observe(len(batch))
+        try:
+            results = await self.resolve_points([key[1:] for key in batch])
+        except Exception as e:
+            logger.error(f"[geocode_batcher] Resolving a batch of {len(batch)} failed: {e}")
+            results = [None] * len(batch)
+        for future, result in zip(batch.values(), results):
+            if not future.done():
+                future.set_result(result)
+
+    async def resolve_points(self, points: list[tuple[float, float]]) -> list[list[str] | None]:
+        return locate_many(points)
+
+    async def _lookup(self, cache_key: str, default, compute, *args):
+        """
+        compute(*args) from the geocode cache or in a thread, `concurrency`
+        remote lookups at a time; `default` if it raises.
+        """
+        cached = geocode_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        key = (compute.__name__, cache_key)
+        task = self._remote.get(key)
+        if task is None:
+            task = self._remote[key] = asyncio.get_running_loop().create_task(
+                self._compute(default, compute, *args))
+            task.add_done_callback(lambda _: self._remote.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _compute(self, default, compute, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            try:
+                return await asyncio.to_thread(compute, *args)
+            except Exception as e:
+                logger.error(f"[geocode_batcher] {compute.__name__}{args} failed: {e}")
+                return default
+
+
+def locate_many(points: list[tuple[float, float]]) -> list[list[str] | None]:
+    """
+    Offline reverse geocoding of many points in one vectorised lookup.
+    """
+    from app.domain.reverse_geocoder import get_reverse_geocoder
+    try:
+        return get_reverse_geocoder().lookup_many(
+            [point[0] for point in points], [point[1] for point in points])
+    except Exception as e:
+        logger.error(f"Error in offline geocoding: {e}")
+        return [None] * len(points)
+
+
+geocode_batcher = GeocodeBatcher(
+    settings.GEOCODE_BATCH_WINDOW_MS / 1000,
+    settings.GEOCODE_BATCH_MAX,
+    settings.GEOCODE_REMOTE_CONCURRENCY,
+)
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from app.core.config import settings
+from app.domain.geodata import normalize_name
+
+logger = logging.getLogger(__name__)
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_MISSING = object()
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+class GeocodeCache:
+    """
+    Bounded LRU cache with per-entry TTL for geocoding results.
+
+    Coordinates are quantized either by rounding to `precision` decimals or,
+    when key_mode is "geohash", to a geohash of `precision` characters, so that
+    nearby pickup points share an entry. Entries can be snapshotted to a JSON
+    file and are reloaded (minus expired ones) on construction; run_snapshots
+    writes the snapshot periodically off the event loop.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 86400, precision: int = 3,
+                 key_mode: str = "round", snapshot_path: str | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.precision = precision
+        self.key_mode = key_mode
+        self.snapshot_path = snapshot_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = 0
+        if snapshot_path:
+            self.load()
+
+    def coordinate_key(self, latitude: float, longitude: float) -> str:
+        if self.key_mode == "geohash":
+            return "gh:" + geohash(latitude, longitude, self.precision)
+        return f"ll:{round(latitude, self.precision)}:{round(longitude, self.precision)}"
+
+    def city_key(self, namespace: str, city: str) -> str:
+        return f"{namespace}:{normalize_name(city)}"
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < now:
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty += 1
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Returns the cached value for key, calling compute() on a miss.
+        None results are not cached so transient geocoder failures are retried.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def save(self) -> None:
+        """
+        Writes the snapshot to a private temporary file and renames it over
+        the snapshot; concurrent saves are serialized.
+        """
+        if not self.snapshot_path:
+            return
+        directory = os.path.dirname(self.snapshot_path) or "."
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._entries.items())
+                dirty, self._dirty = self._dirty, 0
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(
+                        "w", dir=directory, prefix=os.path.basename(self.snapshot_path) + ".",
+                        suffix=".tmp", delete=False) as fh:
+                    tmp_path = fh.name
+                    json.dump(entries, fh)
+                os.replace(tmp_path, self.snapshot_path)
+            except Exception as e:
+                logger.error(f"[geocode_cache] Could not write snapshot {self.snapshot_path}: {e}")
+                with self._lock:
+                    self._dirty += dirty
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    async def run_snapshots(self, interval: float) -> None:
+        """
+        Saves the snapshot every `interval` seconds when entries changed,
+        in a worker thread.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            if self._dirty:
+                await asyncio.to_thread(self.save)
+
+    def load(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as fh:
+                entries = json.load(fh)
+        except Exception as e:
+            logger.error(f"[geocode_cache] Could not read snapshot {self.snapshot_path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, (expires_at, value) in entries[-self.max_size:]:
+                if expires_at >= now:
+                    self._entries[key] = (expires_at, value)
+        logger.info(f"[geocode_cache] Loaded {len(self._entries)} entries from snapshot")
+
+
+geocode_cache = GeocodeCache(
+    max_size=settings.GEOCODE_CACHE_SIZE,
+    ttl=settings.GEOCODE_CACHE_TTL,
+    precision=settings.GEOCODE_CACHE_PRECISION,
+    key_mode=settings.GEOCODE_CACHE_KEY_MODE,
+    snapshot_path=settings.GEOCODE_CACHE_SNAPSHOT,
+)
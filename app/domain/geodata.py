@@ -0,0 +1,103 @@
+import functools
+import logging
+import numpy as np
+from app.core.config import settings
+from app.domain.geodata_snapshot import GeodataSnapshot
+
+logger = logging.getLogger(__name__)
+
+CONTINENT_NAMES = {
+    "AF": "Africa",
+    "AN": "Antarctica",
+    "AS": "Asia",
+    "EU": "Europe",
+    "NA": "North America",
+    "OC": "Oceania",
+    "SA": "South America",
+}
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """
+    Converts degrees to points on the unit sphere, so that nearest-neighbour
+    and distance queries can be answered with dot products.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def great_circle_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return EARTH_RADIUS_KM * np.arccos(np.clip(np.sum(a * b, axis=-1), -1.0, 1.0))
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+@functools.lru_cache(maxsize=1)
+def get_snapshot() -> GeodataSnapshot | None:
+    """
+    The prebuilt snapshot named by GEODATA_SNAPSHOT, or None when unset or
+    unreadable (callers then fall back on parsing geonamescache).
+    """
+    if not settings.GEODATA_SNAPSHOT:
+        return None
+    try:
+        return GeodataSnapshot(settings.GEODATA_SNAPSHOT)
+    except (OSError, ValueError) as e:
+        logger.warning(
+            f"[geodata] Ignoring snapshot {settings.GEODATA_SNAPSHOT}: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _geonames():
+    import geonamescache
+    return geonamescache.GeonamesCache()
+
+
+@functools.lru_cache(maxsize=1)
+def get_cities() -> dict:
+    """
+    Returns the geonamescache city table, parsed once per process.
+    """
+    return _geonames().get_cities()
+
+
+@functools.lru_cache(maxsize=1)
+def get_countries() -> dict:
+    """
+    Returns the geonamescache country table, parsed once per process, or
+    the snapshot's copy of it (name, continentcode, population, neighbours).
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.countries
+    return _geonames().get_countries()
+
+
+@functools.lru_cache(maxsize=None)
+def continent_for_country_code(country_code: str) -> str:
+    """
+    Maps a two-letter country code to a continent name, preferring
+    pycountry_convert (as the Nominatim path does) and falling back on
+    the geonamescache continent code for territories it does not know.
+    Snapshots store the result of the same rule.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None and country_code in snapshot.countries:
+        return snapshot.countries[country_code]["continent"]
+    import pycountry_convert as pc
+    try:
+        continent_code = pc.country_alpha2_to_continent_code(country_code)
+        return pc.convert_continent_code_to_continent_name(continent_code)
+    except Exception:
+        country = get_countries().get(country_code)
+        if country:
+            return CONTINENT_NAMES.get(country["continentcode"], "Unknown")
+        return "Unknown"
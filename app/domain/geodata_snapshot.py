@@ -0,0 +1,144 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import numpy as np
+
+MAGIC = b"GEOSNAP1"
+VERSION = 1
+_HEADER = struct.Struct("<8sI")
+_ALIGN = 64
+
+
+class GeodataSnapshot:
+    """
+    Read-only view over a prebuilt geodata file, memory-mapped so that
+    loading costs a header parse and the arrays are paged in on use.
+
+    Layout: magic and header length, a JSON header (countries, per-country
+    city ranges, array descriptors), then 64-byte aligned arrays. Cities
+    are ordered by country code and descending population, so the cities
+    of a country are the slice countries[code]["cities"] of every array.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a geodata snapshot")
+        header = json.loads(
+            self._mmap[_HEADER.size:_HEADER.size + header_length])
+        if header["version"] != VERSION:
+            raise ValueError(
+                f"{path} has snapshot version {header['version']}, expected {VERSION}")
+        self.path = path
+        self.countries: dict[str, dict] = header["countries"]
+        self.country_codes: list[str] = header["country_codes"]
+        arrays = {}
+        for name, (dtype, offset, shape) in header["arrays"].items():
+            arrays[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        self.latitudes = arrays["latitude"]
+        self.longitudes = arrays["longitude"]
+        self.populations = arrays["population"]
+        self.country_index = arrays["country"]
+        self.points = arrays["points"]
+        self._names_blob = arrays["names"]
+        self._names: list[str] | None = None
+
+    @property
+    def names(self) -> list[str]:
+        if self._names is None:
+            self._names = self._names_blob.tobytes().decode().split("\n")
+        return self._names
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+
+def _collect() -> tuple[dict, list[dict]]:
+    from app.domain.geodata import CONTINENT_NAMES, get_cities, get_countries
+    import pycountry_convert as pc
+
+    countries = {}
+    for code, country in get_countries().items():
+        try:
+            continent = pc.convert_continent_code_to_continent_name(
+                pc.country_alpha2_to_continent_code(code))
+        except Exception:
+            continent = CONTINENT_NAMES.get(country["continentcode"], "Unknown")
+        countries[code] = {
+            "name": country["name"],
+            "continentcode": country["continentcode"],
+            "continent": continent,
+            "population": country["population"],
+            "neighbours": country.get("neighbours", ""),
+        }
+    cities = sorted(get_cities().values(),
+                    key=lambda c: (c["countrycode"], -c["population"], c["name"]))
+    for city in cities:
+        if "\n" in city["name"]:
+            raise ValueError(f"City name with newline: {city['name']!r}")
+    return countries, cities
+
+
+def build_snapshot(path: str) -> None:
+    """
+    Writes the geonamescache country and city tables to `path` (atomically).
+    """
+    from app.domain.geodata import to_unit_vectors
+
+    countries, cities = _collect()
+    country_codes = sorted({city["countrycode"] for city in cities} | set(countries))
+    position = {code: i for i, code in enumerate(country_codes)}
+    for code in country_codes:
+        countries.setdefault(code, {"name": code, "continentcode": "", "continent": "Unknown",
+                                    "population": 0, "neighbours": ""})
+    for i, city in enumerate(cities):
+        countries[city["countrycode"]].setdefault("cities", [i, i])[1] = i + 1
+
+    latitudes = np.array([c["latitude"] for c in cities], dtype="<f8")
+    longitudes = np.array([c["longitude"] for c in cities], dtype="<f8")
+    arrays = {
+        "latitude": latitudes,
+        "longitude": longitudes,
+        "population": np.array([c["population"] for c in cities], dtype="<i8"),
+        "country": np.array([position[c["countrycode"]] for c in cities], dtype="<i2"),
+        "points": to_unit_vectors(latitudes, longitudes).astype("<f8"),
+        "names": np.frombuffer("\n".join(c["name"] for c in cities).encode(), dtype="u1"),
+    }
+
+    def header_bytes(descriptors: dict) -> bytes:
+        return json.dumps({"version": VERSION, "countries": countries,
+                           "country_codes": country_codes, "arrays": descriptors}).encode()
+
+    # Array offsets are written in the header, so size the header with
+    # placeholder offsets at least as wide as the real ones.
+    descriptors = {name: [a.dtype.str, 10 ** 12, list(a.shape)]
+                   for name, a in arrays.items()}
+    offset = _HEADER.size + len(header_bytes(descriptors))
+    for name, array in arrays.items():
+        offset += -offset % _ALIGN
+        descriptors[name][1] = offset
+        offset += array.nbytes
+    header = header_bytes(descriptors)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (descriptors[name][1] - f.tell()))
+            f.write(array.tobytes())
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "geodata.snap"
+    build_snapshot(target)
+    print(f"Wrote geodata snapshot to {target}")
@@ -1,3 +1,5 @@
+import threading
+import time
 from app.core.config import settings
 
 
@@ -9,3 +11,26 @@ def is_under_limit(country_code: str, current_count: int = 0) -> bool:
 def is_under_city_limit(country_code: str, city: str, current_count: int = 0) -> bool:
     limit = settings.CITY_LIMITS.get(country_code, {}).get(city, 2)
     return current_count < limit
+
+
+class RequestRateLimiter:
+    """
+    Spaces calls at least `min_interval` seconds apart across threads.
+    wait() reserves the next free start time and sleeps until it.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+nominatim_limiter = RequestRateLimiter(settings.NOMINATIM_MIN_INTERVAL)
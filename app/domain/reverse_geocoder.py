@@ -0,0 +1,133 @@
+import logging
+import threading
+import numpy as np
+from app.domain.geodata import get_cities, get_countries, get_snapshot, continent_for_country_code, to_unit_vectors
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+logger = logging.getLogger(__name__)
+
+
+class LatitudeBandIndex:
+    """
+    Exact nearest-neighbour search over unit vectors without scipy. Points
+    are sorted by latitude; a query scans the band of points within r
+    degrees of its latitude and widens r until the best match found is no
+    further than r, since no point outside the band can be closer.
+    """
+
+    def __init__(self, points: np.ndarray, band_degrees: float = 1.0):
+        latitudes = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+        self.order = np.argsort(latitudes, kind="stable")
+        self.latitudes = latitudes[self.order]
+        self.points = points[self.order]
+        self.band_degrees = band_degrees
+
+    def query(self, query: np.ndarray) -> np.ndarray:
+        result = np.empty(len(query), dtype=np.intp)
+        for q, point in enumerate(query):
+            latitude = np.degrees(np.arcsin(np.clip(point[2], -1.0, 1.0)))
+            radius = self.band_degrees
+            while True:
+                lo = np.searchsorted(self.latitudes, latitude - radius, side="left")
+                hi = np.searchsorted(self.latitudes, latitude + radius, side="right")
+                if hi > lo:
+                    dots = self.points[lo:hi] @ point
+                    best = int(np.argmax(dots))
+                    angle = np.degrees(np.arccos(np.clip(dots[best], -1.0, 1.0)))
+                    if angle <= radius or (lo == 0 and hi == len(self.latitudes)):
+                        result[q] = self.order[lo + best]
+                        break
+                    radius = max(angle, radius * 2)
+                else:
+                    radius *= 2
+        return result
+
+
+class ReverseGeocoder:
+    """
+    Offline nearest-city reverse geocoder over the geonamescache city table.
+
+    Cities are stored as unit vectors on the sphere, so the nearest city by
+    great-circle distance is also the nearest by chord length. Lookups use a
+    scipy KD-tree when scipy is installed and a LatitudeBandIndex otherwise.
+    """
+
+    def __init__(self):
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            self.names = snapshot.names
+            self.country_codes = [snapshot.country_codes[i]
+                                  for i in snapshot.country_index.tolist()]
+            self.points = snapshot.points
+        else:
+            cities = list(get_cities().values())
+            self.names = [city["name"] for city in cities]
+            self.country_codes = [city["countrycode"] for city in cities]
+            self.points = to_unit_vectors(
+                [city["latitude"] for city in cities],
+                [city["longitude"] for city in cities],
+            )
+        if cKDTree is not None:
+            self.backend = "kd-tree"
+            self.tree = cKDTree(self.points)
+        else:
+            self.backend = "latitude bands"
+            self.tree = LatitudeBandIndex(self.points)
+
+        countries = get_countries()
+        self.country_info = {
+            code: [
+                countries[code]["name"] if code in countries else code,
+                code,
+                continent_for_country_code(code),
+            ]
+            for code in set(self.country_codes)
+        }
+        logger.info(
+            f"[reverse_geocoder] Indexed {len(self.names)} cities (backend: {self.backend})")
+
+    def nearest(self, latitudes, longitudes) -> np.ndarray:
+        query = to_unit_vectors(latitudes, longitudes).reshape(-1, 3)
+        if self.backend == "kd-tree":
+            _, indices = self.tree.query(query)
+            return np.atleast_1d(indices)
+        return self.tree.query(query)
+
+    def lookup(self, latitude: float, longitude: float) -> list[str]:
+        return self.lookup_many([latitude], [longitude])[0]
+
+    def lookup_many(self, latitudes, longitudes) -> list[list[str]]:
+        results = []
+        for index in self.nearest(latitudes, longitudes):
+            country_code = self.country_codes[index]
+            results.append(self.country_info[country_code] + [self.names[index]])
+        return results
+
+
+_geocoder: ReverseGeocoder | None = None
+_geocoder_lock = threading.Lock()
+
+
+def get_reverse_geocoder() -> ReverseGeocoder:
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = ReverseGeocoder()
+    return _geocoder
+
+
+def coordinates_to_country_info(latitude: float, longitude: float) -> list[str] | None:
+    """
+    Offline counterpart of country_mapper.coordinates_to_country_info.
+    Returns [country, country_code, continent, city] for the nearest known city.
+    """
+    try:
+        return get_reverse_geocoder().lookup(latitude, longitude)
+    except Exception as e:
+        logger.error(f"Error in offline geocoding: {e}")
+        return None
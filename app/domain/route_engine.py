@@ -0,0 +1,397 @@
+import functools
+import heapq
+import logging
+import threading
+import numpy as np
+from app.core.config import settings
+from app.domain.geodata import get_countries, great_circle_km, normalize_name, to_unit_vectors
+from app.domain.route_generator import get_city_index
+
+logger = logging.getLogger(__name__)
+
+
+class RouteGraph:
+    """
+    Undirected geographic graph whose nodes are regions with a position on the
+    unit sphere and whose edges carry great-circle distances in km.
+
+    Searches are A* with the straight great-circle distance to the target as
+    heuristic. Entering a node costs the edge distance times a per-node
+    multiplier (>= 1, or None when the node must be avoided) plus a fixed
+    per-hop penalty, which keeps the heuristic admissible. With max_hops the
+    search state is (node, hops taken), so paths never exceed that many
+    edges.
+    """
+
+    def __init__(self, labels: list[str], points: np.ndarray, edges: list[dict[int, float]], hop_penalty: float):
+        self.labels = labels
+        self.index = {label: i for i, label in enumerate(labels)}
+        self.normalized = {}
+        for i, label in enumerate(labels):
+            self.normalized.setdefault(normalize_name(label), i)
+        self.points = points
+        self.edges = edges
+        self.hop_penalty = hop_penalty
+
+    def with_endpoints(self, endpoints: list[tuple[str, np.ndarray]], neighbours: int) -> "RouteGraph":
+        """
+        A copy with extra (label, unit vector) nodes, each linked to its
+        nearest `neighbours` nodes; the graph itself is left untouched.
+        """
+        labels = self.labels + [label for label, _ in endpoints]
+        points = np.vstack([self.points] + [point for _, point in endpoints])
+        edges = [dict(node_edges) for node_edges in self.edges] + [dict() for _ in endpoints]
+        count = min(neighbours, len(labels) - 1)
+        for i in range(len(self.labels), len(labels)):
+            distances = great_circle_km(points, points[i])
+            distances[i] = np.inf
+            for j in np.argsort(distances)[:count]:
+                edges[i][int(j)] = edges[int(j)][i] = float(distances[j])
+        return RouteGraph(labels, points, edges, self.hop_penalty)
+
+    def _edge_cost(self, target: int, node: int, distance: float, multiplier) -> float | None:
+        if node == target:
+            return distance + self.hop_penalty
+        factor = multiplier(node)
+        if factor is None:
+            return None
+        return distance * factor + self.hop_penalty
+
+    def path_cost(self, path: list[int], multiplier) -> float:
+        target = path[-1]
+        return sum(
+            self._edge_cost(target, v, self.edges[u][v], multiplier)
+            for u, v in zip(path, path[1:])
+        )
+
+    def shortest_path(self, source: int, target: int, multiplier, banned_nodes=frozenset(), banned_edges=frozenset(), max_hops: int | None = None):
+        heuristic = great_circle_km(self.points, self.points[target])
+        start = (source, 0)
+        best = {start: 0.0}
+        came_from = {}
+        frontier = [(heuristic[source], 0.0, start)]
+        while frontier:
+            _, cost, state = heapq.heappop(frontier)
+            node, hops = state
+            if node == target:
+                path = [node]
+                while state in came_from:
+                    state = came_from[state]
+                    path.append(state[0])
+                return cost, path[::-1]
+            if cost > best.get(state, float("inf")):
+                continue
+            if max_hops is not None and hops >= max_hops:
+                continue
+            for neighbour, distance in self.edges[node].items():
+                if neighbour in banned_nodes or (node, neighbour) in banned_edges:
+                    continue
+                step = self._edge_cost(target, neighbour,
+                                       distance, multiplier)
+                if step is None:
+                    continue
+                new_cost = cost + step
+                next_state = (neighbour, hops + 1 if max_hops is not None else 0)
+                if new_cost < best.get(next_state, float("inf")):
+                    best[next_state] = new_cost
+                    came_from[next_state] = state
+                    heapq.heappush(
+                        frontier, (new_cost + heuristic[neighbour], new_cost, next_state))
+        return None
+
+    def k_shortest_paths(self, source: int, target: int, k: int, multiplier, max_hops: int | None = None) -> list[list[int]]:
+        """
+        Yen's algorithm: the k cheapest loop-free paths of at most max_hops
+        edges, cheapest first.
+        """
+        first = self.shortest_path(source, target, multiplier, max_hops=max_hops)
+        if first is None:
+            return []
+        accepted = [first]
+        candidates: list[tuple[float, list[int]]] = []
+        seen = {tuple(first[1])}
+        while len(accepted) < k:
+            previous = accepted[-1][1]
+            for i in range(len(previous) - 1):
+                spur_node = previous[i]
+                root = previous[:i + 1]
+                banned_edges = {
+                    (path[i], path[i + 1])
+                    for _, path in accepted
+                    if len(path) > i + 1 and path[:i + 1] == root
+                }
+                spur = self.shortest_path(
+                    spur_node, target, multiplier, frozenset(root[:-1]), banned_edges,
+                    None if max_hops is None else max_hops - i)
+                if spur is None:
+                    continue
+                path = root[:-1] + spur[1]
+                if tuple(path) in seen:
+                    continue
+                seen.add(tuple(path))
+                heapq.heappush(
+                    candidates, (self.path_cost(path, multiplier), path))
+            if not candidates:
+                break
+            accepted.append(heapq.heappop(candidates))
+        return [path for _, path in accepted]
+
+
+def _link_nearest(points: np.ndarray, edges: list[dict[int, float]], neighbours: int) -> None:
+    distances = great_circle_km(points[:, None, :], points[None, :, :])
+    np.fill_diagonal(distances, np.inf)
+    count = min(neighbours, len(points) - 1)
+    if count <= 0:
+        return
+    nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+    for i, row in enumerate(nearest):
+        for j in row:
+            edges[i][int(j)] = float(distances[i, j])
+            edges[int(j)][i] = float(distances[i, j])
+
+
+def _link_hubs(points: np.ndarray, edges: list[dict[int, float]], hubs: list[int], neighbours: int) -> None:
+    """
+    Links every hub node to its nearest other hubs: long-distance edges that
+    keep far apart nodes within ROUTE_MAX_STOPS of each other.
+    """
+    hub_edges: list[dict[int, float]] = [dict() for _ in hubs]
+    _link_nearest(points[hubs], hub_edges, neighbours)
+    for i, node_edges in enumerate(hub_edges):
+        for j, distance in node_edges.items():
+            edges[hubs[i]][hubs[j]] = distance
+
+
+def _connect_components(points: np.ndarray, edges: list[dict[int, float]]) -> None:
+    """
+    Joins disconnected clusters by repeatedly linking the closest pair of
+    nodes between the cluster reachable from node 0 and everything else.
+    """
+    if len(points) == 0:
+        return
+    while True:
+        reached = {0}
+        stack = [0]
+        while stack:
+            for neighbour in edges[stack.pop()]:
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    stack.append(neighbour)
+        if len(reached) == len(points):
+            return
+        inside = np.array(sorted(reached))
+        outside = np.array([i for i in range(len(points)) if i not in reached])
+        distances = great_circle_km(
+            points[inside][:, None, :], points[outside][None, :, :])
+        a, b = np.unravel_index(np.argmin(distances), distances.shape)
+        i, j = int(inside[a]), int(outside[b])
+        edges[i][j] = edges[j][i] = float(distances[a, b])
+
+
+def build_country_graph() -> RouteGraph:
+    """
+    Countries that have at least one known city, placed at the population
+    weighted centroid of their cities. Edges are land borders from the
+    geonamescache neighbour lists plus links to the nearest few centroids,
+    so islands and overseas territories remain reachable, and hub links
+    between the ROUTE_COUNTRY_HUBS most populous countries.
+    """
+    index = get_city_index()
+    countries = get_countries()
+    labels = sorted(code for code in countries if code in index.by_country)
+    centroids = []
+    for code in labels:
+        cities = index.by_country[code]
+        vectors = to_unit_vectors(cities.latitudes, cities.longitudes)
+        weights = np.maximum(cities.populations, 1).astype(np.float64)
+        centroid = (vectors * weights[:, None]).sum(axis=0)
+        centroids.append(centroid / np.linalg.norm(centroid))
+    points = np.array(centroids)
+
+    position = {code: i for i, code in enumerate(labels)}
+    edges: list[dict[int, float]] = [dict() for _ in labels]
+    for i, code in enumerate(labels):
+        for neighbour in filter(None, countries[code].get("neighbours", "").split(",")):
+            j = position.get(neighbour)
+            if j is not None:
+                distance = float(great_circle_km(points[i], points[j]))
+                edges[i][j] = distance
+                edges[j][i] = distance
+    _link_nearest(points, edges, settings.ROUTE_GRAPH_NEIGHBOURS)
+    by_population = sorted(
+        range(len(labels)), key=lambda i: -int(index.by_country[labels[i]].populations.sum()))
+    _link_hubs(points, edges, by_population[:settings.ROUTE_COUNTRY_HUBS], settings.ROUTE_HUB_NEIGHBOURS)
+    _connect_components(points, edges)
+    return RouteGraph(labels, points, edges, settings.ROUTE_HOP_PENALTY_KM)
+
+
+def _select_city_nodes(cities):
+    """
+    Indices of the most populous cities and the unit vectors of all cities.
+    Cities closer than the configured spacing to a bigger selected city
+    (districts, suburbs) are skipped so that stops are spread out.
+    """
+    limit = settings.ROUTE_CITY_GRAPH_NODES
+    spacing = settings.ROUTE_CITY_MIN_SPACING_KM
+    all_points = to_unit_vectors(cities.latitudes, cities.longitudes)
+    selected, labels = [], set()
+    for i, name in enumerate(cities.names):
+        if len(selected) >= limit:
+            break
+        if name in labels:
+            continue
+        if selected and great_circle_km(all_points[selected], all_points[i]).min() < spacing:
+            continue
+        selected.append(i)
+        labels.add(name)
+    return selected, all_points
+
+
+def city_graph_nodes(country_code: str) -> list[str]:
+    """
+    Labels of build_city_graph(country_code) without linking the graph.
+    """
+    cities = get_city_index().by_country.get(country_code)
+    if cities is None:
+        return []
+    selected, _ = _select_city_nodes(cities)
+    return [cities.names[i] for i in selected]
+
+
+def build_city_graph(country_code: str) -> RouteGraph | None:
+    """
+    The cities of _select_city_nodes, each linked to its nearest neighbours.
+    The most populous ROUTE_CITY_HUBS are also linked to their nearest
+    hubs, so long trips fit in ROUTE_MAX_STOPS.
+    """
+    cities = get_city_index().by_country.get(country_code)
+    if cities is None:
+        return None
+    selected, all_points = _select_city_nodes(cities)
+    points = all_points[selected]
+    edges: list[dict[int, float]] = [dict() for _ in selected]
+    _link_nearest(points, edges, settings.ROUTE_GRAPH_NEIGHBOURS)
+    _link_hubs(points, edges, list(range(min(settings.ROUTE_CITY_HUBS, len(selected)))),
+               settings.ROUTE_HUB_NEIGHBOURS)
+    _connect_components(points, edges)
+    return RouteGraph([cities.names[i] for i in selected], points, edges, settings.ROUTE_HOP_PENALTY_KM)
+
+
+def capacity_multiplier(labels: list[str], capacity: dict[str, int] | None, penalty: float, avoid: frozenset[str] = frozenset()):
+    """
+    Per-node cost multiplier from the remaining slots of each region at the
+    scheduled time. Regions without a slot row yet are unconstrained, regions
+    with no room left (or in `avoid`) are not passed through, and scarce
+    regions get progressively more expensive.
+    """
+    def multiplier(node: int) -> float | None:
+        if labels[node] in avoid:
+            return None
+        if not capacity:
+            return 1.0
+        remaining = capacity.get(labels[node])
+        if remaining is None:
+            return 1.0
+        if remaining <= 0:
+            return None
+        return 1.0 + penalty / remaining
+    return multiplier
+
+
+class RouteEngine:
+    def __init__(self):
+        self.country_graph = build_country_graph()
+        self._city_graphs = functools.lru_cache(maxsize=64)(build_city_graph)
+        self.avoid = frozenset(
+            code.strip().upper() for code in settings.ROUTE_AVOID_COUNTRIES.split(",") if code.strip())
+        logger.info(
+            f"[route_engine] Country graph ready with {len(self.country_graph.labels)} nodes")
+
+    def _routes(self, graph: RouteGraph, origin: str, destination: str, k: int, capacity: dict[str, int] | None, avoid: frozenset[str] = frozenset()) -> list[list[str]]:
+        source = graph.index.get(origin)
+        target = graph.index.get(destination)
+        if source is None or target is None:
+            return []
+        if source == target:
+            return [[origin, destination]]
+        multiplier = capacity_multiplier(
+            graph.labels, capacity, settings.ROUTE_CAPACITY_PENALTY, avoid)
+        paths = graph.k_shortest_paths(
+            source, target, k, multiplier, settings.ROUTE_MAX_STOPS + 1)
+        return [[graph.labels[i] for i in path] for path in paths]
+
+    def country_routes(self, origin: str, destination: str, k: int = 1, capacity: dict[str, int] | None = None) -> list[list[str]]:
+        """
+        Routes never pass through ROUTE_AVOID_COUNTRIES, though they may
+        start or end there.
+        """
+        return self._routes(self.country_graph, origin, destination, k, capacity, self.avoid)
+
+    def city_nodes(self, country_code: str) -> list[str]:
+        """
+        Cities that routes within a country may pass through. Computed
+        without the graph cache, so sweeping every country (slot
+        provisioning) does not evict the graphs bookings are using.
+        """
+        return city_graph_nodes(country_code)
+
+    def city_candidates(self, country_code: str, origin_city: str, destination_city: str) -> list[str]:
+        """
+        Regions city_routes may pass through: the cached graph's nodes plus
+        both ends.
+        """
+        graph = self._city_graphs(country_code)
+        if graph is None:
+            return []
+        return list(dict.fromkeys(graph.labels + [origin_city, destination_city]))
+
+    def city_routes(self, country_code: str, origin_city: str, destination_city: str, k: int = 1, capacity: dict[str, int] | None = None) -> list[list[str]]:
+        """
+        Routes between two cities of the country the geocoder placed them
+        in; city names alone are ambiguous (Cambridge, GB or US). Ends that
+        are not nodes of the country's cached graph are linked into a copy
+        of it for this search only.
+        """
+        graph = self._city_graphs(country_code)
+        if graph is None:
+            return []
+        origin = _label_for(graph, origin_city)
+        destination = _label_for(graph, destination_city)
+        missing = list(dict.fromkeys(
+            city for city, label in ((origin_city, origin), (destination_city, destination)) if label is None))
+        if missing:
+            endpoints = [(city, _city_point(country_code, city)) for city in missing]
+            if any(point is None for _, point in endpoints):
+                return []
+            graph = graph.with_endpoints(endpoints, settings.ROUTE_GRAPH_NEIGHBOURS)
+            origin = origin or origin_city
+            destination = destination or destination_city
+        routes = self._routes(graph, origin, destination, k, capacity)
+        return [[origin_city] + route[1:-1] + [destination_city] for route in routes]
+
+
+def _label_for(graph: RouteGraph, city: str) -> str | None:
+    if city in graph.index:
+        return city
+    i = graph.normalized.get(normalize_name(city))
+    return graph.labels[i] if i is not None else None
+
+
+def _city_point(country_code: str, city: str) -> np.ndarray | None:
+    for record in get_city_index().by_name.get(normalize_name(city), ()):
+        if record["countrycode"] == country_code:
+            return to_unit_vectors(record["latitude"], record["longitude"])
+    return None
+
+
+_engine: RouteEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_route_engine() -> RouteEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RouteEngine()
+    return _engine
@@ -1,6 +1,147 @@
 import random
-import pycountry
-import geonamescache
+import threading
+from typing import NamedTuple
+import numpy as np
+from app.domain.geodata import get_cities, get_snapshot, normalize_name
+from app.domain.geodata_snapshot import GeodataSnapshot
+
+FALLBACK_CITIES = ("San Francisco", "San Jose",
+                   "Los Angeles", "Sacramento", "Oakland")
+
+
+class CountryCities(NamedTuple):
+    names: tuple[str, ...]
+    populations: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+
+
+class CityIndex:
+    """
+    Lookup tables over the city table, built once per process.
+
+    by_country maps a country code to a tuple of city names and parallel
+    NumPy arrays of populations and coordinates, ordered by descending
+    population. by_name maps a normalized city name to its records, most
+    populous first; it is built on first use.
+    """
+
+    def __init__(self, by_country: dict[str, CountryCities]):
+        self.by_country = by_country
+        self._by_name: dict[str, list[dict]] | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cities(cls, cities: dict) -> "CityIndex":
+        by_country: dict[str, list[dict]] = {}
+        for city in cities.values():
+            by_country.setdefault(city["countrycode"], []).append(city)
+        index = {}
+        for country_code, records in by_country.items():
+            records.sort(key=lambda r: (-r["population"], r["name"]))
+            index[country_code] = CountryCities(
+                names=tuple(r["name"] for r in records),
+                populations=np.array(
+                    [r["population"] for r in records], dtype=np.int64),
+                latitudes=np.array(
+                    [r["latitude"] for r in records], dtype=np.float64),
+                longitudes=np.array(
+                    [r["longitude"] for r in records], dtype=np.float64),
+            )
+        return cls(index)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: GeodataSnapshot) -> "CityIndex":
+        """
+        Slices the snapshot's arrays (no copies): its cities are already
+        grouped by country and sorted by descending population.
+        """
+        names = snapshot.names
+        index = {}
+        for country_code, country in snapshot.countries.items():
+            if "cities" not in country:
+                continue
+            start, end = country["cities"]
+            index[country_code] = CountryCities(
+                names=tuple(names[start:end]),
+                populations=snapshot.populations[start:end],
+                latitudes=snapshot.latitudes[start:end],
+                longitudes=snapshot.longitudes[start:end],
+            )
+        return cls(index)
+
+    @property
+    def by_name(self) -> dict[str, list[dict]]:
+        if self._by_name is None:
+            with self._lock:
+                if self._by_name is None:
+                    self._by_name = self._build_by_name()
+        return self._by_name
+
+    def _build_by_name(self) -> dict[str, list[dict]]:
+        by_name: dict[str, list[dict]] = {}
+        for country_code, cities in self.by_country.items():
+            for i, name in enumerate(cities.names):
+                by_name.setdefault(normalize_name(name), []).append({
+                    "name": name,
+                    "countrycode": country_code,
+                    "population": int(cities.populations[i]),
+                    "latitude": float(cities.latitudes[i]),
+                    "longitude": float(cities.longitudes[i]),
+                })
+        for records in by_name.values():
+            records.sort(key=lambda r: -r["population"])
+        return by_name
+
+    def country_of(self, city: str) -> str | None:
+        records = self.by_name.get(normalize_name(city))
+        return records[0]["countrycode"] if records else None
+
+    def city_names(self, country_code: str) -> tuple[str, ...]:
+        entry = self.by_country.get(country_code)
+        return entry.names if entry else ()
+
+
+_city_index: CityIndex | None = None
+_city_index_lock = threading.Lock()
+
+
+def get_city_index() -> CityIndex:
+    global _city_index
+    if _city_index is None:
+        with _city_index_lock:
+            if _city_index is None:
+                snapshot = get_snapshot()
+                if snapshot is not None:
+                    _city_index = CityIndex.from_snapshot(snapshot)
+                else:
+                    _city_index = CityIndex.from_cities(get_cities())
+    return _city_index
+
+
+def _sample_stops(rng: random.Random, names: tuple[str, ...], excluded: set[str], count: int) -> list[str]:
+    """
+    Draws up to `count` distinct names not in `excluded` (normalized names).
+    Large candidate pools are sampled by index rejection, so the cost is
+    proportional to `count` rather than to the size of the pool.
+    """
+    if count <= 0:
+        return []
+    if len(names) > 4 * (count + len(excluded)):
+        picked: list[str] = []
+        seen: set[int] = set()
+        for _ in range(8 * count):
+            index = rng.randrange(len(names))
+            if index in seen:
+                continue
+            seen.add(index)
+            if normalize_name(names[index]) in excluded:
+                continue
+            picked.append(names[index])
+            if len(picked) == count:
+                return picked
+    pool = [name for name in names if normalize_name(name) not in excluded]
+    return rng.sample(pool, min(count, len(pool)))
 
 
 def generate_route(origin: str, destination: str, max_stops: int = 5, seed: int = None) -> list[str]:
@@ -8,43 +149,30 @@ def generate_route(origin: str, destination: str, max_stops: int = 5, seed: int
     Generates a country-to-country route using pycountry.
     Both origin and destination should be two-letter country codes (e.g., "US", "MX").
     """
-    if seed is not None:
-        random.seed(seed)
+    import pycountry
+    rng = random.Random(seed)
     all_countries = [country.alpha_2 for country in pycountry.countries]
     candidates = [code for code in all_countries if code not in (
         origin, destination)]
-    random.shuffle(candidates)
-    num_stops = random.randint(0, max_stops)
-    return [origin] + candidates[:num_stops] + [destination]
+    num_stops = rng.randint(0, max_stops)
+    return [origin] + rng.sample(candidates, num_stops) + [destination]
 
 
-def generate_city_route(origin_city: str, destination_city: str, max_stops: int = 5, seed: int = None) -> list[str]:
+def generate_city_route(origin_city: str, destination_city: str, max_stops: int = 5, seed: int = None, country_code: str | None = None) -> list[str]:
     """
     Generates a city-to-city route using geonamescache.
 
-    It first tries to identify the country code for the origin city.
-    If found, it gathers all cities in that country; if not, it falls back on a static list.
-    """
-    if seed is not None:
-        random.seed(seed)
-    gc = geonamescache.GeonamesCache()
-    cities = gc.get_cities()
-
-    origin_country = None
-    for city_info in cities.values():
-        if city_info['name'].lower() == origin_city.lower():
-            origin_country = city_info['countrycode']
-            break
-
-    if origin_country:
-        candidates = [city_info['name'] for city_info in cities.values(
-        ) if city_info['countrycode'] == origin_country]
-    else:
-        candidates = ["San Francisco", "San Jose",
-                      "Los Angeles", "Sacramento", "Oakland"]
-
-    candidates = [city for city in candidates if city.lower() not in (
-        origin_city.lower(), destination_city.lower())]
-    random.shuffle(candidates)
-    num_stops = random.randint(0, max_stops)
-    return [origin_city] + candidates[:num_stops] + [destination_city]
+    It samples stops among the cities of country_code or, when not given,
+    of the country it finds for the origin city's name; failing both, it
+    falls back on a static list.
+    """
+    rng = random.Random(seed)
+    index = get_city_index()
+
+    origin_country = country_code if country_code in index.by_country else index.country_of(origin_city)
+    candidates = index.city_names(
+        origin_country) if origin_country else FALLBACK_CITIES
+
+    excluded = {normalize_name(origin_city), normalize_name(destination_city)}
+    num_stops = rng.randint(0, max_stops)
+    return [origin_city] + _sample_stops(rng, candidates, excluded, num_stops) + [destination_city]
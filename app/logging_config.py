@@ -1,24 +1,162 @@
+import atexit
+import itertools
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-import json
 from datetime import datetime, timezone
+from app.core.config import settings
+
+try:
+    import orjson
+
+    def _dumps(record: dict) -> bytes:
+        return orjson.dumps(record, default=str)
+except ImportError:
+    import json
+
+    def _dumps(record: dict) -> bytes:
+        return json.dumps(record, default=str).encode()
 
 
 class JsonFormatter(logging.Formatter):
     def format(self, record):
         log_record = {
-            "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat() + "Z",
             "level": record.levelname,
             "module": record.module,
             "message": record.getMessage(),
             "line_no": record.lineno,
         }
-        return json.dumps(log_record)
+        if record.exc_text:
+            log_record["exception"] = record.exc_text
+        elif record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        return _dumps(log_record).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every 1/rate records below WARNING for the configured
+    loggers (and their children); warnings and errors always pass.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: dict[str, itertools.count] = {}
+        self._every: dict[str, int] = {}
+
+    def _every_for(self, name: str) -> int:
+        every = self._every.get(name)
+        if every is None:
+            every = 1
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    every = max(round(1 / rate), 1) if rate > 0 else 0
+                    break
+                prefix = prefix.rpartition(".")[0]
+            # The counter goes in first: once _every has the name, other
+            # threads skip this branch and read _counters directly.
+            self._counters.setdefault(name, itertools.count())
+            self._every[name] = every
+        return every
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        every = self._every_for(record.name)
+        if every == 1:
+            return True
+        if every == 0:
+            return False
+        return next(self._counters[record.name]) % every == 0
+
+
+class TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread after the minimum of work on the
+    calling thread: the message is rendered (so mutable arguments are
+    captured), cut to `max_length` characters, and exception text is
+    attached. JSON encoding and the stream write happen on the listener.
+    """
+
+    def __init__(self, log_queue, max_length: int):
+        super().__init__(log_queue)
+        self.max_length = max_length
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if self.max_length and len(message) > self.max_length:
+            message = f"{message[:self.max_length]}... [{len(message) - self.max_length} chars truncated]"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
 
 
-def configure_logging():
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JsonFormatter())
+def _parse_rates(spec: str) -> dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+_listener: logging.handlers.QueueListener | None = None
+_handler: logging.Handler | None = None
+
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """
+    Routes all records through a queue to a background thread that formats
+    them as JSON and writes them to stdout.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    _handler = TruncatingQueueHandler(
+        log_queue, settings.LOG_MAX_MESSAGE_LENGTH)
+    _handler.addFilter(SamplingFilter(
+        _parse_rates(settings.LOG_SAMPLE_RATES)))
+
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
+    logger.setLevel(settings.LOG_LEVEL)
+    logger.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(log_queue, stream)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging() -> None:
+    """
+    Flushes queued records and stops the listener thread.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        _listener = _handler = None
+
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork(); a child that inherited a
+    # configured root logger would queue records that nobody writes.
+    global _listener, _handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_handler)
+        _listener = _handler = None
+        configure_logging()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
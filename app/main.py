@@ -1,16 +1,67 @@
+import time
+_started = time.perf_counter()
+
 import asyncio
-from app.consumer.consumer import start_consumer
+import signal
+from app.consumer.consumer import start_consumer, stop_consumer
 from app.messaging.publisher import publisher
+from app.messaging.outbox_relay import outbox_relay
+from app.services.dedup import deduplicator
+from app.services.slot_provisioning import check_provisioning, run_provisioner
 from app.core.config import settings
-from app.logging_config import configure_logging
+from app.logging_config import configure_logging, stop_logging
+from app.domain.geocode_cache import geocode_cache
+from app.core.http_server import http_server
+from app.services.availability import run_reconciler
+from app.core.startup import StartupTimer, warm_geodata
+from app.db.schema import check_schema
 
 configure_logging()
+startup = StartupTimer(_started)
+startup.mark("imports")
 
 
 async def main():
+    if settings.PROVISION_ENABLED:
+        check_provisioning()
+    await asyncio.to_thread(check_schema)
+    startup.mark("schema")
     await publisher.connect()
+    startup.mark("publisher")
+    if settings.METRICS_ENABLED:
+        await http_server.start(settings.METRICS_HOST, settings.METRICS_PORT)
+    background = []
+    if settings.OUTBOX_ENABLED:
+        background.append(asyncio.create_task(outbox_relay.run()))
+    if settings.DEDUP_ENABLED:
+        background.append(asyncio.create_task(deduplicator.run_pruner()))
+    if settings.PROVISION_ENABLED:
+        background.append(asyncio.create_task(run_provisioner()))
+    if settings.METRICS_ENABLED and settings.AVAILABILITY_ENABLED:
+        background.append(asyncio.create_task(run_reconciler()))
+    if settings.GEOCODE_CACHE_SNAPSHOT:
+        background.append(asyncio.create_task(
+            geocode_cache.run_snapshots(settings.GEOCODE_CACHE_SNAPSHOT_INTERVAL)))
+    if settings.GEODATA_WARMUP:
+        await asyncio.to_thread(warm_geodata)
+        startup.mark("geodata")
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
     await start_consumer()
-    await asyncio.Event().wait()
+    startup.mark("consumer")
+    startup.report()
+    try:
+        await stopping.wait()
+    finally:
+        await stop_consumer()
+        for task in background:
+            task.cancel()
+        await publisher.close()
+        await http_server.stop()
+        await asyncio.to_thread(geocode_cache.save)
+        stop_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
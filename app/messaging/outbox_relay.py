@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.transactions import run_transaction_async
+from app.messaging.publisher import publisher
+from app.services.outbox import claim_batch, delete_events, release_events
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Drains the outbox table to the broker. Each round leases up to
+    `batch_size` rows in a short transaction (FOR UPDATE SKIP LOCKED, so
+    several relays can run side by side), publishes them and waits for
+    broker confirms outside any transaction, then deletes the confirmed rows
+    and releases the rest for the next round in a second one.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float, lease_seconds: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """
+        Signals that new rows were committed, cutting the poll wait short.
+        """
+        self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        async with AsyncSessionLocal() as db:
+            async def claim():
+                return (await db.execute(claim_batch(self.batch_size, self.lease_seconds))).all()
+            events = sorted(await run_transaction_async(db, claim, "outbox_claim"),
+                            key=lambda event: event.created_at)
+            if not events:
+                return 0
+
+            confirmations = []
+            for event in events:
+                try:
+                    confirmations.append(await publisher.publish_event(event.payload, routing_key=event.routing_key))
+                except Exception as e:
+                    confirmations.append(None)
+                    logger.error(
+                        f"[outbox] Could not publish event {event.id}: {e}")
+            results = await asyncio.gather(
+                *(c for c in confirmations if c is not None), return_exceptions=True)
+
+            outcome = iter(results)
+            sent, failed = [], []
+            for event, confirmation in zip(events, confirmations):
+                if confirmation is not None and not isinstance(next(outcome), Exception):
+                    sent.append(event.id)
+                else:
+                    failed.append(event.id)
+
+            async def settle():
+                if sent:
+                    await db.execute(delete_events(sent))
+                if failed:
+                    await db.execute(release_events(failed))
+            await run_transaction_async(db, settle, "outbox_settle")
+        if failed:
+            logger.warning(
+                f"[outbox] {len(failed)} of {len(events)} events left for retry")
+        return len(sent)
+
+    async def run(self) -> None:
+        logger.info("[outbox] Relay started")
+        while True:
+            # Cleared before draining: a notify() that lands while the round
+            # runs keeps the event set, so the wait below returns at once.
+            self._wakeup.clear()
+            try:
+                drained = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[outbox] Relay round failed: {e}")
+                drained = 0
+            if drained < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+outbox_relay = OutboxRelay(
+    settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_POLL_INTERVAL, settings.OUTBOX_LEASE_SECONDS)
@@ -1,19 +1,44 @@
+import asyncio
 import json
 import aio_pika
 import logging
 from app.core.config import settings
+from app.core.metrics import count_retry, stage_timer
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 logger = logging.getLogger(__name__)
 
 
+def _retrieve_exception(future: asyncio.Future) -> None:
+    # Callers may fire and forget; failures are already logged in _send.
+    if not future.cancelled():
+        future.exception()
+
+
 class EventPublisher:
+    """
+    Publishes events to the topic exchange.
+
+    In "simple" mode every publish_event call publishes (with retries) before
+    returning. In "pipelined" mode messages are spread over a small pool of
+    publisher-confirm channels and publish_event returns as soon as the
+    message is queued: the returned future resolves when the broker confirms
+    it. At most `max_outstanding` messages may be unconfirmed at once.
+    """
+
     def __init__(self):
         self.url = settings.RABBITMQ_URL
         self.connection = None
         self.channel = None
         self.exchange = None
         self.exchange_name = settings.EXCHANGE_NAME
+        self.mode = settings.PUBLISHER_MODE
+        self.pool_size = settings.PUBLISHER_CHANNELS
+        self.exchanges = []
+        self._next_exchange = 0
+        self._outstanding = asyncio.Semaphore(
+            settings.PUBLISHER_MAX_OUTSTANDING)
+        self._inflight: set[asyncio.Task] = set()
 
     async def connect(self):
         try:
@@ -24,6 +49,11 @@ class EventPublisher:
             self.exchange = await self.channel.declare_exchange(
                 self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True
             )
+            self.exchanges = [self.exchange]
+            if self.mode == "pipelined":
+                for _ in range(self.pool_size - 1):
+                    channel = await self.connection.channel(publisher_confirms=True)
+                    self.exchanges.append(await channel.get_exchange(self.exchange_name, ensure=False))
             logger.info(
                 "Traffic Service connected to RabbitMQ and declared exchange.")
         except Exception as e:
@@ -31,23 +61,71 @@ class EventPublisher:
                 f"Traffic Service failed to connect to RabbitMQ: {e}")
             raise
 
-    @retry(wait=wait_exponential(multiplier=1, min=1, max=10), stop=stop_after_attempt(5))
-    async def publish_event(self, message: dict, routing_key: str = "route.update"):
+    async def publish_event(self, message: dict, routing_key: str = "route.update") -> asyncio.Future:
+        """
+        Returns a future that resolves once the broker has the message.
+        """
+        if self.mode == "pipelined":
+            return await self._enqueue(message, routing_key)
+        await self._publish_now(message, routing_key)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    @retry(wait=wait_exponential(multiplier=1, min=1, max=10), stop=stop_after_attempt(5),
+           before_sleep=count_retry("publish_event"))
+    async def _publish_now(self, message: dict, routing_key: str):
         if not self.exchange:
             await self.connect()
         try:
             body = json.dumps(message, default=str).encode()
-            await self.exchange.publish(
-                aio_pika.Message(body=body),
-                routing_key=routing_key
-            )
+            with stage_timer("publish"):
+                await self.exchange.publish(
+                    aio_pika.Message(body=body),
+                    routing_key=routing_key
+                )
             logger.info(
-                f"Traffic Service published event: {message} with key: {routing_key}")
+                f"Traffic Service published event with key: {routing_key}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Published message body: {message}")
         except Exception as e:
             logger.exception(f"Traffic Service error publishing event: {e}")
             raise
 
+    async def _enqueue(self, message: dict, routing_key: str) -> asyncio.Future:
+        if not self.exchanges:
+            await self.connect()
+        body = json.dumps(message, default=str).encode()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        await self._outstanding.acquire()
+        task = asyncio.create_task(self._send(body, routing_key, future))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        return future
+
+    async def _send(self, body: bytes, routing_key: str, future: asyncio.Future) -> None:
+        exchange = self.exchanges[self._next_exchange % len(self.exchanges)]
+        self._next_exchange += 1
+        try:
+            with stage_timer("publish"):
+                await exchange.publish(aio_pika.Message(body=body), routing_key=routing_key)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"Traffic Service confirmed event with key: {routing_key}")
+            if not future.done():
+                future.set_result(None)
+        except Exception as e:
+            logger.error(
+                f"Traffic Service error publishing event with key {routing_key}: {e}")
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._outstanding.release()
+
     async def close(self):
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
         if self.connection:
             await self.connection.close()
             logger.info("Traffic Service RabbitMQ connection closed.")
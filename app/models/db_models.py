@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, Enum, Float, Integer, ForeignKey, JSON, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Enum, Float, Integer, ForeignKey, JSON, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
 import enum
@@ -46,8 +46,28 @@ class Slot(Base):
     slots = Column(Integer, nullable=False)
     reserved = Column(Integer, nullable=False, default=0)
     continent = Column(String, nullable=True)
+    replicated_continents = Column(ARRAY(String), nullable=True)
+    # Number of slot_stripes rows holding the counters; NULL while slots and
+    # reserved above are the counters.
+    stripes = Column(Integer, nullable=True)
     __table_args__ = (UniqueConstraint('region_identifier',
-                      'slot_time', name='uix_region_time'),)
+                      'slot_time', name='uix_region_time'),
+                      Index('ix_slots_replicated_continents', 'replicated_continents',
+                            postgresql_using='gin'),)
+
+
+class SlotStripe(Base):
+    __tablename__ = "slot_stripes"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    region_type = Column(Enum(RegionType), nullable=False)
+    region_identifier = Column(String, nullable=False)
+    slot_time = Column(DateTime, nullable=False)
+    stripe = Column(Integer, nullable=False)
+    slots = Column(Integer, nullable=False)
+    reserved = Column(Integer, nullable=False, default=0)
+    __table_args__ = (UniqueConstraint('region_identifier', 'slot_time',
+                      'stripe', name='uix_stripe_region_time'),)
 
 
 class Route(Base):
@@ -57,4 +77,32 @@ class Route(Base):
     journey_id = Column(UUID(as_uuid=True), ForeignKey(
         "journeys.journey_id"), nullable=False)
     route = Column(JSON, nullable=False)
+    region_type = Column(Enum(RegionType), nullable=True)
+    slot_time = Column(DateTime, nullable=True)
+    continents = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    routing_key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True,
+                        default=lambda: datetime.now(timezone.utc))
+    # Set while a relay is publishing the row; expired leases are reclaimed.
+    claimed_until = Column(DateTime, nullable=True)
+
+
+class ProcessedEvent(Base):
+    __tablename__ = "processed_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    journey_id = Column(UUID(as_uuid=True), nullable=False)
+    event_type = Column(String, nullable=False)
+    event_timestamp = Column(DateTime, nullable=False)
+    processed_at = Column(DateTime, nullable=False, index=True,
+                          default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (UniqueConstraint('journey_id', 'event_type',
+                      'event_timestamp', name='uix_processed_event'),)
@@ -1,8 +1,11 @@
-from pydantic import BaseModel
+import logging
+from pydantic import BaseModel, ValidationError
 from typing import List
 from uuid import UUID
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 const_events = {'journey.booked': "journey.booked.v1", 'journey.canceled': 'journey.canceled.v1',
                 'journey.approved': 'journey.approved.v1', 'journey.rejected': 'journey.rejected.v1'}
@@ -44,3 +47,55 @@ class JourneyRejectedEvent(BaseModel):
     user_id: str
     scheduled_time: datetime
     timestamp: datetime
+
+
+class UnknownEventType(ValueError):
+    pass
+
+
+# Events the traffic service consumes, by routing key / event_type.
+EVENT_MODELS: dict[str, type[BaseModel]] = {
+    const_events['journey.booked']: JourneyBookedEvent,
+    const_events['journey.canceled']: JourneyCanceledEvent,
+}
+
+
+class _EventEnvelope(BaseModel):
+    event_type: str
+
+
+def _declared_event_type(body: bytes) -> str | None:
+    try:
+        return _EventEnvelope.model_validate_json(body).event_type
+    except ValidationError:
+        return None
+
+
+def decode_event(body: bytes, routing_key: str) -> JourneyBookedEvent | JourneyCanceledEvent:
+    """
+    Validates a message body straight from bytes into the model for its
+    event_type. The routing key's model is tried first; a body declaring
+    another event type is decoded and dispatched as that type. Raises
+    UnknownEventType for event types we do not consume and
+    pydantic.ValidationError for malformed bodies.
+    """
+    model = EVENT_MODELS.get(routing_key)
+    if model is None:
+        event_type = _EventEnvelope.model_validate_json(body).event_type
+    else:
+        try:
+            event = model.model_validate_json(body)
+        except ValidationError:
+            event_type = _declared_event_type(body)
+            if event_type is None or event_type == routing_key:
+                raise
+        else:
+            if event.event_type == routing_key:
+                return event
+            event_type = event.event_type
+    logger.debug(
+        f"[events] Event type {event_type} does not match routing key {routing_key}, dispatching on the event type")
+    model = EVENT_MODELS.get(event_type)
+    if model is None:
+        raise UnknownEventType(f"No event model for event type {event_type}")
+    return model.model_validate_json(body)
@@ -0,0 +1,273 @@
+import asyncio
+import bisect
+import json
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, func, select, text
+from app.core.config import settings
+from app.core.http_server import Response, http_server
+from app.db.database import AsyncSessionLocal
+from app.models.db_models import RegionType, Slot, SlotStripe
+
+logger = logging.getLogger(__name__)
+
+# How long adjustments are kept for replay over a reconcile snapshot read in
+# the past; follower reads lag by about 5s.
+_JOURNAL_SECONDS = 60
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class AvailabilityView:
+    """
+    In-memory aggregate of slot availability, (region, slot_time) ->
+    (region type, continent, slots, reserved), for the read API.
+
+    Committed reservations and releases adjust it in place; reconcile()
+    replaces it with a read of the slots inside the horizon, which also
+    picks up slots created since (adjustments to unknown slots are dropped
+    until then). The read may be taken slightly in the past, so adjustments
+    made after its timestamp are kept in a short journal and re-applied on
+    top of it. Reads never touch the database.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple[str, datetime], list] = {}
+        self._by_time: dict[datetime, set[str]] = {}
+        self._times: list[datetime] = []
+        self._journal: deque[tuple[datetime, Counter, datetime, int]] = deque()
+        self._lock = threading.Lock()
+        self.reconciled_at: datetime | None = None
+
+    def replace(self, rows, read_at: datetime | None = None) -> None:
+        """
+        Swaps in rows of (region_type, region, slot_time, continent, slots,
+        reserved) as of read_at (UTC), re-applying the adjustments made
+        after it.
+        """
+        entries, by_time = {}, {}
+        for region_type, region, slot_time, continent, slots, reserved in rows:
+            slot_time = _utc_naive(slot_time)
+            entries[(region, slot_time)] = [
+                region_type.value, continent or "Unknown", int(slots), int(reserved)]
+            by_time.setdefault(slot_time, set()).add(region)
+        read_at = _utc_naive(read_at or datetime.now(timezone.utc))
+        with self._lock:
+            for adjusted_at, counts, slot_time, delta in self._journal:
+                if adjusted_at > read_at:
+                    self._apply_locked(entries, counts, slot_time, delta)
+            self._entries, self._by_time = entries, by_time
+            self._times = sorted(by_time)
+            self.reconciled_at = datetime.now(timezone.utc)
+
+    def adjust(self, regions: list[str], slot_time: datetime, delta: int) -> None:
+        """
+        Applies a committed reservation (+1 per occurrence of a region) or
+        release (-1) to the slots already known.
+        """
+        slot_time = _utc_naive(slot_time)
+        counts = Counter(regions)
+        now = _utc_naive(datetime.now(timezone.utc))
+        with self._lock:
+            self._apply_locked(self._entries, counts, slot_time, delta)
+            self._journal.append((now, counts, slot_time, delta))
+            cutoff = now - timedelta(seconds=_JOURNAL_SECONDS)
+            while self._journal[0][0] < cutoff:
+                self._journal.popleft()
+
+    @staticmethod
+    def _apply_locked(entries: dict, counts: Counter, slot_time: datetime, delta: int) -> None:
+        for region, count in counts.items():
+            entry = entries.get((region, slot_time))
+            if entry is not None:
+                entry[3] = min(max(entry[3] + delta * count, 0), entry[2])
+
+    def regions(self, start: datetime, end: datetime, region_type: str | None = None,
+                regions: set[str] | None = None, continent: str | None = None) -> list[dict]:
+        """
+        Availability of every known slot with start <= slot_time < end,
+        ordered by time and region.
+        """
+        result = []
+        with self._lock:
+            low = bisect.bisect_left(self._times, start)
+            high = bisect.bisect_left(self._times, end)
+            for slot_time in self._times[low:high]:
+                for region in sorted(self._by_time[slot_time]):
+                    if regions is not None and region not in regions:
+                        continue
+                    kind, region_continent, slots, reserved = self._entries[(region, slot_time)]
+                    if region_type is not None and kind != region_type:
+                        continue
+                    if continent is not None and region_continent != continent:
+                        continue
+                    result.append({
+                        "region": region,
+                        "region_type": kind,
+                        "continent": region_continent,
+                        "slot_time": slot_time.isoformat(),
+                        "slots": slots,
+                        "reserved": reserved,
+                        "available": slots - reserved,
+                    })
+        return result
+
+    def continents(self, start: datetime, end: datetime, region_type: str | None = None) -> list[dict]:
+        """
+        Per continent and slot_time totals over the regions of regions().
+        """
+        totals: dict[tuple[str, str], dict] = {}
+        for row in self.regions(start, end, region_type):
+            key = (row["slot_time"], row["continent"])
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = {"continent": row["continent"], "slot_time": row["slot_time"],
+                                       "regions": 0, "slots": 0, "reserved": 0, "available": 0}
+            total["regions"] += 1
+            total["slots"] += row["slots"]
+            total["reserved"] += row["reserved"]
+            total["available"] += row["available"]
+        return [totals[key] for key in sorted(totals)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "slots": len(self._entries),
+                "slot_times": len(self._times),
+                "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+            }
+
+
+availability = AvailabilityView()
+
+
+def _horizon(now: datetime) -> tuple[datetime, datetime]:
+    now = _utc_naive(now)
+    return (now - timedelta(hours=1),
+            now + timedelta(hours=settings.AVAILABILITY_HORIZON_HOURS))
+
+
+def _snapshot_query(start: datetime, end: datetime):
+    """
+    Slots in [start, end) with their totals, summed over stripes where the
+    slot is striped.
+    """
+    totals = select(
+        SlotStripe.region_identifier,
+        SlotStripe.slot_time,
+        func.sum(SlotStripe.slots).label("slots"),
+        func.sum(SlotStripe.reserved).label("reserved")
+    ).where(
+        SlotStripe.slot_time >= start,
+        SlotStripe.slot_time < end
+    ).group_by(SlotStripe.region_identifier, SlotStripe.slot_time).subquery()
+    return select(
+        Slot.region_type,
+        Slot.region_identifier,
+        Slot.slot_time,
+        Slot.continent,
+        func.coalesce(totals.c.slots, Slot.slots),
+        func.coalesce(totals.c.reserved, Slot.reserved)
+    ).outerjoin(totals, and_(
+        totals.c.region_identifier == Slot.region_identifier,
+        totals.c.slot_time == Slot.slot_time
+    )).where(
+        Slot.slot_time >= start,
+        Slot.slot_time < end
+    )
+
+
+async def reconcile() -> int:
+    """
+    Reloads the view from the database. On CockroachDB the read runs as a
+    follower read, slightly in the past, so it never conflicts with or
+    waits on bookings writing the same rows; adjustments committed since
+    that timestamp are re-applied over it.
+    """
+    start, end = _horizon(datetime.now(timezone.utc))
+    read_at = None
+    async with AsyncSessionLocal() as db:
+        if settings.AVAILABILITY_FOLLOWER_READS and db.bind.dialect.name == "cockroachdb":
+            async with db.begin():
+                read_at = (await db.execute(text("SELECT follower_read_timestamp()"))).scalar_one()
+        async with db.begin():
+            if read_at is not None:
+                await db.execute(text(
+                    f"SET TRANSACTION AS OF SYSTEM TIME '{_utc_naive(read_at).isoformat(sep=' ')}'"))
+            rows = (await db.execute(_snapshot_query(start, end))).all()
+    availability.replace(rows, read_at)
+    return len(rows)
+
+
+async def run_reconciler() -> None:
+    while True:
+        try:
+            count = await reconcile()
+            logger.info(f"[availability] Reconciled {count} slots")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[availability] Reconciliation failed: {e}")
+        await asyncio.sleep(settings.AVAILABILITY_RECONCILE_INTERVAL)
+
+
+def _json(status: int, body) -> Response:
+    return status, "application/json", json.dumps(body).encode()
+
+
+def _time_range(query: dict[str, list[str]]) -> tuple[datetime, datetime]:
+    now = datetime.now(timezone.utc)
+    start = query.get("from", [None])[0]
+    end = query.get("to", [None])[0]
+    start = _utc_naive(datetime.fromisoformat(start)) if start else _utc_naive(now)
+    end = _utc_naive(datetime.fromisoformat(end)) if end else start + timedelta(hours=24)
+    return start, end
+
+
+def _region_type(query: dict[str, list[str]]) -> str | None:
+    value = query.get("region_type", [None])[0]
+    if value is not None:
+        RegionType(value)
+    return value
+
+
+@http_server.route("/availability/regions")
+async def region_availability(query: dict[str, list[str]]) -> Response:
+    """
+    ?from=&to= (ISO 8601, default the next 24h; write offsets as Z or
+    %2B00:00), optional region_type, continent and repeated region.
+    """
+    try:
+        start, end = _time_range(query)
+        region_type = _region_type(query)
+    except ValueError as e:
+        return _json(400, {"error": str(e)})
+    regions = set(query["region"]) if "region" in query else None
+    continent = query.get("continent", [None])[0]
+    return _json(200, {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "reconciled_at": availability.stats()["reconciled_at"],
+        "slots": availability.regions(start, end, region_type, regions, continent),
+    })
+
+
+@http_server.route("/availability/continents")
+async def continent_availability(query: dict[str, list[str]]) -> Response:
+    try:
+        start, end = _time_range(query)
+        region_type = _region_type(query)
+    except ValueError as e:
+        return _json(400, {"error": str(e)})
+    return _json(200, {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "reconciled_at": availability.stats()["reconciled_at"],
+        "continents": availability.continents(start, end, region_type),
+    })
@@ -0,0 +1,79 @@
+import math
+import random
+import threading
+from app.core.config import settings
+from app.domain.geodata import get_countries, normalize_name
+from app.domain.route_generator import get_city_index
+from app.models.db_models import RegionType
+
+
+class CapacityPolicy:
+    """
+    Decides how many slots a newly created slot row gets. Subclasses
+    override capacity(); the region identifier is a city name for city
+    slots and a two-letter country code for country slots.
+    """
+
+    def capacity(self, region_type: RegionType, region_identifier: str | None = None) -> int:
+        raise NotImplementedError
+
+
+class RandomCapacityPolicy(CapacityPolicy):
+    """
+    The original behaviour: 3-10 slots per city, 30-100 per country.
+    """
+
+    def capacity(self, region_type: RegionType, region_identifier: str | None = None) -> int:
+        return random.randint(
+            3, 10) if region_type == RegionType.city else random.randint(30, 100)
+
+
+class PopulationCapacityPolicy(CapacityPolicy):
+    """
+    Scales capacity with the logarithm of the region's population, within
+    the same ranges as the random policy. Unknown regions get the minimum.
+    """
+
+    RANGES = {
+        RegionType.city: (3, 10, 7.0),
+        RegionType.country: (30, 100, 9.0),
+    }
+
+    def capacity(self, region_type: RegionType, region_identifier: str | None = None) -> int:
+        low, high, full_scale = self.RANGES[region_type]
+        population = self._population(region_type, region_identifier)
+        if population <= 1:
+            return low
+        share = min(math.log10(population) / full_scale, 1.0)
+        return low + round((high - low) * share)
+
+    def _population(self, region_type: RegionType, region_identifier: str | None) -> int:
+        if not region_identifier:
+            return 0
+        if region_type == RegionType.country:
+            country = get_countries().get(region_identifier)
+            return int(country.get("population") or 0) if country else 0
+        records = get_city_index().by_name.get(normalize_name(region_identifier))
+        return records[0]["population"] if records else 0
+
+
+CAPACITY_POLICIES: dict[str, type[CapacityPolicy]] = {
+    "random": RandomCapacityPolicy,
+    "population": PopulationCapacityPolicy,
+}
+
+_policy: CapacityPolicy | None = None
+_policy_lock = threading.Lock()
+
+
+def register_capacity_policy(name: str, policy: type[CapacityPolicy]) -> None:
+    CAPACITY_POLICIES[name] = policy
+
+
+def get_capacity_policy() -> CapacityPolicy:
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = CAPACITY_POLICIES[settings.SLOT_CAPACITY_POLICY]()
+    return _policy
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.db.database import SessionLocal, AsyncSessionLocal
+from app.models.db_models import ProcessedEvent
+from app.models.events import JourneyBookedEvent, JourneyCanceledEvent
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def event_key(event: JourneyBookedEvent | JourneyCanceledEvent) -> tuple[uuid.UUID, str, datetime]:
+    """
+    (journey_id, event_type, timestamp) identifying an event.
+    """
+    return event.journey_id, event.event_type, _utc_naive(event.timestamp)
+
+
+def _claim_statement(key: tuple[uuid.UUID, str, datetime]):
+    journey_id, event_type, event_timestamp = key
+    return insert(ProcessedEvent).values(
+        id=uuid.uuid4(),
+        journey_id=journey_id,
+        event_type=event_type,
+        event_timestamp=event_timestamp,
+        processed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    ).on_conflict_do_nothing(
+        index_elements=["journey_id", "event_type", "event_timestamp"]
+    ).returning(ProcessedEvent.id)
+
+
+def _exists_statement(key: tuple[uuid.UUID, str, datetime]):
+    journey_id, event_type, event_timestamp = key
+    return select(ProcessedEvent.id).where(
+        ProcessedEvent.journey_id == journey_id,
+        ProcessedEvent.event_type == event_type,
+        ProcessedEvent.event_timestamp == event_timestamp,
+    ).limit(1)
+
+
+def _exists_sync(key) -> bool:
+    with SessionLocal() as db:
+        return db.execute(_exists_statement(key)).first() is not None
+
+
+class DuplicateEvent(Exception):
+    """
+    Another delivery of the event committed its outcome first; the
+    transaction recording this one must be rolled back.
+    """
+
+    def __init__(self, key: tuple):
+        super().__init__(f"Event {key} was already processed")
+        self.key = key
+
+
+def record_processed(db, key: tuple | None) -> None:
+    """
+    Records the event as processed in the caller's transaction, the one
+    committing its outcome, so a crash before that commit leaves the event
+    to be handled again on redelivery. Raises DuplicateEvent if another
+    delivery already committed it.
+    """
+    if key is not None and db.execute(_claim_statement(key)).scalar_one_or_none() is None:
+        raise DuplicateEvent(key)
+
+
+async def record_processed_async(db, key: tuple | None) -> None:
+    if key is not None and (await db.execute(_claim_statement(key))).scalar_one_or_none() is None:
+        raise DuplicateEvent(key)
+
+
+def record_processed_many(db, keys: list[tuple]) -> None:
+    """
+    record_processed for several events in one statement.
+    """
+    if keys:
+        _check_recorded(keys, db.execute(_claim_many_statement(keys)).all())
+
+
+async def record_processed_many_async(db, keys: list[tuple]) -> None:
+    if keys:
+        _check_recorded(keys, (await db.execute(_claim_many_statement(keys))).all())
+
+
+def _claim_many_statement(keys: list[tuple]):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return insert(ProcessedEvent).values([
+        {"id": uuid.uuid4(), "journey_id": journey_id, "event_type": event_type,
+         "event_timestamp": event_timestamp, "processed_at": now}
+        for journey_id, event_type, event_timestamp in dict.fromkeys(keys)
+    ]).on_conflict_do_nothing(
+        index_elements=["journey_id", "event_type", "event_timestamp"]
+    ).returning(ProcessedEvent.journey_id, ProcessedEvent.event_type, ProcessedEvent.event_timestamp)
+
+
+def _check_recorded(keys: list[tuple], rows) -> None:
+    inserted = {tuple(row) for row in rows}
+    for key in keys:
+        if key not in inserted:
+            raise DuplicateEvent(key)
+        inserted.discard(key)
+
+
+class EventDeduplicator:
+    """
+    Remembers which events were already handled so redeliveries are acked
+    without touching slots. Recent keys live in an in-memory LRU; the
+    processed_events table (unique on the key) is the durable record, shared
+    by all consumers and surviving restarts. Rows are written by
+    record_processed in the transaction committing the event's outcome, and
+    keys enter the LRU only once that transaction has committed.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._seen: OrderedDict[tuple, None] = OrderedDict()
+
+    def remember(self, key: tuple) -> None:
+        self._seen[key] = None
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    async def seen(self, event: JourneyBookedEvent | JourneyCanceledEvent) -> bool:
+        """
+        Returns True if this event was already processed, False if it
+        should be handled. Concurrent deliveries of a new event all get
+        False; record_processed lets only one of them commit.
+        """
+        key = event_key(event)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            self.memory_hits += 1
+            return True
+
+        if settings.DB_ASYNC:
+            async with AsyncSessionLocal() as db:
+                processed = (await db.execute(_exists_statement(key))).first() is not None
+        else:
+            processed = await asyncio.to_thread(_exists_sync, key)
+
+        if processed:
+            self.remember(key)
+            self.db_hits += 1
+        else:
+            self.misses += 1
+        return processed
+
+    def clear(self) -> None:
+        self._seen.clear()
+        self.memory_hits = self.db_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._seen),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+    async def prune(self, retention: timedelta) -> None:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - retention
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ProcessedEvent).where(ProcessedEvent.processed_at < cutoff))
+            await db.commit()
+
+    async def run_pruner(self) -> None:
+        retention = timedelta(hours=settings.DEDUP_RETENTION_HOURS)
+        while True:
+            try:
+                await self.prune(retention)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[dedup] Pruning processed events failed: {e}")
+            await asyncio.sleep(3600)
+
+
+deduplicator = EventDeduplicator(settings.DEDUP_CACHE_SIZE)
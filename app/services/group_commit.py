@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from datetime import datetime
+from app.core.config import settings
+from app.core.metrics import GROUP_COMMIT_SIZE
+from app.db.database import AsyncSessionLocal, SessionLocal
+from app.domain.geocode_batcher import geocode_batcher
+from app.models.db_models import RegionType
+from app.services.dedup import DuplicateEvent
+from app.services.saga_orchestrator import GroupedReservation, saga_reservation, saga_reservation_async, saga_reservation_group, saga_reservation_group_async
+
+logger = logging.getLogger(__name__)
+
+
+def _commit_sync(reservations: list[GroupedReservation]) -> list[bool]:
+    with SessionLocal() as db:
+        return saga_reservation_group(db, reservations)
+
+
+def _reserve_one_sync(reservation: GroupedReservation) -> bool:
+    with SessionLocal() as db:
+        return saga_reservation(db, *_saga_args(reservation))
+
+
+def _saga_args(reservation: GroupedReservation) -> tuple:
+    return (reservation.journey_id, reservation.steps, reservation.region_type, reservation.route,
+            reservation.slot_time, reservation.approved_event, reservation.replicate_to,
+            reservation.processed)
+
+
+class GroupCommitter:
+    """
+    Group commit for slot reservations. Bookings handled concurrently queue
+    their reservation here; one group is committed at a time, with
+    saga_reservation_group, and it takes every reservation queued (up to
+    `max_batch`) once the first has waited `window` seconds or the previous
+    group has finished. Groups are committed in arrival order, so outcomes
+    match reserving one journey after another.
+
+    If a group's transaction fails outright, its reservations are retried
+    one by one through saga_reservation so one bad booking cannot fail the
+    others; a booking event another delivery already processed raises
+    DuplicateEvent there, as it would through saga_reservation.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[GroupedReservation, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._committing: asyncio.Task | None = None
+
+    async def reserve(self, journey_id, steps: list[dict], region_type: RegionType, route: list[str], slot_time: datetime, approved_event: tuple[str, dict] | None = None, replicate_to: list[str] | None = None, processed: tuple | None = None) -> bool:
+        """
+        Same arguments and outcome as saga_reservation, without the session.
+        """
+        continents = {step["region"]: step.get("continent") for step in steps}
+        if region_type == RegionType.city:
+            missing = [region for region, continent in continents.items() if not continent]
+            continents.update(await geocode_batcher.city_continents(missing))
+        reservation = GroupedReservation(
+            journey_id, steps, region_type, route, slot_time, continents, approved_event, replicate_to, processed)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((reservation, future))
+        if self._committing is None:
+            if len(self._pending) >= self.max_batch or self.window <= 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._committing is not None or not self._pending:
+            return
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._committing = asyncio.get_running_loop().create_task(self._commit(batch))
+        self._committing.add_done_callback(self._committed)
+
+    def _committed(self, task: asyncio.Task) -> None:
+        self._committing = None
+        self._flush()
+
+    async def _commit(self, batch: list[tuple[GroupedReservation, asyncio.Future]]) -> None:
+        reservations = [reservation for reservation, _ in batch]
+        GROUP_COMMIT_SIZE.observe(len(reservations))
+        try:
+            if settings.DB_ASYNC:
+                async with AsyncSessionLocal() as db:
+                    outcomes = await saga_reservation_group_async(db, reservations)
+            else:
+                outcomes = await asyncio.to_thread(_commit_sync, reservations)
+        except Exception as e:
+            logger.error(
+                f"[group_commit] Group of {len(reservations)} reservations failed, reserving one by one: {e}")
+            outcomes = []
+            for reservation in reservations:
+                outcomes.append(await self._reserve_one(reservation))
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, DuplicateEvent):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    async def _reserve_one(self, reservation: GroupedReservation) -> bool | DuplicateEvent:
+        try:
+            if settings.DB_ASYNC:
+                async with AsyncSessionLocal() as db:
+                    return await saga_reservation_async(db, *_saga_args(reservation))
+            return await asyncio.to_thread(_reserve_one_sync, reservation)
+        except DuplicateEvent as e:
+            return e
+        except Exception as e:
+            logger.error(
+                f"[group_commit] Reservation for journey {reservation.journey_id} failed: {e}")
+            return False
+
+
+group_committer = GroupCommitter(
+    settings.GROUP_COMMIT_WINDOW_MS / 1000, settings.GROUP_COMMIT_MAX_BATCH)
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, or_, select, update
+from app.models.db_models import OutboxEvent
+
+
+def enqueue_event(db, routing_key: str, payload: dict) -> None:
+    """
+    Adds an event to the outbox in the caller's transaction; it is published
+    by the outbox relay once that transaction commits. Works with both Session
+    and AsyncSession since it only stages the row.
+    """
+    db.add(OutboxEvent(routing_key=routing_key, payload=payload))
+
+
+def claim_batch(batch_size: int, lease_seconds: float):
+    """
+    Leases the oldest `batch_size` unclaimed (or expired) rows for
+    `lease_seconds` and returns their id, routing key, payload and creation
+    time. Rows locked by a concurrent claim are skipped.
+    """
+    now = datetime.now(timezone.utc)
+    claimable = select(OutboxEvent.id).where(
+        or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now)
+    ).order_by(OutboxEvent.created_at).limit(batch_size).with_for_update(skip_locked=True)
+    return update(OutboxEvent).where(OutboxEvent.id.in_(claimable.scalar_subquery())).values(
+        claimed_until=now + timedelta(seconds=lease_seconds)
+    ).returning(OutboxEvent.id, OutboxEvent.routing_key, OutboxEvent.payload, OutboxEvent.created_at)
+
+
+def delete_events(event_ids: list):
+    return delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids))
+
+
+def release_events(event_ids: list):
+    return update(OutboxEvent).where(OutboxEvent.id.in_(event_ids)).values(claimed_until=None)
@@ -1,12 +1,28 @@
 import logging
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.models.db_models import Journey, Slot, RegionType, Route
-from app.services.reservation_service import reserve_slot_for_region
-from app.services.slot_service import get_continent_for_city
+from app.services.reservation_service import reserve_slot_for_region, monitor_reservation_failure
+from app.services.slot_service import get_continent_for_city, reserve_slots_bulk, reserve_slots_bulk_async, replicate_geo, replicate_geo_async, release_slots_bulk, release_slots_bulk_async, slot_stripes, sync_stripes, sync_stripes_async, lock_slot_capacity, lock_slot_capacity_async, increment_slots, increment_slots_async, InsufficientCapacity
+from app.domain.geodata import continent_for_country_code
+from app.domain.geocode_batcher import geocode_batcher
+from app.services.slot_capacity_cache import slot_capacity_cache
+from app.services.availability import availability
+from app.services.outbox import enqueue_event
+from app.services.dedup import DuplicateEvent, deduplicator, record_processed, record_processed_async, record_processed_many, record_processed_many_async
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.db.transactions import run_transaction, run_transaction_async
 
 logger = logging.getLogger(__name__)
 
+_NO_SYNC = {"synchronize_session": False}
+
 
 def release_slot_for_region(db: Session, region_type: RegionType, region_identifier: str, slot_time: datetime) -> None:
     """
@@ -28,13 +44,26 @@ def release_slot_for_region(db: Session, region_type: RegionType, region_identif
             db.flush()
             logger.info(
                 f"Compensation: Released reservation for region '{region_identifier}' at {slot_time}")
+        slot_capacity_cache.record(
+            region_identifier, slot_time, slot.slots, slot.reserved)
     except Exception as comp_err:
         logger.error(
             f"Error during compensation for region '{region_identifier}' at {slot_time}: {comp_err}")
         raise
 
 
-def saga_reservation(db: Session, journey_id: str, steps: list[dict], region_type: RegionType, route: list[str], slot_time: datetime) -> bool:
+def _remember(processed: tuple | None) -> None:
+    if processed is not None:
+        deduplicator.remember(processed)
+
+
+def _route_continents(steps: list[dict], region_type: RegionType, continents: dict[str, str]) -> list[str]:
+    if region_type == RegionType.country:
+        return [continent_for_country_code(step["region"]) for step in steps]
+    return [continents.get(step["region"]) or "Unknown" for step in steps]
+
+
+def saga_reservation(db: Session, journey_id: str, steps: list[dict], region_type: RegionType, route: list[str], slot_time: datetime, approved_event: tuple[str, dict] | None = None, replicate_to: list[str] | None = None, processed: tuple | None = None) -> bool:
     """
     Orchestrates a saga that reserves a slot on each region along the journey.
     'steps' should be a list of dictionaries for each reservation step. For example:
@@ -44,21 +73,43 @@ def saga_reservation(db: Session, journey_id: str, steps: list[dict], region_typ
             {"region": "CityX", "continent": "Asia"}
         ]
     If all steps succeed, the journey status is updated to "confirmed".
-    If any step fails, the previously reserved steps are undone (compensated) and
-    the journey is marked as "rejected".
+    If any step fails, the whole reservation transaction is rolled back, so
+    no slot stays reserved, and the journey is marked as "rejected".
+    With BULK_SLOT_RESERVATION all steps are reserved by one set-based
+    reserve_slots_bulk call, which either reserves every region or none.
+    An approved_event (routing_key, payload) is written to the outbox in the
+    same transaction as the reservation, and so is the geo-replication of the
+    route's country slots to the continents in replicate_to, and so is the
+    processed key of the booking event (record_processed). Serialization
+    conflicts rerun the transaction (run_transaction) before rejecting.
     """
-    reserved_steps = []
     try:
-        txn = db.begin_nested() if db.in_transaction() else db.begin()
-        with txn:
-            for step in steps:
-                region = step["region"]
-                continent_value = step.get("continent")
-                if region_type == RegionType.city and not continent_value:
-                    continent_value = get_continent_for_city(region)
-                reserve_slot_for_region(
-                    db, region_type, region,  slot_time, continent_value,)
-                reserved_steps.append(step)
+        continents = {}
+        for step in steps:
+            continent_value = step.get("continent")
+            if region_type == RegionType.city and not continent_value:
+                continent_value = get_continent_for_city(step["region"])
+            continents[step["region"]] = continent_value
+
+        def reserve():
+            record_processed(db, processed)
+            if settings.BULK_SLOT_RESERVATION or slot_stripes(region_type) > 1:
+                try:
+                    reserve_slots_bulk(
+                        db, region_type, [step["region"] for step in steps], slot_time, continents)
+                except InsufficientCapacity as e:
+                    for region in e.regions:
+                        monitor_reservation_failure(region, e)
+                    raise
+            else:
+                sync_stripes(db, region_type, sorted({step["region"] for step in steps}), slot_time)
+                for step in steps:
+                    region = step["region"]
+                    reserve_slot_for_region(
+                        db, region_type, region,  slot_time, continents[region],)
+            if replicate_to:
+                with stage_timer("replicate_geo"):
+                    replicate_geo(db, route, replicate_to, slot_time)
 
             journey = db.query(Journey).filter(
                 Journey.journey_id == journey_id).first()
@@ -70,25 +121,37 @@ def saga_reservation(db: Session, journey_id: str, steps: list[dict], region_typ
             route_entry = Route(
                 journey_id=journey_id,
                 route=route,
+                region_type=region_type,
+                slot_time=slot_time,
+                continents=_route_continents(steps, region_type, continents),
             )
             db.add(route_entry)
+            if approved_event:
+                enqueue_event(db, *approved_event)
+
+        run_transaction(db, reserve, "saga_reservation")
         db.commit()
+        _remember(processed)
+        for step in steps:
+            slot_capacity_cache.adjust(step["region"], slot_time, 1)
+        availability.adjust(route, slot_time, 1)
         logger.info(f"Saga reservation succeeded for journey {journey_id}")
         return True
 
+    except DuplicateEvent:
+        raise
     except Exception as saga_err:
         logger.error(
             f"Saga reservation error for journey {journey_id}: {saga_err}")
         try:
-            with db.begin():
-                for step in reserved_steps:
-                    release_slot_for_region(
-                        db, region_type, step["region"], slot_time)
-                journey = db.query(Journey).filter(
-                    Journey.journey_id == journey_id).first()
-                if journey:
-                    journey.status = "rejected"
-                    db.add(journey)
+            with stage_timer("compensation"):
+                db.rollback()
+                with db.begin():
+                    journey = db.query(Journey).filter(
+                        Journey.journey_id == journey_id).first()
+                    if journey:
+                        journey.status = "rejected"
+                        db.add(journey)
             logger.info(f"Compensation completed for journey {journey_id}")
         except Exception as comp_err:
             logger.error(
@@ -96,26 +159,467 @@ def saga_reservation(db: Session, journey_id: str, steps: list[dict], region_typ
         return False
 
 
-def saga_release_slots(db: Session, journey_id: str, steps: list[dict], region_type: RegionType, slot_time: datetime) -> bool:
+def reject_journey(db: Session, journey_id: str, rejected_event: tuple[str, dict] | None = None, processed: tuple | None = None) -> None:
+    """
+    Marks a journey rejected without touching slots, for bookings turned down
+    before (or after all) reservation attempts, and writes rejected_event to
+    the outbox in the same transaction.
+    """
+    try:
+        record_processed(db, processed)
+        db.query(Journey).filter(Journey.journey_id == journey_id).update(
+            {Journey.status: "rejected"}, synchronize_session=False)
+        if rejected_event:
+            enqueue_event(db, *rejected_event)
+        db.commit()
+        _remember(processed)
+    except DuplicateEvent:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rejecting journey {journey_id}: {e}")
+
+
+def _cancel_journey(journey_id: str):
+    """
+    Marks the journey canceled and, in the same statement, returns the route
+    metadata stored at reservation time. Routes saved before that metadata
+    existed do not match, so the caller can fall back to saga_release_slots.
+    """
+    return update(Journey).where(
+        Journey.journey_id == journey_id,
+        Route.journey_id == Journey.journey_id,
+        Route.region_type.is_not(None)
+    ).values(status="canceled").returning(Route.route, Route.region_type, Route.slot_time)
+
+
+def _adjust_released(row, released: list[str]) -> None:
+    route, _, slot_time = row
+    released = set(released)
+    availability.adjust([region for region in route if region in released], slot_time, -1)
+
+
+def saga_cancel_route(db: Session, journey_id: str, processed: tuple | None = None) -> bool | None:
+    """
+    Cancels a journey and releases its route's slots in two statements:
+    the journey UPDATE ... RETURNING the route, then one set-based slot
+    release. Returns None when the journey has no route with metadata.
+    """
+    try:
+        def cancel():
+            row = db.execute(_cancel_journey(journey_id),
+                             execution_options={"synchronize_session": False}).first()
+            if row is None:
+                return None, []
+            record_processed(db, processed)
+            route, region_type, slot_time = row
+            return row, release_slots_bulk(db, region_type, route, slot_time)
+
+        row, released = run_transaction(db, cancel, "saga_cancel_route")
+        db.commit()
+        if row is None:
+            return None
+        _remember(processed)
+        _adjust_released(row, released)
+        logger.info(f"Saga slot release succeeded for journey {journey_id}")
+        return True
+    except DuplicateEvent:
+        raise
+    except Exception as saga_err:
+        logger.error(
+            f"Saga slot release error for journey {journey_id}: {saga_err}")
+        return False
+
+
+def saga_release_slots(db: Session, journey_id: str, steps: list[dict], region_type: RegionType, slot_time: datetime, processed: tuple | None = None) -> bool:
     """
     Orchestrates a compensation saga for releasing reserved slots when a journey is canceled.
     Uses the specific slot_time to uniquely identify the records.
     """
     try:
-        txn = db.begin_nested() if db.in_transaction() else db.begin()
-        with txn:
-            for step in steps:
-                region = step.get("region")
-                release_slot_for_region(db, region_type, region, slot_time)
+        def release():
+            record_processed(db, processed)
+            if slot_stripes(region_type) > 1:
+                release_slots_bulk(
+                    db, region_type, [step.get("region") for step in steps], slot_time)
+            else:
+                sync_stripes(db, region_type, sorted({step.get("region") for step in steps}), slot_time)
+                for step in steps:
+                    region = step.get("region")
+                    release_slot_for_region(db, region_type, region, slot_time)
             journey = db.query(Journey).filter(
                 Journey.journey_id == journey_id).first()
             if journey:
                 journey.status = "canceled"
                 db.add(journey)
+
+        run_transaction(db, release, "saga_release_slots")
         db.commit()
+        _remember(processed)
+        availability.adjust([step.get("region") for step in steps], slot_time, -1)
+        logger.info(f"Saga slot release succeeded for journey {journey_id}")
+        return True
+    except DuplicateEvent:
+        raise
+    except Exception as saga_err:
+        logger.error(
+            f"Saga slot release error for journey {journey_id}: {saga_err}")
+        return False
+
+
+async def release_slot_for_region_async(db: AsyncSession, region_type: RegionType, region_identifier: str, slot_time: datetime) -> None:
+    try:
+        result = await db.execute(select(Slot).with_for_update().where(
+            Slot.region_identifier == region_identifier,
+            Slot.region_type == region_type,
+            Slot.slot_time == slot_time
+        ))
+        slot = result.scalar_one_or_none()
+        if not slot:
+            logger.info(
+                f"No slot found for region {region_identifier} at {slot_time} in compensation.")
+            return
+        if slot.reserved > 0:
+            slot.reserved -= 1
+            await db.flush()
+            logger.info(
+                f"Compensation: Released reservation for region '{region_identifier}' at {slot_time}")
+        slot_capacity_cache.record(
+            region_identifier, slot_time, slot.slots, slot.reserved)
+    except Exception as comp_err:
+        logger.error(
+            f"Error during compensation for region '{region_identifier}' at {slot_time}: {comp_err}")
+        raise
+
+
+async def _get_journey_async(db: AsyncSession, journey_id: str) -> Journey | None:
+    result = await db.execute(select(Journey).where(Journey.journey_id == journey_id))
+    return result.scalar_one_or_none()
+
+
+async def saga_reservation_async(db: AsyncSession, journey_id: str, steps: list[dict], region_type: RegionType, route: list[str], slot_time: datetime, approved_event: tuple[str, dict] | None = None, replicate_to: list[str] | None = None, processed: tuple | None = None) -> bool:
+    """
+    Async counterpart of saga_reservation. Slots are always reserved through
+    the set-based bulk path, so a failed reservation is undone by rolling the
+    transaction back and only the journey status needs compensating.
+    """
+    try:
+        continents = {step["region"]: step.get("continent") for step in steps}
+        if region_type == RegionType.city:
+            missing = [region for region, continent in continents.items() if not continent]
+            continents.update(await geocode_batcher.city_continents(missing))
+
+        async def reserve():
+            await record_processed_async(db, processed)
+            try:
+                await reserve_slots_bulk_async(
+                    db, region_type, [step["region"] for step in steps], slot_time, continents)
+            except InsufficientCapacity as e:
+                for region in e.regions:
+                    monitor_reservation_failure(region, e)
+                raise
+            if replicate_to:
+                with stage_timer("replicate_geo"):
+                    await replicate_geo_async(db, route, replicate_to, slot_time)
+
+            journey = await _get_journey_async(db, journey_id)
+            if not journey:
+                raise Exception("Journey not found during saga reservation.")
+            journey.status = "confirmed"
+
+            db.add(Route(
+                journey_id=journey_id,
+                route=route,
+                region_type=region_type,
+                slot_time=slot_time,
+                continents=_route_continents(steps, region_type, continents),
+            ))
+            if approved_event:
+                enqueue_event(db, *approved_event)
+
+        await run_transaction_async(db, reserve, "saga_reservation")
+        await db.commit()
+        _remember(processed)
+        for step in steps:
+            slot_capacity_cache.adjust(step["region"], slot_time, 1)
+        availability.adjust(route, slot_time, 1)
+        logger.info(f"Saga reservation succeeded for journey {journey_id}")
+        return True
+
+    except DuplicateEvent:
+        raise
+    except Exception as saga_err:
+        logger.error(
+            f"Saga reservation error for journey {journey_id}: {saga_err}")
+        try:
+            with stage_timer("compensation"):
+                await db.rollback()
+                async with db.begin():
+                    journey = await _get_journey_async(db, journey_id)
+                    if journey:
+                        journey.status = "rejected"
+            logger.info(f"Compensation completed for journey {journey_id}")
+        except Exception as comp_err:
+            logger.error(
+                f"Compensation error for journey {journey_id}: {comp_err}")
+        return False
+
+
+async def reject_journey_async(db: AsyncSession, journey_id: str, rejected_event: tuple[str, dict] | None = None, processed: tuple | None = None) -> None:
+    try:
+        await record_processed_async(db, processed)
+        await db.execute(
+            update(Journey).where(Journey.journey_id == journey_id).values(
+                status="rejected"),
+            execution_options={"synchronize_session": False}
+        )
+        if rejected_event:
+            enqueue_event(db, *rejected_event)
+        await db.commit()
+        _remember(processed)
+    except DuplicateEvent:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error rejecting journey {journey_id}: {e}")
+
+
+async def saga_cancel_route_async(db: AsyncSession, journey_id: str, processed: tuple | None = None) -> bool | None:
+    try:
+        async def cancel():
+            row = (await db.execute(_cancel_journey(journey_id),
+                                    execution_options={"synchronize_session": False})).first()
+            if row is None:
+                return None, []
+            await record_processed_async(db, processed)
+            route, region_type, slot_time = row
+            return row, await release_slots_bulk_async(db, region_type, route, slot_time)
+
+        row, released = await run_transaction_async(db, cancel, "saga_cancel_route")
+        await db.commit()
+        if row is None:
+            return None
+        _remember(processed)
+        _adjust_released(row, released)
         logger.info(f"Saga slot release succeeded for journey {journey_id}")
         return True
+    except DuplicateEvent:
+        raise
     except Exception as saga_err:
         logger.error(
             f"Saga slot release error for journey {journey_id}: {saga_err}")
         return False
+
+
+async def saga_release_slots_async(db: AsyncSession, journey_id: str, steps: list[dict], region_type: RegionType, slot_time: datetime, processed: tuple | None = None) -> bool:
+    try:
+        async def release():
+            await record_processed_async(db, processed)
+            if slot_stripes(region_type) > 1:
+                await release_slots_bulk_async(
+                    db, region_type, [step.get("region") for step in steps], slot_time)
+            else:
+                await sync_stripes_async(db, region_type, sorted({step.get("region") for step in steps}), slot_time)
+                for step in steps:
+                    await release_slot_for_region_async(
+                        db, region_type, step.get("region"), slot_time)
+            journey = await _get_journey_async(db, journey_id)
+            if journey:
+                journey.status = "canceled"
+
+        await run_transaction_async(db, release, "saga_release_slots")
+        await db.commit()
+        _remember(processed)
+        availability.adjust([step.get("region") for step in steps], slot_time, -1)
+        logger.info(f"Saga slot release succeeded for journey {journey_id}")
+        return True
+    except DuplicateEvent:
+        raise
+    except Exception as saga_err:
+        logger.error(
+            f"Saga slot release error for journey {journey_id}: {saga_err}")
+        return False
+
+
+@dataclass
+class GroupedReservation:
+    journey_id: uuid.UUID
+    steps: list[dict]
+    region_type: RegionType
+    route: list[str]
+    slot_time: datetime
+    continents: dict[str, str]
+    approved_event: tuple[str, dict] | None = None
+    replicate_to: list[str] | None = None
+    processed: tuple | None = None
+
+
+def _group_keys(reservations: list[GroupedReservation]) -> dict[tuple[RegionType, datetime], tuple[list[str], dict[str, str]]]:
+    """
+    (region_type, slot_time) -> (regions, continents) over all reservations,
+    in the order the slot rows are locked.
+    """
+    keys: dict[tuple[RegionType, datetime], tuple[set, dict]] = {}
+    for reservation in reservations:
+        regions, continents = keys.setdefault(
+            (reservation.region_type, reservation.slot_time), (set(), {}))
+        regions.update(reservation.route)
+        continents.update(
+            {region: value for region, value in reservation.continents.items() if value})
+    return {key: (sorted(regions), continents)
+            for key, (regions, continents) in sorted(keys.items(), key=lambda item: (item[0][1], item[0][0].value))}
+
+
+def _decide_group(reservations: list[GroupedReservation], available: dict[tuple[str, datetime], int], existing: set) -> list[bool]:
+    """
+    Confirms reservations in order while every region of the route still
+    has room, exactly as saga_reservation run one after another would.
+    Returns the outcomes and takes confirmed counts off `available`.
+    """
+    outcomes = []
+    for reservation in reservations:
+        if reservation.journey_id not in existing:
+            logger.error(
+                f"Saga reservation error for journey {reservation.journey_id}: Journey not found during saga reservation.")
+            outcomes.append(False)
+            continue
+        counts = Counter(reservation.route)
+        lacking = [region for region in sorted(counts)
+                   if available.get((region, reservation.slot_time), 0) < counts[region]]
+        if lacking:
+            error = InsufficientCapacity(lacking)
+            for region in lacking:
+                monitor_reservation_failure(region, error)
+            outcomes.append(False)
+            continue
+        for region, count in counts.items():
+            available[(region, reservation.slot_time)] -= count
+        outcomes.append(True)
+    return outcomes
+
+
+def _group_increments(reservations: list[GroupedReservation], outcomes: list[bool]) -> dict[tuple[RegionType, datetime], Counter]:
+    increments: dict[tuple[RegionType, datetime], Counter] = {}
+    for reservation, confirmed in zip(reservations, outcomes):
+        if confirmed:
+            increments.setdefault(
+                (reservation.region_type, reservation.slot_time), Counter()).update(reservation.route)
+    return increments
+
+
+def _set_status(journey_ids: list, status: str):
+    return update(Journey).where(Journey.journey_id.in_(journey_ids)).values(status=status)
+
+
+def _stage_group_rows(db, reservations: list[GroupedReservation], outcomes: list[bool]) -> None:
+    for reservation, confirmed in zip(reservations, outcomes):
+        if not confirmed:
+            continue
+        db.add(Route(
+            journey_id=reservation.journey_id,
+            route=reservation.route,
+            region_type=reservation.region_type,
+            slot_time=reservation.slot_time,
+            continents=_route_continents(
+                reservation.steps, reservation.region_type, reservation.continents),
+        ))
+        if reservation.approved_event:
+            enqueue_event(db, *reservation.approved_event)
+
+
+def _processed_keys(reservations: list[GroupedReservation], outcomes: list[bool]) -> list[tuple]:
+    """
+    Processed keys of the confirmed reservations; rejected ones are recorded
+    by whatever settles the booking next (another route or reject_journey).
+    """
+    return [reservation.processed for reservation, confirmed in zip(reservations, outcomes)
+            if confirmed and reservation.processed is not None]
+
+
+def _group_committed(reservations: list[GroupedReservation], outcomes: list[bool]) -> None:
+    for reservation, confirmed in zip(reservations, outcomes):
+        if confirmed:
+            _remember(reservation.processed)
+            for region in reservation.route:
+                slot_capacity_cache.adjust(region, reservation.slot_time, 1)
+            availability.adjust(reservation.route, reservation.slot_time, 1)
+            logger.info(
+                f"Saga reservation succeeded for journey {reservation.journey_id}")
+
+
+def saga_reservation_group(db: Session, reservations: list[GroupedReservation]) -> list[bool]:
+    """
+    Reserves slots for several journeys in one transaction: every slot row
+    they touch is locked once (ordered by slot_time and region), each
+    journey is confirmed or rejected in list order against the remaining
+    capacity, and the increments, journey statuses, routes and outbox rows
+    of the whole group are written together. Outcomes are those the
+    journeys would have had through saga_reservation one at a time.
+    Raises DuplicateEvent, rolling back the whole group, if a confirmed
+    booking event was already processed by another delivery.
+    """
+    ids = [reservation.journey_id for reservation in reservations]
+
+    def reserve():
+        available = {}
+        for (region_type, slot_time), (regions, continents) in _group_keys(reservations).items():
+            for region, left in lock_slot_capacity(db, region_type, regions, slot_time, continents).items():
+                available[(region, slot_time)] = left
+        existing = set(db.execute(
+            select(Journey.journey_id).where(Journey.journey_id.in_(ids))).scalars())
+        outcomes = _decide_group(reservations, available, existing)
+        for (region_type, slot_time), counts in _group_increments(reservations, outcomes).items():
+            increment_slots(db, region_type, counts, slot_time)
+        for reservation, confirmed in zip(reservations, outcomes):
+            if confirmed and reservation.replicate_to:
+                with stage_timer("replicate_geo"):
+                    replicate_geo(db, reservation.route,
+                                  reservation.replicate_to, reservation.slot_time)
+        confirmed_ids = [i for i, confirmed in zip(ids, outcomes) if confirmed]
+        rejected_ids = [i for i, confirmed in zip(ids, outcomes) if not confirmed and i in existing]
+        if confirmed_ids:
+            db.execute(_set_status(confirmed_ids, "confirmed"), execution_options=_NO_SYNC)
+        if rejected_ids:
+            db.execute(_set_status(rejected_ids, "rejected"), execution_options=_NO_SYNC)
+        record_processed_many(db, _processed_keys(reservations, outcomes))
+        _stage_group_rows(db, reservations, outcomes)
+        return outcomes
+
+    outcomes = run_transaction(db, reserve, "saga_reservation_group")
+    _group_committed(reservations, outcomes)
+    return outcomes
+
+
+async def saga_reservation_group_async(db: AsyncSession, reservations: list[GroupedReservation]) -> list[bool]:
+    ids = [reservation.journey_id for reservation in reservations]
+
+    async def reserve():
+        available = {}
+        for (region_type, slot_time), (regions, continents) in _group_keys(reservations).items():
+            for region, left in (await lock_slot_capacity_async(db, region_type, regions, slot_time, continents)).items():
+                available[(region, slot_time)] = left
+        existing = set((await db.execute(
+            select(Journey.journey_id).where(Journey.journey_id.in_(ids)))).scalars())
+        outcomes = _decide_group(reservations, available, existing)
+        for (region_type, slot_time), counts in _group_increments(reservations, outcomes).items():
+            await increment_slots_async(db, region_type, counts, slot_time)
+        for reservation, confirmed in zip(reservations, outcomes):
+            if confirmed and reservation.replicate_to:
+                with stage_timer("replicate_geo"):
+                    await replicate_geo_async(db, reservation.route,
+                                              reservation.replicate_to, reservation.slot_time)
+        confirmed_ids = [i for i, confirmed in zip(ids, outcomes) if confirmed]
+        rejected_ids = [i for i, confirmed in zip(ids, outcomes) if not confirmed and i in existing]
+        if confirmed_ids:
+            await db.execute(_set_status(confirmed_ids, "confirmed"), execution_options=_NO_SYNC)
+        if rejected_ids:
+            await db.execute(_set_status(rejected_ids, "rejected"), execution_options=_NO_SYNC)
+        await record_processed_many_async(db, _processed_keys(reservations, outcomes))
+        _stage_group_rows(db, reservations, outcomes)
+        return outcomes
+
+    outcomes = await run_transaction_async(db, reserve, "saga_reservation_group")
+    _group_committed(reservations, outcomes)
+    return outcomes
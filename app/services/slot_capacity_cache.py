@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from app.core.config import settings
+
+
+def _normalize_time(slot_time: datetime) -> datetime:
+    if slot_time.tzinfo is not None:
+        return slot_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return slot_time
+
+
+class SlotCapacityCache:
+    """
+    Write-through, in-process view of (region_identifier, slot_time) ->
+    (slots, reserved) as last seen by this process.
+
+    It is only used to short-circuit bookings onto regions that were full a
+    moment ago; the database stays authoritative. Entries older than `ttl`
+    seconds are treated as stale and ignored, the cache holds at most
+    `max_entries` (least recently written evicted first) and entries whose
+    slot_time has passed are swept periodically.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl: float = 5.0, sweep_interval: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.rejections = 0
+        self._entries: OrderedDict[tuple[str, datetime],
+                                   tuple[int, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def record(self, region_identifier: str, slot_time: datetime, slots: int, reserved: int) -> None:
+        key = (region_identifier, _normalize_time(slot_time))
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (slots, reserved, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if now - self._last_sweep > self.sweep_interval:
+                self._sweep_locked(now)
+
+    def adjust(self, region_identifier: str, slot_time: datetime, delta: int) -> None:
+        """
+        Applies a committed reservation (+n) or release (-n) to a known entry.
+        The entry keeps the age of its last authoritative read (record), so
+        adjustments cannot keep a view alive that misses other writers.
+        """
+        key = (region_identifier, _normalize_time(slot_time))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                slots, reserved, stored_at = entry
+                self._entries[key] = (slots, max(reserved + delta, 0), stored_at)
+                self._entries.move_to_end(key)
+
+    def get(self, region_identifier: str, slot_time: datetime) -> tuple[int, int] | None:
+        key = (region_identifier, _normalize_time(slot_time))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            slots, reserved, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                self.stale += 1
+                return None
+            self.hits += 1
+            return slots, reserved
+
+    def full_regions(self, regions: list[str], slot_time: datetime) -> list[str]:
+        """
+        Regions of a route known (from fresh entries) not to have room for it.
+        """
+        full = []
+        for region, needed in Counter(regions).items():
+            entry = self.get(region, slot_time)
+            if entry is not None and entry[0] - entry[1] < needed:
+                full.append(region)
+        if full:
+            with self._lock:
+                self.rejections += 1
+        return full
+
+    def _sweep_locked(self, now: float) -> None:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None)
+        for key in [key for key in self._entries if key[1] < cutoff]:
+            del self._entries[key]
+        self._last_sweep = now
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.stale = self.rejections = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "rejections": self.rejections,
+            }
+
+
+slot_capacity_cache = SlotCapacityCache(
+    max_entries=settings.SLOT_CACHE_MAX_ENTRIES,
+    ttl=settings.SLOT_CACHE_TTL,
+    sweep_interval=settings.SLOT_CACHE_SWEEP_INTERVAL,
+)
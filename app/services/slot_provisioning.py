@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.logging_config import configure_logging
+from app.db.database import SessionLocal, AsyncSessionLocal
+from app.domain.geodata import continent_for_country_code, get_countries
+from app.domain.route_engine import city_graph_nodes
+from app.domain.route_generator import get_city_index
+from app.models.db_models import Slot, RegionType
+from app.services.slot_service import initial_slot_capacity, slot_bucket
+
+logger = logging.getLogger(__name__)
+
+
+def check_provisioning() -> None:
+    """
+    Raises ValueError unless the settings let provisioned slots be used.
+    """
+    if settings.SLOT_BUCKET_MINUTES <= 0:
+        raise ValueError(
+            "Slot provisioning needs SLOT_BUCKET_MINUTES > 0 so bookings land on provisioned times")
+
+
+def upcoming_buckets(count: int, now: datetime | None = None) -> list[datetime]:
+    """
+    Start times (UTC, naive like Slot.slot_time) of the bucket containing
+    `now` and the count - 1 buckets after it.
+    """
+    check_provisioning()
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is not None:
+        now = now.astimezone(timezone.utc).replace(tzinfo=None)
+    first = slot_bucket(now)
+    step = timedelta(minutes=settings.SLOT_BUCKET_MINUTES)
+    return [first + i * step for i in range(count)]
+
+
+def known_regions(region_type: RegionType, countries: list[str] | None = None) -> list[tuple[str, str]]:
+    """
+    (region_identifier, continent) pairs routes can use: every country with
+    known cities, or the city graph nodes of the given (default all)
+    countries.
+    """
+    index = get_city_index()
+    codes = countries or sorted(
+        code for code in get_countries() if code in index.by_country)
+    if region_type == RegionType.country:
+        return [(code, continent_for_country_code(code)) for code in codes]
+    regions = {}
+    for code in codes:
+        continent = continent_for_country_code(code)
+        for city in city_graph_nodes(code):
+            regions.setdefault(city, continent)
+    return sorted(regions.items())
+
+
+def _insert_slots(region_type: RegionType, regions: list[tuple[str, str]], slot_times: list[datetime]):
+    return insert(Slot).values([
+        {
+            "id": uuid.uuid4(),
+            "region_type": region_type,
+            "region_identifier": region,
+            "slot_time": slot_time,
+            "slots": initial_slot_capacity(region_type, region),
+            "reserved": 0,
+            "continent": continent or "Unknown",
+        }
+        for slot_time in slot_times
+        for region, continent in regions
+    ]).on_conflict_do_nothing(index_elements=["region_identifier", "slot_time"])
+
+
+def _batches(regions: list[tuple[str, str]], slot_times: list[datetime], batch_size: int):
+    per_batch = max(batch_size // max(len(slot_times), 1), 1)
+    for start in range(0, len(regions), per_batch):
+        yield regions[start:start + per_batch]
+
+
+def provision_slots(db: Session, region_type: RegionType, regions: list[tuple[str, str]], slot_times: list[datetime], batch_size: int) -> int:
+    """
+    Creates the missing (region, slot_time) rows with multi-row
+    INSERT ... ON CONFLICT DO NOTHING statements of about batch_size rows,
+    committing after each. Returns the number of rows inserted.
+    """
+    created = 0
+    for batch in _batches(regions, slot_times, batch_size):
+        created += db.execute(_insert_slots(region_type, batch, slot_times)).rowcount
+        db.commit()
+    return created
+
+
+async def provision_slots_async(db: AsyncSession, region_type: RegionType, regions: list[tuple[str, str]], slot_times: list[datetime], batch_size: int) -> int:
+    created = 0
+    for batch in _batches(regions, slot_times, batch_size):
+        created += (await db.execute(_insert_slots(region_type, batch, slot_times))).rowcount
+        await db.commit()
+    return created
+
+
+def backfill_country_continents(db: Session) -> int:
+    """
+    Sets the continent of country slots stored as "Unknown" (slots created
+    on booking before they derived it from the country code), one UPDATE
+    per continent. Returns the number of rows updated.
+    """
+    by_continent: dict[str, list[str]] = {}
+    for code, continent in known_regions(RegionType.country, sorted(get_countries())):
+        if continent and continent != "Unknown":
+            by_continent.setdefault(continent, []).append(code)
+    updated = 0
+    for continent, codes in sorted(by_continent.items()):
+        updated += db.execute(update(Slot).where(
+            Slot.region_type == RegionType.country,
+            Slot.continent == "Unknown",
+            Slot.region_identifier.in_(codes)
+        ).values(continent=continent)).rowcount
+        db.commit()
+    return updated
+
+
+def _region_types(names: str) -> list[RegionType]:
+    return [RegionType(name.strip()) for name in names.split(",") if name.strip()]
+
+
+def _countries(codes: str) -> list[str] | None:
+    return [code.strip().upper() for code in codes.split(",") if code.strip()] or None
+
+
+async def provision_upcoming() -> None:
+    slot_times = upcoming_buckets(settings.PROVISION_BUCKETS)
+    countries = _countries(settings.PROVISION_COUNTRIES)
+    for region_type in _region_types(settings.PROVISION_REGION_TYPES):
+        regions = await asyncio.to_thread(known_regions, region_type, countries)
+        async with AsyncSessionLocal() as db:
+            created = await provision_slots_async(
+                db, region_type, regions, slot_times, settings.PROVISION_BATCH_SIZE)
+        logger.info(
+            f"[provisioning] Created {created} {region_type.value} slots for {len(regions)} regions x {len(slot_times)} buckets")
+
+
+async def run_provisioner() -> None:
+    """
+    Provisions upcoming buckets every PROVISION_INTERVAL seconds; call
+    check_provisioning() first, at startup.
+    """
+    while True:
+        try:
+            await provision_upcoming()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[provisioning] Slot provisioning failed: {e}")
+        await asyncio.sleep(settings.PROVISION_INTERVAL)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Create slot rows for upcoming time buckets.")
+    parser.add_argument("--buckets", type=int, default=settings.PROVISION_BUCKETS,
+                        help="number of upcoming buckets to provision")
+    parser.add_argument("--region-types", default=settings.PROVISION_REGION_TYPES,
+                        help="comma-separated region types (country,city)")
+    parser.add_argument("--countries", default=settings.PROVISION_COUNTRIES,
+                        help="comma-separated country codes; empty for all")
+    parser.add_argument("--batch-size", type=int,
+                        default=settings.PROVISION_BATCH_SIZE)
+    parser.add_argument("--backfill-continents", action="store_true",
+                        help="fix the continent of country slots stored as Unknown, then exit")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.backfill_continents:
+        with SessionLocal() as db:
+            updated = backfill_country_continents(db)
+        logger.info(f"[provisioning] Set the continent of {updated} country slots")
+        return
+    slot_times = upcoming_buckets(args.buckets)
+    countries = _countries(args.countries)
+    with SessionLocal() as db:
+        for region_type in _region_types(args.region_types):
+            regions = known_regions(region_type, countries)
+            created = provision_slots(
+                db, region_type, regions, slot_times, args.batch_size)
+            logger.info(
+                f"[provisioning] Created {created} {region_type.value} slots for {len(regions)} regions x {len(slot_times)} buckets")
+
+
+if __name__ == "__main__":
+    main()
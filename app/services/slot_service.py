@@ -1,18 +1,62 @@
+import functools
 import random
+import uuid
+from collections import Counter
+from sqlalchemy import Integer, String, case, cast, delete, func, not_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, array
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.db_models import Slot, RegionType
-from geopy.geocoders import Nominatim
-import pycountry_convert as pc
+from app.models.db_models import Slot, SlotStripe, RegionType
+from app.domain.geocode_cache import geocode_cache
+from app.domain.geodata import continent_for_country_code
+from app.domain.rate_limiter import nominatim_limiter
+from app.services.slot_capacity_cache import slot_capacity_cache
+from app.services.capacity_policy import get_capacity_policy
+from app.core.config import settings
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from psycopg.errors import LockNotAvailable
-from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_random_exponential
 logger = logging.getLogger(__name__)
 
 
+class InsufficientCapacity(Exception):
+    def __init__(self, regions: list[str]):
+        self.regions = regions
+        super().__init__(f"Insufficient capacity for {', '.join(regions)}")
+
+
+def initial_slot_capacity(region_type: RegionType, region_identifier: str | None = None) -> int:
+    return get_capacity_policy().capacity(region_type, region_identifier)
+
+
+def slot_bucket(slot_time: datetime) -> datetime:
+    """
+    Start of the SLOT_BUCKET_MINUTES bucket containing slot_time, or
+    slot_time itself when bucketing is off.
+    """
+    minutes = settings.SLOT_BUCKET_MINUTES
+    if minutes <= 0:
+        return slot_time
+    epoch = datetime(1970, 1, 1, tzinfo=slot_time.tzinfo)
+    step = timedelta(minutes=minutes)
+    return epoch + (slot_time - epoch) // step * step
+
+
 def get_continent_for_city(city: str) -> str:
+    continent = geocode_cache.get_or_compute(
+        geocode_cache.city_key("continent", city),
+        lambda: _geocode_city_continent(city)
+    )
+    return continent or "Unknown"
+
+
+def _geocode_city_continent(city: str) -> str | None:
+    from geopy.geocoders import Nominatim
+    import pycountry_convert as pc
     try:
         geolocator = Nominatim(user_agent="traffic-service-get-city")
+        nominatim_limiter.wait()
         location = geolocator.geocode(city)
         if location and location.raw.get("address"):
             address = location.raw["address"]
@@ -27,19 +71,29 @@ def get_continent_for_city(city: str) -> str:
                 except Exception as conv_e:
                     logger.error(
                         f"Error converting country code for city {city}: {conv_e}")
-                    return "Unknown"
-        return "Unknown"
+                    return None
+        return None
     except Exception as e:
-        print(f"Error getting continent for city {city}: {e}")
-        return "Unknown"
+        logger.warning(f"Error getting continent for city {city}: {e}")
+        return None
+
+
+def slot_continent(region_type: RegionType, region_identifier: str, continent: str | None = None) -> str:
+    """
+    Continent stored on a new slot: the caller's for cities, derived from
+    the country code for countries.
+    """
+    if region_type == RegionType.country:
+        return continent_for_country_code(region_identifier) or "Unknown"
+    return continent or "Unknown"
 
 
-@retry(
-    wait=wait_random_exponential(multiplier=0.5, min=0.5, max=3),
-    stop=stop_after_attempt(15),
-    retry=retry_if_exception_type(LockNotAvailable)
-)
 def get_or_create_slot(db: Session, region_type: RegionType, region_identifier: str, slot_time: datetime, continent: str = None) -> Slot:
+    """
+    Locks (NOWAIT) or creates the slot row. A held lock raises
+    LockNotAvailable, which aborts the transaction; the caller's transaction
+    runner reruns it.
+    """
     try:
         slot = db.query(Slot).with_for_update(nowait=True).filter(
             Slot.region_identifier == region_identifier,
@@ -53,15 +107,14 @@ def get_or_create_slot(db: Session, region_type: RegionType, region_identifier:
     if slot is None:
         if region_type == RegionType.city and not continent:
             continent = get_continent_for_city(region_identifier)
-        new_slots = random.randint(
-            3, 10) if region_type == RegionType.city else random.randint(30, 100)
+        new_slots = initial_slot_capacity(region_type, region_identifier)
         slot = Slot(
             region_type=region_type,
             region_identifier=region_identifier,
             slot_time=slot_time,
             slots=new_slots,
             reserved=0,
-            continent=continent or "Unknown"
+            continent=slot_continent(region_type, region_identifier, continent)
         )
         db.add(slot)
         db.flush()
@@ -70,22 +123,595 @@ def get_or_create_slot(db: Session, region_type: RegionType, region_identifier:
         if region_type == RegionType.city and not slot.continent and continent:
             slot.continent = continent
             db.flush()
+    slot_capacity_cache.record(
+        region_identifier, slot_time, slot.slots, slot.reserved)
     return slot
 
 
-def replicate_geo(db: Session, route_country_identifiers: list[str], route_continents: list[str]):
+def _insert_missing_slots(region_type: RegionType, regions: list[str], slot_time: datetime, continents: dict[str, str]):
+    return insert(Slot).values([
+        {
+            "id": uuid.uuid4(),
+            "region_type": region_type,
+            "region_identifier": region,
+            "slot_time": slot_time,
+            "slots": initial_slot_capacity(region_type, region),
+            "reserved": 0,
+            "continent": slot_continent(region_type, region, continents.get(region)),
+        }
+        for region in regions
+    ]).on_conflict_do_nothing(index_elements=["region_identifier", "slot_time"])
+
+
+def _lock_slots(region_type: RegionType, regions: list[str], slot_time: datetime):
+    return select(Slot.region_identifier, Slot.slots, Slot.reserved).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time
+    ).order_by(Slot.region_identifier).with_for_update()
+
+
+def _increment_slots(region_type: RegionType, regions: list[str], slot_time: datetime, count: int):
+    return update(Slot).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time,
+        Slot.reserved + count <= Slot.slots
+    ).values(reserved=Slot.reserved + count).returning(Slot.region_identifier)
+
+
+def _record_available(rows, slot_time: datetime) -> dict[str, int]:
+    available = {}
+    for region, slots, reserved in rows:
+        slot_capacity_cache.record(region, slot_time, slots, reserved)
+        available[region] = slots - reserved
+    return available
+
+
+def _lacking_regions(counts: Counter, available: dict[str, int]) -> list[str]:
+    return [region for region in sorted(counts) if available.get(region, 0) < counts[region]]
+
+
+def _group_by_count(counts: Counter) -> dict[int, list[str]]:
+    by_count: dict[int, list[str]] = {}
+    for region in sorted(counts):
+        by_count.setdefault(counts[region], []).append(region)
+    return by_count
+
+
+_NO_SYNC = {"synchronize_session": False}
+
+
+def lock_slot_capacity(db: Session, region_type: RegionType, regions: list[str], slot_time: datetime, continents: dict[str, str] | None = None) -> dict[str, int]:
+    """
+    Creates the missing slots of `regions` at slot_time, locks all their
+    rows in region order and returns the remaining capacity of each.
+    """
+    ordered = sorted(set(regions))
+    db.execute(_insert_missing_slots(
+        region_type, ordered, slot_time, continents or {}))
+    sync_stripes(db, region_type, ordered, slot_time)
+    rows = db.execute(_lock_slots(region_type, ordered, slot_time)).all()
+    return _record_available(rows, slot_time)
+
+
+async def lock_slot_capacity_async(db: AsyncSession, region_type: RegionType, regions: list[str], slot_time: datetime, continents: dict[str, str] | None = None) -> dict[str, int]:
+    ordered = sorted(set(regions))
+    await db.execute(_insert_missing_slots(
+        region_type, ordered, slot_time, continents or {}))
+    await sync_stripes_async(db, region_type, ordered, slot_time)
+    rows = (await db.execute(_lock_slots(region_type, ordered, slot_time))).all()
+    return _record_available(rows, slot_time)
+
+
+def increment_slots(db: Session, region_type: RegionType, counts: Counter, slot_time: datetime) -> None:
+    """
+    Adds counts[region] to the reservations of each region, one conditional
+    UPDATE per distinct count. Raises InsufficientCapacity for any region
+    that lacked room.
+    """
+    for count, group in _group_by_count(counts).items():
+        updated = db.execute(
+            _increment_slots(region_type, group, slot_time, count),
+            execution_options=_NO_SYNC
+        ).scalars().all()
+        lacking = sorted(set(group) - set(updated))
+        if lacking:
+            raise InsufficientCapacity(lacking)
+
+
+async def increment_slots_async(db: AsyncSession, region_type: RegionType, counts: Counter, slot_time: datetime) -> None:
+    for count, group in _group_by_count(counts).items():
+        updated = (await db.execute(
+            _increment_slots(region_type, group, slot_time, count),
+            execution_options=_NO_SYNC
+        )).scalars().all()
+        lacking = sorted(set(group) - set(updated))
+        if lacking:
+            raise InsufficientCapacity(lacking)
+
+
+def reserve_slots_bulk(db: Session, region_type: RegionType, regions: list[str], slot_time: datetime, continents: dict[str, str] | None = None) -> None:
+    """
+    Reserves one slot per occurrence of each region at slot_time with a fixed
+    number of statements, whatever the route length:
+
+    1. a multi-row INSERT ... ON CONFLICT DO NOTHING creates missing slots,
+    2. a SELECT ... FOR UPDATE locks the route's rows ordered by region,
+       so concurrent bookings always acquire locks in the same order,
+    3. a conditional UPDATE ... RETURNING increments every region that
+       still has room.
+
+    Region types with SLOT_STRIPES > 1 reserve on striped counters instead
+    (see _reserve_striped).
+
+    Raises InsufficientCapacity listing every region that lacked capacity;
+    the caller's transaction must then be rolled back.
+    """
+    counts = Counter(regions)
+    if slot_stripes(region_type) > 1:
+        db.execute(_insert_missing_slots(
+            region_type, sorted(counts), slot_time, continents or {}))
+        return _reserve_striped(db, region_type, counts, slot_time)
+
+    available = lock_slot_capacity(db, region_type, regions, slot_time, continents)
+    lacking = _lacking_regions(counts, available)
+    if lacking:
+        raise InsufficientCapacity(lacking)
+    increment_slots(db, region_type, counts, slot_time)
+
+
+async def reserve_slots_bulk_async(db: AsyncSession, region_type: RegionType, regions: list[str], slot_time: datetime, continents: dict[str, str] | None = None) -> None:
+    """
+    Async counterpart of reserve_slots_bulk, issuing the same statements.
+    """
+    counts = Counter(regions)
+    if slot_stripes(region_type) > 1:
+        await db.execute(_insert_missing_slots(
+            region_type, sorted(counts), slot_time, continents or {}))
+        return await _reserve_striped_async(db, region_type, counts, slot_time)
+
+    available = await lock_slot_capacity_async(db, region_type, regions, slot_time, continents)
+    lacking = _lacking_regions(counts, available)
+    if lacking:
+        raise InsufficientCapacity(lacking)
+    await increment_slots_async(db, region_type, counts, slot_time)
+
+
+def _decrement_slots(region_type: RegionType, regions: list[str], slot_time: datetime, count: int):
+    return update(Slot).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time,
+        Slot.reserved > 0
+    ).values(
+        reserved=case((Slot.reserved > count, Slot.reserved - count), else_=0)
+    ).returning(Slot.region_identifier, Slot.slots, Slot.reserved)
+
+
+def release_slots_bulk(db: Session, region_type: RegionType, regions: list[str], slot_time: datetime) -> list[str]:
+    """
+    Releases one reservation per occurrence of each region at slot_time with
+    a single set-based UPDATE (one per distinct multiplicity when a region
+    repeats). Returns the regions that actually had a reservation to release.
+    """
+    if slot_stripes(region_type) > 1:
+        return _release_striped(db, region_type, Counter(regions), slot_time)
+    sync_stripes(db, region_type, sorted(set(regions)), slot_time)
+    released = []
+    for count, group in _group_by_count(Counter(regions)).items():
+        rows = db.execute(
+            _decrement_slots(region_type, group, slot_time, count),
+            execution_options=_NO_SYNC
+        ).all()
+        released.extend(_record_rows(rows, slot_time))
+    return released
+
+
+async def release_slots_bulk_async(db: AsyncSession, region_type: RegionType, regions: list[str], slot_time: datetime) -> list[str]:
+    if slot_stripes(region_type) > 1:
+        return await _release_striped_async(db, region_type, Counter(regions), slot_time)
+    await sync_stripes_async(db, region_type, sorted(set(regions)), slot_time)
+    released = []
+    for count, group in _group_by_count(Counter(regions)).items():
+        rows = (await db.execute(
+            _decrement_slots(region_type, group, slot_time, count),
+            execution_options=_NO_SYNC
+        )).all()
+        released.extend(_record_rows(rows, slot_time))
+    return released
+
+
+def _record_rows(rows, slot_time: datetime) -> list[str]:
+    for region, slots, reserved in rows:
+        slot_capacity_cache.record(region, slot_time, slots, reserved)
+    return [row[0] for row in rows]
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_stripes(spec: str) -> dict[str, int]:
+    stripes = {}
+    for item in spec.split(","):
+        name, _, count = item.partition("=")
+        if name.strip() and count.strip():
+            stripes[name.strip()] = max(int(count), 1)
+    return stripes
+
+
+def slot_stripes(region_type: RegionType) -> int:
+    """
+    Number of counter rows (K) a slot of region_type is split across; 1
+    keeps the single Slot row as the counter. Every path that reads or
+    writes the counters of a slot calls sync_stripes first, so a slot is
+    always counted in the layout K currently asks for.
+    """
+    return _parse_stripes(settings.SLOT_STRIPES).get(region_type.value, 1)
+
+
+def _stripe_share(total, index, stripes: int):
+    # Stripe i gets total // K, plus one for the first total % K stripes.
+    return func.div(total, stripes) + case((index < total % stripes, 1), else_=0)
+
+
+def _insert_missing_stripes(region_type: RegionType, regions: list[str], slot_time: datetime, stripes: int):
+    """
+    Splits the slots and reservations of every Slot row not striped yet
+    across `stripes` SlotStripe rows. The Slot row keeps its metadata but
+    the stripes are authoritative from then on.
+    """
+    index = func.generate_series(0, stripes - 1).column_valued("stripe")
+    source = select(
+        func.gen_random_uuid(), Slot.region_type, Slot.region_identifier, Slot.slot_time, index,
+        _stripe_share(Slot.slots, index, stripes),
+        _stripe_share(Slot.reserved, index, stripes)
+    ).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time,
+        Slot.stripes.is_(None)
+    )
+    return insert(SlotStripe).from_select(
+        ["id", "region_type", "region_identifier", "slot_time", "stripe", "slots", "reserved"], source
+    ).on_conflict_do_nothing(index_elements=["region_identifier", "slot_time", "stripe"])
+
+
+def _mark_striped(region_type: RegionType, regions: list[str], slot_time: datetime, stripes: int):
+    return update(Slot).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time,
+        Slot.stripes.is_(None)
+    ).values(stripes=stripes)
+
+
+def _stale_layout(region_type: RegionType, regions: list[str], slot_time: datetime, stripes: int):
+    """
+    Regions whose Slot row is not counted the way K = `stripes` asks: not
+    striped yet, striped with another K, or striped while K is 1. A plain
+    read of rows striped slots never write, so it does not contend.
+    """
+    return select(Slot.region_identifier).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time,
+        Slot.stripes.is_distinct_from(stripes if stripes > 1 else None)
+    )
+
+
+def _stripe_total(column):
+    return select(func.sum(column)).where(
+        SlotStripe.region_identifier == Slot.region_identifier,
+        SlotStripe.slot_time == Slot.slot_time
+    ).scalar_subquery()
+
+
+def _fold_stripes(region_type: RegionType, regions: list[str], slot_time: datetime):
+    """
+    Sums the stripes of striped Slot rows back into the row itself.
+    Returns the regions folded; their stripes must then be deleted.
+    """
+    return update(Slot).where(
+        Slot.region_identifier.in_(regions),
+        Slot.region_type == region_type,
+        Slot.slot_time == slot_time,
+        Slot.stripes.is_not(None)
+    ).values(
+        slots=func.coalesce(_stripe_total(SlotStripe.slots), Slot.slots),
+        reserved=func.coalesce(_stripe_total(SlotStripe.reserved), Slot.reserved),
+        stripes=None
+    ).returning(Slot.region_identifier)
+
+
+def _delete_stripes(regions: list[str], slot_time: datetime):
+    return delete(SlotStripe).where(
+        SlotStripe.region_identifier.in_(regions),
+        SlotStripe.slot_time == slot_time)
+
+
+def sync_stripes(db: Session, region_type: RegionType, regions: list[str], slot_time: datetime) -> None:
+    """
+    Brings the existing slots of `regions` to the layout slot_stripes asks
+    for: stripes of another K (or any stripes when K is 1) are folded back
+    into the Slot row, and with K > 1 unstriped rows are split into K
+    stripes. Costs one read when every slot is already in that layout.
+    """
+    stripes = slot_stripes(region_type)
+    stale = db.execute(_stale_layout(region_type, regions, slot_time, stripes)).scalars().all()
+    if not stale:
+        return
+    folded = db.execute(_fold_stripes(region_type, stale, slot_time), execution_options=_NO_SYNC).scalars().all()
+    if folded:
+        db.execute(_delete_stripes(folded, slot_time), execution_options=_NO_SYNC)
+    if stripes > 1:
+        db.execute(_insert_missing_stripes(region_type, stale, slot_time, stripes))
+        db.execute(_mark_striped(region_type, stale, slot_time, stripes), execution_options=_NO_SYNC)
+
+
+async def sync_stripes_async(db: AsyncSession, region_type: RegionType, regions: list[str], slot_time: datetime) -> None:
+    stripes = slot_stripes(region_type)
+    stale = (await db.execute(_stale_layout(region_type, regions, slot_time, stripes))).scalars().all()
+    if not stale:
+        return
+    folded = (await db.execute(
+        _fold_stripes(region_type, stale, slot_time), execution_options=_NO_SYNC)).scalars().all()
+    if folded:
+        await db.execute(_delete_stripes(folded, slot_time), execution_options=_NO_SYNC)
+    if stripes > 1:
+        await db.execute(_insert_missing_stripes(region_type, stale, slot_time, stripes))
+        await db.execute(_mark_striped(region_type, stale, slot_time, stripes), execution_options=_NO_SYNC)
+
+
+def _pick_stripes(regions: list[str], stripes: int) -> list[tuple[str, int]]:
+    return [(region, random.randrange(stripes)) for region in regions]
+
+
+def _probe_stripes(region_type: RegionType, picks: list[tuple[str, int]], slot_time: datetime, delta: int):
+    """
+    Applies `delta` to one chosen stripe per region if it can take it, locking
+    only that row. Returns the regions that were updated.
+    """
+    if delta > 0:
+        fits = SlotStripe.reserved + delta <= SlotStripe.slots
+    else:
+        fits = SlotStripe.reserved >= -delta
+    return update(SlotStripe).where(
+        tuple_(SlotStripe.region_identifier, SlotStripe.stripe).in_(picks),
+        SlotStripe.region_type == region_type,
+        SlotStripe.slot_time == slot_time,
+        fits
+    ).values(reserved=SlotStripe.reserved + delta).returning(SlotStripe.region_identifier)
+
+
+def _lock_stripes(region_type: RegionType, regions: list[str], slot_time: datetime):
+    return select(SlotStripe.id, SlotStripe.region_identifier, SlotStripe.slots, SlotStripe.reserved).where(
+        SlotStripe.region_identifier.in_(regions),
+        SlotStripe.region_type == region_type,
+        SlotStripe.slot_time == slot_time
+    ).order_by(SlotStripe.region_identifier, SlotStripe.stripe).with_for_update()
+
+
+def _adjust_stripe(stripe_id: uuid.UUID, delta: int):
+    return update(SlotStripe).where(SlotStripe.id == stripe_id).values(
+        reserved=SlotStripe.reserved + delta)
+
+
+def _spread(counts: Counter, rows, reserve: bool) -> tuple[list[tuple[uuid.UUID, int]], list[str]]:
+    """
+    Spreads each region's count over its locked stripes, roomiest first.
+    Returns the (stripe id, delta) changes and the regions it could not
+    cover in full.
+    """
+    by_region: dict[str, list] = {}
+    for stripe_id, region, slots, reserved in rows:
+        room = slots - reserved if reserve else reserved
+        by_region.setdefault(region, []).append((room, stripe_id))
+    changes, short = [], []
+    for region in sorted(counts):
+        needed = counts[region]
+        for room, stripe_id in sorted(by_region.get(region, []), key=lambda s: -s[0]):
+            if needed == 0 or room <= 0:
+                break
+            take = min(room, needed)
+            changes.append((stripe_id, take if reserve else -take))
+            needed -= take
+        if needed:
+            short.append(region)
+    return changes, short
+
+
+def _reserve_striped(db: Session, region_type: RegionType, counts: Counter, slot_time: datetime) -> None:
+    """
+    Reserves on striped counters. Each region first tries one random stripe
+    with a conditional UPDATE that locks only that row, so bookings through
+    a hot region mostly land on different rows. Regions whose stripe was
+    full fall back to locking all their stripes and spreading the count
+    over the ones with room; InsufficientCapacity is raised only when the
+    stripes together lack room, as with a single counter.
+    """
+    stripes = slot_stripes(region_type)
+    sync_stripes(db, region_type, sorted(counts), slot_time)
+    missed = []
+    for count, group in _group_by_count(counts).items():
+        updated = db.execute(
+            _probe_stripes(region_type, _pick_stripes(group, stripes), slot_time, count),
+            execution_options=_NO_SYNC
+        ).scalars().all()
+        missed.extend(sorted(set(group) - set(updated)))
+    if not missed:
+        return
+    missed_counts = Counter({region: counts[region] for region in missed})
+    rows = db.execute(_lock_stripes(region_type, sorted(missed), slot_time)).all()
+    changes, lacking = _spread(missed_counts, rows, reserve=True)
+    if lacking:
+        raise InsufficientCapacity(lacking)
+    for stripe_id, delta in changes:
+        db.execute(_adjust_stripe(stripe_id, delta), execution_options=_NO_SYNC)
+
+
+async def _reserve_striped_async(db: AsyncSession, region_type: RegionType, counts: Counter, slot_time: datetime) -> None:
+    stripes = slot_stripes(region_type)
+    await sync_stripes_async(db, region_type, sorted(counts), slot_time)
+    missed = []
+    for count, group in _group_by_count(counts).items():
+        updated = (await db.execute(
+            _probe_stripes(region_type, _pick_stripes(group, stripes), slot_time, count),
+            execution_options=_NO_SYNC
+        )).scalars().all()
+        missed.extend(sorted(set(group) - set(updated)))
+    if not missed:
+        return
+    missed_counts = Counter({region: counts[region] for region in missed})
+    rows = (await db.execute(_lock_stripes(region_type, sorted(missed), slot_time))).all()
+    changes, lacking = _spread(missed_counts, rows, reserve=True)
+    if lacking:
+        raise InsufficientCapacity(lacking)
+    for stripe_id, delta in changes:
+        await db.execute(_adjust_stripe(stripe_id, delta), execution_options=_NO_SYNC)
+
+
+def _release_striped(db: Session, region_type: RegionType, counts: Counter, slot_time: datetime) -> list[str]:
+    """
+    Releases on striped counters: a random stripe holding enough
+    reservations first, then whichever non-empty stripes remain. Returns the
+    regions that had a reservation to release.
+    """
+    stripes = slot_stripes(region_type)
+    sync_stripes(db, region_type, sorted(counts), slot_time)
+    released = []
+    for count, group in _group_by_count(counts).items():
+        released.extend(db.execute(
+            _probe_stripes(region_type, _pick_stripes(group, stripes), slot_time, -count),
+            execution_options=_NO_SYNC
+        ).scalars().all())
+    missed = sorted(set(counts) - set(released))
+    if missed:
+        rows = db.execute(_lock_stripes(region_type, missed, slot_time)).all()
+        changes, _ = _spread(Counter({region: counts[region] for region in missed}), rows, reserve=False)
+        for stripe_id, delta in changes:
+            db.execute(_adjust_stripe(stripe_id, delta), execution_options=_NO_SYNC)
+        released.extend(_regions_changed(rows, changes))
+    return released
+
+
+async def _release_striped_async(db: AsyncSession, region_type: RegionType, counts: Counter, slot_time: datetime) -> list[str]:
+    stripes = slot_stripes(region_type)
+    await sync_stripes_async(db, region_type, sorted(counts), slot_time)
+    released = []
+    for count, group in _group_by_count(counts).items():
+        released.extend((await db.execute(
+            _probe_stripes(region_type, _pick_stripes(group, stripes), slot_time, -count),
+            execution_options=_NO_SYNC
+        )).scalars().all())
+    missed = sorted(set(counts) - set(released))
+    if missed:
+        rows = (await db.execute(_lock_stripes(region_type, missed, slot_time))).all()
+        changes, _ = _spread(Counter({region: counts[region] for region in missed}), rows, reserve=False)
+        for stripe_id, delta in changes:
+            await db.execute(_adjust_stripe(stripe_id, delta), execution_options=_NO_SYNC)
+        released.extend(_regions_changed(rows, changes))
+    return released
+
+
+def _regions_changed(rows, changes: list[tuple[uuid.UUID, int]]) -> list[str]:
+    changed = {stripe_id for stripe_id, _ in changes}
+    return sorted({region for stripe_id, region, _, _ in rows if stripe_id in changed})
+
+
+def _remaining_capacity(region_type: RegionType, slot_time: datetime, regions: list[str] | None):
+    conditions = [Slot.region_type == region_type, Slot.slot_time == slot_time]
+    if regions is not None:
+        conditions.append(Slot.region_identifier.in_(regions))
+    # Summed over stripes even with K = 1: slots striped under an earlier K
+    # keep their stripes until their next reservation or release.
+    return _striped_capacity(region_type, slot_time, regions, conditions)
+
+
+def _striped_capacity(region_type: RegionType, slot_time: datetime, regions: list[str] | None, conditions: list):
+    """
+    (region, slots, reserved) summed over each region's stripes, or from the
+    Slot row for regions that have not been striped yet.
+    """
+    stripe_conditions = [SlotStripe.region_type == region_type, SlotStripe.slot_time == slot_time]
+    if regions is not None:
+        stripe_conditions.append(SlotStripe.region_identifier.in_(regions))
+    totals = select(
+        SlotStripe.region_identifier,
+        func.sum(SlotStripe.slots).label("slots"),
+        func.sum(SlotStripe.reserved).label("reserved")
+    ).where(*stripe_conditions).group_by(SlotStripe.region_identifier).subquery()
+    return select(
+        Slot.region_identifier,
+        cast(func.coalesce(totals.c.slots, Slot.slots), Integer),
+        cast(func.coalesce(totals.c.reserved, Slot.reserved), Integer)
+    ).outerjoin(totals, totals.c.region_identifier == Slot.region_identifier).where(*conditions)
+
+
+def _record_remaining(rows, slot_time: datetime) -> dict[str, int]:
+    remaining = {}
+    for region, slots, reserved in rows:
+        slot_capacity_cache.record(region, slot_time, slots, reserved)
+        remaining[region] = slots - reserved
+    return remaining
+
+
+def get_remaining_capacity(db: Session, region_type: RegionType, slot_time: datetime, regions: list[str] | None = None) -> dict[str, int]:
+    """
+    Remaining (slots - reserved) per region that already has a slot row at
+    slot_time, summed over stripes for striped region types. `regions`
+    limits the read to those regions.
+    """
+    rows = db.execute(_remaining_capacity(region_type, slot_time, regions)).all()
+    return _record_remaining(rows, slot_time)
+
+
+async def get_remaining_capacity_async(db: AsyncSession, region_type: RegionType, slot_time: datetime, regions: list[str] | None = None) -> dict[str, int]:
+    rows = (await db.execute(_remaining_capacity(region_type, slot_time, regions))).all()
+    return _record_remaining(rows, slot_time)
+
+
+def _replicate_geo(route_country_identifiers: list[str], route_continents: list[str], slot_time: datetime | None):
+    continents = sorted(set(route_continents))
+    current = func.coalesce(Slot.replicated_continents,
+                            cast(array([], type_=String), ARRAY(String)))
+    values = func.unnest(current.concat(cast(array(continents), ARRAY(String)))).table_valued("continent")
+    distinct = select(values.c.continent).distinct().subquery()
+    merged = select(func.array_agg(aggregate_order_by(distinct.c.continent, distinct.c.continent))).scalar_subquery()
+    conditions = [
+        Slot.region_identifier.in_(sorted(set(route_country_identifiers))),
+        Slot.region_type == RegionType.country,
+        not_(current.contains(continents)),
+    ]
+    if slot_time is not None:
+        conditions.append(Slot.slot_time == slot_time)
+    return update(Slot).where(*conditions).values(replicated_continents=merged)
+
+
+def replicate_geo(db: Session, route_country_identifiers: list[str], route_continents: list[str], slot_time: datetime | None = None):
+    """
+    Records that the slots of every country on the route are replicated to
+    each of route_continents, with a single UPDATE in the caller's
+    transaction. Rows that already list all continents are left untouched.
+    """
     logger.info(
         f"[slot_service] Simulating geo-replication for route spanning continents: {route_continents}")
-    for country in route_country_identifiers:
-        slot = db.query(Slot).filter(
-            Slot.region_identifier == country,
-            Slot.region_type == RegionType.country
-        ).first()
-        if slot:
-            current = slot.continent or ""
-            for continent in route_continents:
-                if continent not in current:
-                    current = (current + "," + continent).strip(",")
-            slot.continent = current
-            db.commit()
-    return
+    db.execute(_replicate_geo(route_country_identifiers, route_continents, slot_time),
+               execution_options=_NO_SYNC)
+
+
+async def replicate_geo_async(db: AsyncSession, route_country_identifiers: list[str], route_continents: list[str], slot_time: datetime | None = None):
+    logger.info(
+        f"[slot_service] Simulating geo-replication for route spanning continents: {route_continents}")
+    await db.execute(_replicate_geo(route_country_identifiers, route_continents, slot_time),
+                     execution_options=_NO_SYNC)
+
+
+def slots_replicated_to(continent: str, slot_time: datetime | None = None):
+    """
+    Select of the country slots replicated to a continent, served by the
+    inverted index on replicated_continents.
+    """
+    query = select(Slot).where(
+        Slot.replicated_continents.contains([continent]))
+    if slot_time is not None:
+        query = query.where(Slot.slot_time == slot_time)
+    return query
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import signal
+import tempfile
+import time
+from app.core.config import settings
+from app.logging_config import configure_logging, stop_logging
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after starting counts as crash-looping,
+# and its restart delay doubles up to MAX_RESTART_DELAY.
+MIN_UPTIME = 10.0
+MAX_RESTART_DELAY = 60.0
+
+
+def prepare_snapshot() -> str:
+    """
+    Makes sure GEODATA_SNAPSHOT names a readable snapshot, building one if
+    needed, so every worker maps the same file instead of loading geodata.
+    """
+    from app.domain.geodata import get_snapshot
+    from app.domain.geodata_snapshot import build_snapshot
+
+    path = settings.GEODATA_SNAPSHOT
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), "traffic-geodata.snap")
+        settings.GEODATA_SNAPSHOT = path
+    if not os.path.exists(path):
+        logger.info(f"[supervisor] Building geodata snapshot at {path}")
+        build_snapshot(path)
+    get_snapshot.cache_clear()
+    if get_snapshot() is None:
+        raise RuntimeError(f"Geodata snapshot {path} could not be loaded")
+    return path
+
+
+def run_worker(index: int) -> int:
+    """
+    Entry point of a forked worker: one consumer process with its own event
+    loop, publisher and database pools, and metrics on METRICS_PORT + index.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    settings.METRICS_PORT += index
+    try:
+        from app.main import main
+        asyncio.run(main())
+        return 0
+    except Exception as e:
+        logger.exception(f"[supervisor] Worker {index} failed: {e}")
+        return 1
+    finally:
+        stop_logging()
+
+
+class Supervisor:
+    """
+    Forks `workers` consumer processes on the same queue, restarts the ones
+    that exit while running and stops them all on SIGTERM or SIGINT.
+
+    Modules are imported in the child after fork, so sockets, pools, event
+    loops and threads are never shared. The geodata snapshot is mapped
+    before forking and its pages stay shared through the page cache.
+    """
+
+    def __init__(self, workers: int, restart_delay: float, shutdown_timeout: float):
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.shutdown_timeout = shutdown_timeout
+        self.pids: dict[int, int] = {}
+        self.started: dict[int, float] = {}
+        self.delays: dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(run_worker(index))
+        self.pids[pid] = index
+        self.started[index] = time.monotonic()
+        logger.info(f"[supervisor] Started worker {index} (pid {pid})")
+
+    def _signal(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info(
+                f"[supervisor] Received {signal.Signals(signum).name}, stopping workers")
+        self.stopping = True
+        self._forward(signal.SIGTERM)
+
+    def _forward(self, signum: int) -> None:
+        for pid in self.pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _restart_delay(self, index: int) -> float:
+        if time.monotonic() - self.started[index] >= MIN_UPTIME:
+            self.delays[index] = self.restart_delay
+        else:
+            self.delays[index] = min(
+                self.delays.get(index, self.restart_delay / 2) * 2, MAX_RESTART_DELAY)
+        return self.delays[index]
+
+    def _reap(self, block: bool) -> tuple[int, int] | None:
+        try:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return None
+        if pid == 0:
+            return None
+        return pid, os.waitstatus_to_exitcode(status)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._signal)
+        signal.signal(signal.SIGINT, self._signal)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        pending: dict[int, float] = {}
+        while not self.stopping:
+            reaped = self._reap(block=not pending)
+            if reaped is not None:
+                pid, code = reaped
+                index = self.pids.pop(pid)
+                if self.stopping:
+                    break
+                delay = self._restart_delay(index)
+                logger.error(
+                    f"[supervisor] Worker {index} (pid {pid}) exited with {code}, restarting in {delay:.1f}s")
+                pending[index] = time.monotonic() + delay
+                continue
+            now = time.monotonic()
+            for index, due in list(pending.items()):
+                if due <= now:
+                    del pending[index]
+                    self.spawn(index)
+            if pending:
+                time.sleep(min(0.2, max(min(pending.values()) - now, 0)))
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self._forward(signal.SIGTERM)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.pids and time.monotonic() < deadline:
+            reaped = self._reap(block=False)
+            if reaped is None:
+                time.sleep(0.1)
+                continue
+            pid, code = reaped
+            index = self.pids.pop(pid, None)
+            logger.info(f"[supervisor] Worker {index} (pid {pid}) exited with {code}")
+        if self.pids:
+            logger.warning(
+                f"[supervisor] Killing {len(self.pids)} workers still running after {self.shutdown_timeout}s")
+            self._forward(signal.SIGKILL)
+            while self._reap(block=True) is not None:
+                pass
+            self.pids.clear()
+
+
+def main() -> None:
+    configure_logging()
+    if settings.WORKERS <= 1:
+        from app.main import main as run_consumer
+        asyncio.run(run_consumer())
+        return
+    path = prepare_snapshot()
+    logger.info(
+        f"[supervisor] Starting {settings.WORKERS} workers sharing geodata from {path}")
+    Supervisor(settings.WORKERS, settings.WORKER_RESTART_DELAY,
+               settings.WORKER_SHUTDOWN_TIMEOUT).run()
+    stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Replays a synthetic stream of journey.booked / journey.canceled events
+through handle_journey_event and reports throughput, per-stage latency
+percentiles, transaction retries, conflicts and the rejection rate.
+
+The broker is replaced by an in-memory publisher and geocoding by a stub
+that answers from a precomputed table. The database is real: by default
+the harness creates a throwaway bench_<random> database on the local
+CockroachDB or PostgreSQL server at BENCH_SERVER_URL (or --server-url) and
+drops it afterwards, e.g.
+
+    cockroach start-single-node --insecure --store=type=mem,size=1GiB &
+    python -m benchmarks.load --events 2000 --mode both
+
+BENCH_DATABASE_URL (or --database-url) runs against an existing database
+instead. Its tables are dropped and recreated before every run, so its
+name must match BENCH_DATABASE_PATTERN (bench or bench_*).
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import asdict, fields
+from datetime import datetime, timezone
+import numpy as np
+from benchmarks.workload import WorkloadConfig
+
+logger = logging.getLogger("benchmarks.load")
+
+DEFAULT_SERVER_URL = "cockroachdb+psycopg://root@localhost:26257/defaultdb"
+BENCH_DATABASE_PATTERN = re.compile(r"bench(_[a-z0-9_]+)?")
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations per stage from wrapped callables, whether
+    they are coroutines or plain functions run in worker threads.
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage: str, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.add(stage, time.perf_counter() - start)
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def clear(self) -> None:
+        with self._lock:
+            self.samples.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        result = {}
+        for stage, samples in sorted(self.samples.items()):
+            ms = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            result[stage] = {"count": len(samples), "p50_ms": round(float(p50), 2),
+                             "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+        return result
+
+
+class InMemoryPublisher:
+    """
+    Stands in for EventPublisher: every publish is confirmed immediately and
+    recorded by routing key.
+    """
+
+    def __init__(self):
+        self.published: Counter = Counter()
+
+    async def connect(self):
+        pass
+
+    async def publish_event(self, message: dict, routing_key: str = "route.update") -> asyncio.Future:
+        self.published[routing_key] += 1
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    async def close(self):
+        pass
+
+
+# Operation labels app.db.transactions reports retries under.
+TRANSACTION_OPERATIONS = ("saga_reservation", "saga_reservation_group",
+                          "saga_cancel_route", "saga_release_slots")
+
+
+class ConflictCounter(logging.Handler):
+    """
+    Counts logged transaction conflicts (SQLSTATE 40001 restarts and lock
+    timeouts) wherever the service reports them.
+    """
+
+    MARKERS = ("40001", "restart transaction", "SerializationFailure",
+               "LockNotAvailable", "Could not lock slot")
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.conflicts = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if any(marker in message for marker in self.MARKERS):
+            self.conflicts += 1
+
+
+def install_stand_ins(timer: StageTimer, answers: dict) -> InMemoryPublisher:
+    from app.consumer import event_handler
+    from app.domain.geocode_batcher import geocode_batcher
+    from app.messaging.publisher import publisher
+    from app.services.dedup import deduplicator
+    from app.services.group_commit import group_committer
+
+    memory = InMemoryPublisher()
+    publisher.connect = memory.connect
+    publisher.publish_event = memory.publish_event
+    publisher.close = memory.close
+
+    fallback = geocode_batcher.resolve_points
+
+    async def stub_resolve_points(points):
+        results = [list(answers[point]) if point in answers else None for point in points]
+        missing = [point for point, result in zip(points, results) if result is None]
+        if missing:
+            resolved = iter(await fallback(missing))
+            results = [result if result is not None else next(resolved) for result in results]
+        return results
+    geocode_batcher.resolve_points = timer.wrap("geocode", stub_resolve_points)
+
+    for stage, name in (("plan", "plan_routes"),
+                        ("reserve", "saga_reservation"),
+                        ("reserve", "saga_reservation_async"),
+                        ("reject", "reject_journey"),
+                        ("reject", "reject_journey_async"),
+                        ("release", "_release_journey"),
+                        ("release", "_release_journey_async")):
+        setattr(event_handler, name, timer.wrap(
+            stage, getattr(event_handler, name)))
+    group_committer.reserve = timer.wrap("reserve", group_committer.reserve)
+    deduplicator.seen = timer.wrap("dedup", deduplicator.seen)
+    return memory
+
+
+def is_bench_database(url) -> bool:
+    from sqlalchemy.engine import make_url
+    return BENCH_DATABASE_PATTERN.fullmatch(make_url(url).database or "") is not None
+
+
+def reset_database() -> None:
+    from app.db.database import engine
+    from app.models.db_models import Base
+    if not is_bench_database(engine.url):
+        raise RuntimeError(
+            f"Refusing to drop the tables of database {engine.url.database!r}: "
+            f"only databases matching {BENCH_DATABASE_PATTERN.pattern} are reset")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def create_scratch_database(server_url: str) -> str:
+    """
+    Creates an empty bench_<random> database on the server and returns its URL.
+    """
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import make_url
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(server_url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as connection:
+            connection.execute(text(f"CREATE DATABASE {name}"))
+    finally:
+        admin.dispose()
+    return make_url(server_url).set(database=name).render_as_string(hide_password=False)
+
+
+def drop_scratch_database(server_url: str, database_url: str) -> None:
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.engine import make_url
+    name = make_url(database_url).database
+    if not is_bench_database(database_url):
+        raise RuntimeError(f"Refusing to drop database {name!r}")
+    admin = create_engine(server_url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as connection:
+            connection.execute(text(f"DROP DATABASE IF EXISTS {name}"))
+    finally:
+        admin.dispose()
+
+
+def seed_journeys(events: list[dict]) -> None:
+    """
+    Inserts the pending journeys the journey service would have created
+    before publishing their booked events.
+    """
+    from sqlalchemy import insert
+    from app.db.database import SessionLocal
+    from app.models.db_models import Journey, JourneyStatus
+    from app.models.events import const_events
+
+    rows = [{
+        "journey_id": uuid.UUID(event["journey_id"]),
+        "user_id": event["user_id"],
+        "origin_lat": event["origin_lat"],
+        "origin_lon": event["origin_lon"],
+        "destination_lat": event["destination_lat"],
+        "destination_lon": event["destination_lon"],
+        "vehicle_type": "car",
+        "scheduled_time": datetime.fromisoformat(event["scheduled_time"]).astimezone(timezone.utc).replace(tzinfo=None),
+        "status": JourneyStatus.pending,
+    } for event in events if event["event_type"] == const_events['journey.booked']]
+    with SessionLocal() as db:
+        for start in range(0, len(rows), 500):
+            db.execute(insert(Journey), rows[start:start + 500])
+        db.commit()
+
+
+async def replay(events: list[dict], timer: StageTimer) -> float:
+    from app.consumer.dispatcher import LaneDispatcher, partition_key
+    from app.consumer.event_handler import handle_journey_event
+    from app.core.config import settings
+    from app.models.events import decode_event
+    from app.services.dedup import deduplicator, event_key
+
+    dispatcher = LaneDispatcher(
+        settings.CONSUMER_LANES, settings.CONSUMER_LANE_QUEUE_SIZE)
+
+    def job(event, submitted: float):
+        async def run():
+            timer.add("queue", time.perf_counter() - submitted)
+            start = time.perf_counter()
+            if not settings.DEDUP_ENABLED:
+                await handle_journey_event(event)
+            elif not await deduplicator.seen(event):
+                await handle_journey_event(event, event_key(event))
+            timer.add(event.event_type, time.perf_counter() - start)
+        return run
+
+    bodies = [(json.dumps(payload).encode(), payload["event_type"]) for payload in events]
+    dispatcher.start()
+    start = time.perf_counter()
+    for body, routing_key in bodies:
+        submitted = time.perf_counter()
+        event = timer.wrap("decode", decode_event)(body, routing_key)
+        await dispatcher.submit(partition_key(event), job(event, submitted))
+    await dispatcher.stop()
+    return time.perf_counter() - start
+
+
+async def drain_outbox() -> None:
+    from app.core.config import settings
+    from app.messaging.outbox_relay import outbox_relay
+    if settings.OUTBOX_ENABLED:
+        while await outbox_relay.drain_once():
+            pass
+
+
+async def run_mode(mode: str, events: list[dict], timer: StageTimer, memory: InMemoryPublisher) -> dict:
+    from app.core.config import settings
+    from app.core.metrics import RETRIES
+    from app.services.dedup import deduplicator
+    from app.services.slot_capacity_cache import slot_capacity_cache
+    from app.models.events import const_events
+
+    settings.DB_ASYNC = mode == "async"
+    await asyncio.to_thread(reset_database)
+    await asyncio.to_thread(seed_journeys, events)
+    slot_capacity_cache.clear()
+    deduplicator.clear()
+
+    timer.clear()
+    memory.published.clear()
+    txn_retries = [RETRIES.labels(operation) for operation in TRANSACTION_OPERATIONS]
+    retries_before = sum(child.value for child in txn_retries)
+    conflicts = ConflictCounter()
+    logging.getLogger().addHandler(conflicts)
+    try:
+        elapsed = await replay(events, timer)
+        await drain_outbox()
+    finally:
+        logging.getLogger().removeHandler(conflicts)
+
+    approved = memory.published[const_events['journey.approved']]
+    rejected = memory.published[const_events['journey.rejected']]
+    decided = approved + rejected
+    return {
+        "mode": mode,
+        "events": len(events),
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(len(events) / elapsed, 1) if elapsed else None,
+        "approved": approved,
+        "rejected": rejected,
+        "rejection_rate": round(rejected / decided, 4) if decided else None,
+        "txn_retries": int(sum(child.value for child in txn_retries) - retries_before),
+        "conflicts": conflicts.conflicts,
+        "slot_cache": slot_capacity_cache.stats(),
+        "stages": timer.summary(),
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"\n== {result['mode']} path: {result['events']} events in {result['seconds']}s "
+          f"({result['events_per_second']} events/s)")
+    print(f"   approved {result['approved']}, rejected {result['rejected']}, "
+          f"rejection rate {result['rejection_rate']}")
+    print(f"   transaction retries {result['txn_retries']}, conflicts {result['conflicts']}, "
+          f"slot cache {result['slot_cache']}")
+    print(f"   {'stage':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in result["stages"].items():
+        print(f"   {stage:<22}{row['count']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    defaults = WorkloadConfig()
+    for field in fields(WorkloadConfig):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(getattr(defaults, field.name)),
+                            default=getattr(defaults, field.name))
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--server-url", default=os.getenv("BENCH_SERVER_URL", DEFAULT_SERVER_URL),
+                        help="server to create the throwaway benchmark database on")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="existing benchmark database (named bench or bench_*) to use instead")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON instead of a table")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    scratch = args.database_url is None
+    if scratch:
+        args.database_url = create_scratch_database(args.server_url)
+    elif not is_bench_database(args.database_url):
+        raise SystemExit(
+            f"--database-url must name a benchmark database matching {BENCH_DATABASE_PATTERN.pattern}; "
+            "its tables are dropped before every run")
+    try:
+        run(args)
+    finally:
+        if scratch:
+            drop_scratch_database(args.server_url, args.database_url)
+
+
+def run(args: argparse.Namespace) -> None:
+    # Settings are read at import time, so configure them before importing app.
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ASYNC_DATABASE_URL"] = args.database_url
+    os.environ.setdefault("GEOCODER_BACKEND", "offline")
+    logging.basicConfig(level=os.getenv("BENCH_LOG_LEVEL", "WARNING"))
+
+    from benchmarks.workload import city_pool, generate_events, geocoded_places
+
+    config = WorkloadConfig(**{f.name: getattr(args, f.name) for f in fields(WorkloadConfig)})
+    places = city_pool(config.cities)
+    answers = geocoded_places(places)
+    events = generate_events(config, places)
+    timer = StageTimer()
+    memory = install_stand_ins(timer, answers)
+
+    async def run_all() -> list[dict]:
+        from app.db.database import async_engine, engine
+        modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+        try:
+            return [await run_mode(mode, events, timer, memory) for mode in modes]
+        finally:
+            await async_engine.dispose()
+            engine.dispose()
+
+    results = asyncio.run(run_all())
+    if args.json:
+        print(json.dumps({"workload": asdict(config), "results": results}, indent=2))
+    else:
+        for result in results:
+            print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+# app modules are imported inside the functions: importing any of them reads
+# app.core.config, and benchmarks.load configures the environment only after
+# importing WorkloadConfig to parse its arguments.
+
+
+@dataclass
+class WorkloadConfig:
+    events: int = 2000
+    # Zipf exponent of the origin distribution over the city pool (0 = uniform).
+    skew: float = 1.1
+    cities: int = 400
+    # Share of bookings that start in one of the `hot_regions` top cities.
+    hot_share: float = 0.2
+    hot_regions: int = 5
+    # Share of bookings that are canceled later in the stream.
+    cancel_ratio: float = 0.1
+    # Share of bookings whose destination is in the origin's country.
+    domestic_ratio: float = 0.5
+    # Distinct scheduled times the bookings are spread over.
+    slot_times: int = 4
+    seed: int = 7
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    country_code: str
+    latitude: float
+    longitude: float
+
+
+def city_pool(size: int) -> list[Place]:
+    """
+    The `size` most populous cities, most populous first.
+    """
+    from app.domain.route_generator import get_city_index
+
+    records = []
+    for country_code, cities in get_city_index().by_country.items():
+        for i, name in enumerate(cities.names):
+            records.append((int(cities.populations[i]), Place(
+                name, country_code, float(cities.latitudes[i]), float(cities.longitudes[i]))))
+    records.sort(key=lambda r: -r[0])
+    return [place for _, place in records[:size]]
+
+
+def geocoded_places(places: list[Place]) -> dict[tuple[float, float], list[str]]:
+    """
+    Offline geocoder answers for the pool, used by the stub geocoder so the
+    replay measures the service rather than the geocoding backend.
+    """
+    from app.domain import reverse_geocoder
+
+    geocoder = reverse_geocoder.get_reverse_geocoder()
+    return {(p.latitude, p.longitude): geocoder.lookup(p.latitude, p.longitude) for p in places}
+
+
+def generate_events(config: WorkloadConfig, places: list[Place]) -> list[dict]:
+    """
+    A replayable stream of booked and canceled event payloads, as the journey
+    service would publish them. Cancellations are interleaved some time after
+    the booking they refer to.
+    """
+    from app.models.events import JourneyBookedEvent, JourneyCanceledEvent
+
+    rng = random.Random(config.seed)
+    weights = [1.0 / (rank + 1) ** config.skew for rank in range(len(places))]
+    hot = places[:config.hot_regions]
+    by_country: dict[str, list[Place]] = {}
+    for place in places:
+        by_country.setdefault(place.country_code, []).append(place)
+
+    base = (datetime.now(timezone.utc) + timedelta(days=1)).replace(
+        minute=0, second=0, microsecond=0)
+    times = [base + timedelta(hours=i) for i in range(config.slot_times)]
+
+    bookings = max(int(config.events / (1 + config.cancel_ratio)), 1)
+    stream: list[dict] = []
+    pending_cancels: list[tuple[int, dict]] = []
+    for i in range(bookings):
+        if hot and rng.random() < config.hot_share:
+            origin = rng.choice(hot)
+        else:
+            origin = rng.choices(places, weights)[0]
+        domestic = [p for p in by_country[origin.country_code] if p != origin]
+        if domestic and rng.random() < config.domestic_ratio:
+            destination = rng.choice(domestic)
+        else:
+            destination = rng.choices(places, weights)[0]
+        now = datetime.now(timezone.utc)
+        booked = JourneyBookedEvent(
+            journey_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            user_id=f"bench-{rng.randrange(1000)}",
+            route=[],
+            origin_lat=origin.latitude,
+            origin_lon=origin.longitude,
+            destination_lat=destination.latitude,
+            destination_lon=destination.longitude,
+            scheduled_time=rng.choice(times),
+            timestamp=now,
+        )
+        stream.append(booked.model_dump(mode="json"))
+        if rng.random() < config.cancel_ratio:
+            canceled = JourneyCanceledEvent(
+                journey_id=booked.journey_id,
+                user_id=booked.user_id,
+                scheduled_time=booked.scheduled_time,
+                timestamp=now + timedelta(seconds=1),
+            )
+            pending_cancels.append(
+                (i + rng.randint(5, 50), canceled.model_dump(mode="json")))
+        while pending_cancels and pending_cancels[0][0] <= i:
+            stream.append(pending_cancels.pop(0)[1])
+        pending_cancels.sort(key=lambda c: c[0])
+    stream.extend(event for _, event in pending_cancels)
+    return stream
@@ -0,0 +1,74 @@
+-- Schema changes the service needs on top of the original journeys, slots and
+-- routes tables. Every statement is idempotent and runs on CockroachDB and
+-- PostgreSQL. Apply it before deploying the new service version, e.g.
+--
+--     cockroach sql --insecure --database=journey_db < migrations/001_slot_metadata_outbox_dedup.sql
+--
+-- Without these changes every route insert and slot reservation fails
+-- with an undefined column error.
+
+-- Route metadata, so cancellations release slots with one statement.
+-- Existing routes keep NULLs and are cancelled by the legacy path.
+ALTER TABLE routes ADD COLUMN IF NOT EXISTS region_type regiontype;
+ALTER TABLE routes ADD COLUMN IF NOT EXISTS slot_time TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE routes ADD COLUMN IF NOT EXISTS continents JSON;
+
+-- Continents a country slot is replicated to, with an inverted index for
+-- "replicated to continent X" lookups.
+ALTER TABLE slots ADD COLUMN IF NOT EXISTS replicated_continents VARCHAR[];
+CREATE INDEX IF NOT EXISTS ix_slots_replicated_continents
+    ON slots USING gin (replicated_continents);
+
+-- Transactional outbox for approved/rejected events.
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id UUID NOT NULL,
+    routing_key VARCHAR NOT NULL,
+    payload JSON NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_events_created_at ON outbox_events (created_at);
+-- Lease of the relay publishing a row, so no transaction stays open while
+-- it waits for broker confirms.
+ALTER TABLE outbox_events ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMP WITHOUT TIME ZONE;
+
+-- Events whose outcome was committed, for redelivery deduplication.
+CREATE TABLE IF NOT EXISTS processed_events (
+    id UUID NOT NULL,
+    journey_id UUID NOT NULL,
+    event_type VARCHAR NOT NULL,
+    event_timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    processed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT uix_processed_event UNIQUE (journey_id, event_type, event_timestamp)
+);
+CREATE INDEX IF NOT EXISTS ix_processed_events_processed_at ON processed_events (processed_at);
+
+-- Striped slot counters (SLOT_STRIPES).
+CREATE TABLE IF NOT EXISTS slot_stripes (
+    id UUID NOT NULL,
+    region_type regiontype NOT NULL,
+    region_identifier VARCHAR NOT NULL,
+    slot_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    stripe INTEGER NOT NULL,
+    slots INTEGER NOT NULL,
+    reserved INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT uix_stripe_region_time UNIQUE (region_identifier, slot_time, stripe)
+);
+-- How many stripes hold a slot's counters (NULL: the slot row itself).
+ALTER TABLE slots ADD COLUMN IF NOT EXISTS stripes INTEGER;
+UPDATE slots SET stripes = (
+    SELECT count(*) FROM slot_stripes
+    WHERE slot_stripes.region_identifier = slots.region_identifier
+      AND slot_stripes.slot_time = slots.slot_time
+) WHERE stripes IS NULL AND EXISTS (
+    SELECT 1 FROM slot_stripes
+    WHERE slot_stripes.region_identifier = slots.region_identifier
+      AND slot_stripes.slot_time = slots.slot_time
+);
+
+-- Country slots created on booking before their continent was derived
+-- from the country code are stored as 'Unknown'; fix them with
+--
+--     python -m app.services.slot_provisioning --backfill-continents
@@ -0,0 +1,72 @@
+import os
+
+# app.core.config reads the URL at import; database tests run against
+# TEST_DATABASE_URL, which must name a bench database (see benchmarks/load.py).
+os.environ.setdefault("DATABASE_URL", os.getenv(
+    "TEST_DATABASE_URL", "cockroachdb+psycopg://root@localhost:26257/bench"))
+
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+from benchmarks.load import BENCH_DATABASE_PATTERN, is_bench_database
+from app.models.db_models import Base, RegionType, Slot, SlotStripe
+from app.services.slot_capacity_cache import slot_capacity_cache
+from app.services.slot_service import get_remaining_capacity
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    if not is_bench_database(url):
+        pytest.skip(f"TEST_DATABASE_URL must name a database matching {BENCH_DATABASE_PATTERN.pattern}")
+    engine = create_engine(url, isolation_level="SERIALIZABLE")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    slot_capacity_cache.clear()
+    with Session(db_engine) as session:
+        yield session
+        session.rollback()
+        session.execute(delete(SlotStripe))
+        session.execute(delete(Slot))
+        session.commit()
+
+
+SLOT_TIME = datetime(2030, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def add_slots(db):
+    """
+    Creates country slots at SLOT_TIME from {region: (slots, reserved)}.
+    """
+    def add(capacities: dict[str, tuple[int, int]]) -> None:
+        for region, (slots, reserved) in capacities.items():
+            db.add(Slot(region_type=RegionType.country, region_identifier=region,
+                        slot_time=SLOT_TIME, slots=slots, reserved=reserved, continent="Europe"))
+        db.commit()
+    return add
+
+
+@pytest.fixture
+def slot_time() -> datetime:
+    return SLOT_TIME
+
+
+@pytest.fixture
+def remaining(db):
+    """
+    Remaining country capacity at SLOT_TIME per region, as bookings see it.
+    """
+    def read(regions: list[str]) -> dict[str, int]:
+        return get_remaining_capacity(db, RegionType.country, SLOT_TIME, regions)
+    return read
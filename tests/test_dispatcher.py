@@ -0,0 +1,82 @@
+import asyncio
+import random
+from app.consumer.dispatcher import LaneDispatcher
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_same_key_runs_in_submission_order():
+    async def scenario():
+        dispatcher = LaneDispatcher(lanes=4, queue_size=100)
+        dispatcher.start()
+        seen: dict[str, list[int]] = {}
+
+        def job(key: str, n: int):
+            async def run():
+                # Later jobs would finish first if a key's jobs overlapped.
+                await asyncio.sleep(random.uniform(0, 0.002))
+                seen.setdefault(key, []).append(n)
+            return run
+
+        for n in range(30):
+            for key in ("a", "b", "c", "d", "e"):
+                await dispatcher.submit(key, job(key, n))
+        await dispatcher.stop()
+        return seen
+
+    seen = _run(scenario())
+    assert seen == {key: list(range(30)) for key in "abcde"}
+
+
+def test_different_lanes_run_concurrently():
+    async def scenario():
+        dispatcher = LaneDispatcher(lanes=8, queue_size=10)
+        first = "k0"
+        second = next(f"k{i}" for i in range(1, 100)
+                      if dispatcher.lane_for(f"k{i}") != dispatcher.lane_for(first))
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def blocker():
+            started.set()
+            await release.wait()
+
+        async def unblocker():
+            release.set()
+
+        dispatcher.start()
+        await dispatcher.submit(first, blocker)
+        await started.wait()
+        await dispatcher.submit(second, unblocker)
+        await asyncio.wait_for(dispatcher.stop(), timeout=1)
+
+    _run(scenario())
+
+
+def test_failed_job_does_not_stop_its_lane():
+    async def scenario():
+        dispatcher = LaneDispatcher(lanes=1, queue_size=10)
+        dispatcher.start()
+        done = []
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        async def succeeding():
+            done.append(True)
+
+        await dispatcher.submit("a", failing)
+        await dispatcher.submit("a", succeeding)
+        await dispatcher.stop()
+        return done
+
+    assert _run(scenario()) == [True]
+
+
+def test_lane_for_is_stable():
+    dispatcher = LaneDispatcher(lanes=16, queue_size=1)
+    assert all(dispatcher.lane_for("FR|2030-01-01T09:00:00") == dispatcher.lane_for("FR|2030-01-01T09:00:00")
+               for _ in range(10))
+    assert {dispatcher.lane_for(f"key-{i}") for i in range(500)} == set(range(16))
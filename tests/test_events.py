@@ -0,0 +1,64 @@
+import json
+import pytest
+from pydantic import ValidationError
+from app.models.events import JourneyBookedEvent, JourneyCanceledEvent, UnknownEventType, const_events, decode_event
+
+BOOKED = const_events["journey.booked"]
+CANCELED = const_events["journey.canceled"]
+APPROVED = const_events["journey.approved"]
+
+_BOOKED_BODY = {
+    "event_type": BOOKED,
+    "journey_id": "6f1c1c6e-0f2a-4a43-9d1e-7a4c2f0b9c11",
+    "user_id": "user-1",
+    "route": ["Lisbon", "Porto"],
+    "origin_lat": 38.72,
+    "origin_lon": -9.14,
+    "destination_lat": 41.15,
+    "destination_lon": -8.61,
+    "scheduled_time": "2030-01-01T09:00:00Z",
+    "timestamp": "2029-12-31T09:00:00Z",
+}
+_CANCELED_BODY = {
+    "event_type": CANCELED,
+    "journey_id": "6f1c1c6e-0f2a-4a43-9d1e-7a4c2f0b9c11",
+    "user_id": "user-1",
+    "scheduled_time": "2030-01-01T09:00:00Z",
+    "timestamp": "2029-12-31T10:00:00Z",
+}
+
+
+def _body(base: dict, **changes) -> bytes:
+    body = {**base, **changes}
+    return json.dumps({key: value for key, value in body.items() if value is not None}).encode()
+
+
+@pytest.mark.parametrize("body, routing_key, expected", [
+    (_body(_BOOKED_BODY), BOOKED, JourneyBookedEvent),
+    (_body(_CANCELED_BODY), CANCELED, JourneyCanceledEvent),
+    # The payload's event_type wins over the routing key.
+    (_body(_CANCELED_BODY), BOOKED, JourneyCanceledEvent),
+    (_body(_BOOKED_BODY), CANCELED, JourneyBookedEvent),
+    (_body(_BOOKED_BODY), "journey.unrouted", JourneyBookedEvent),
+    # Without an event_type the routing key decides.
+    (_body(_BOOKED_BODY, event_type=None), BOOKED, JourneyBookedEvent),
+])
+def test_decode_event_accepts(body, routing_key, expected):
+    event = decode_event(body, routing_key)
+    assert type(event) is expected
+    assert str(event.journey_id) == _BOOKED_BODY["journey_id"]
+
+
+@pytest.mark.parametrize("body, routing_key, error", [
+    (_body(_BOOKED_BODY, event_type=APPROVED), BOOKED, UnknownEventType),
+    (_body(_CANCELED_BODY, event_type=APPROVED), "journey.unrouted", UnknownEventType),
+    (_body(_BOOKED_BODY, origin_lat=None), BOOKED, ValidationError),
+    # A body that declares a type must validate as that type.
+    (_body(_CANCELED_BODY, event_type=BOOKED), CANCELED, ValidationError),
+    (_body(_BOOKED_BODY, scheduled_time="tomorrow"), BOOKED, ValidationError),
+    (_body(_BOOKED_BODY, event_type=None), "journey.unrouted", ValidationError),
+    (b"not json", BOOKED, ValidationError),
+])
+def test_decode_event_rejects(body, routing_key, error):
+    with pytest.raises(error):
+        decode_event(body, routing_key)
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from app.domain.geodata import great_circle_km, to_unit_vectors
+from app.domain.route_engine import RouteGraph
+
+# A row of nodes along the equator with a parallel row one degree north.
+_NODES = {"A": (0, 0), "B": (0, 1), "C": (0, 2), "D": (0, 3), "E": (1, 1), "F": (1, 2)}
+_EDGES = [("A", "B"), ("B", "C"), ("C", "D"), ("A", "E"), ("E", "F"), ("F", "D"),
+          ("B", "E"), ("B", "F"), ("E", "C"), ("C", "F")]
+
+
+def _graph(hop_penalty: float = 10.0) -> RouteGraph:
+    labels = list(_NODES)
+    points = to_unit_vectors([lat for lat, _ in _NODES.values()], [lon for _, lon in _NODES.values()])
+    edges = [dict() for _ in labels]
+    for u, v in _EDGES:
+        i, j = labels.index(u), labels.index(v)
+        edges[i][j] = edges[j][i] = float(great_circle_km(points[i], points[j]))
+    return RouteGraph(labels, points, edges, hop_penalty)
+
+
+def _unit(node: int) -> float:
+    return 1.0
+
+
+def _all_paths(graph: RouteGraph, source: int, target: int, multiplier) -> list[tuple[float, list[int]]]:
+    paths = []
+
+    def walk(path: list[int]) -> None:
+        if path[-1] == target:
+            paths.append((graph.path_cost(path, multiplier), path))
+            return
+        for neighbour in graph.edges[path[-1]]:
+            if neighbour not in path and (neighbour == target or multiplier(neighbour) is not None):
+                walk(path + [neighbour])
+
+    walk([source])
+    return sorted(paths)
+
+
+def _labels(graph: RouteGraph, paths: list[list[int]]) -> list[str]:
+    return ["".join(graph.labels[node] for node in path) for path in paths]
+
+
+def test_shortest_path_is_first():
+    graph = _graph()
+    cost, path = graph.shortest_path(graph.index["A"], graph.index["D"], _unit)
+    assert _labels(graph, [path]) == ["ABCD"]
+    assert cost == pytest.approx(graph.path_cost(path, _unit))
+    assert _labels(graph, graph.k_shortest_paths(graph.index["A"], graph.index["D"], 1, _unit)) == ["ABCD"]
+
+
+@pytest.mark.parametrize("k", [2, 4, 8])
+def test_k_shortest_paths_match_brute_force(k):
+    graph = _graph()
+    source, target = graph.index["A"], graph.index["D"]
+    paths = graph.k_shortest_paths(source, target, k, _unit)
+    expected = _all_paths(graph, source, target, _unit)[:k]
+    assert len(paths) == len(expected)
+    assert len({tuple(path) for path in paths}) == len(paths)
+    assert all(len(set(path)) == len(path) for path in paths)
+    costs = [graph.path_cost(path, _unit) for path in paths]
+    assert costs == sorted(costs)
+    assert costs == pytest.approx([cost for cost, _ in expected])
+
+
+def test_k_shortest_paths_returns_every_path_when_k_exceeds_them():
+    graph = _graph()
+    source, target = graph.index["A"], graph.index["D"]
+    assert len(graph.k_shortest_paths(source, target, 100, _unit)) == len(_all_paths(graph, source, target, _unit))
+
+
+@pytest.mark.parametrize("max_hops", [2, 3, 4])
+def test_max_hops_caps_path_length(max_hops):
+    graph = _graph()
+    source, target = graph.index["A"], graph.index["D"]
+    paths = graph.k_shortest_paths(source, target, 20, _unit, max_hops=max_hops)
+    expected = [path for _, path in _all_paths(graph, source, target, _unit) if len(path) - 1 <= max_hops]
+    assert sorted(map(tuple, paths)) == sorted(map(tuple, expected))
+
+
+def test_avoided_nodes_are_never_entered():
+    graph = _graph()
+    avoided = graph.index["B"]
+
+    def multiplier(node: int) -> float | None:
+        return None if node == avoided else 1.0
+
+    source, target = graph.index["A"], graph.index["D"]
+    paths = graph.k_shortest_paths(source, target, 10, multiplier)
+    assert paths
+    assert all(avoided not in path for path in paths)
+    assert sorted(map(tuple, paths)) == sorted(tuple(path) for _, path in _all_paths(graph, source, target, multiplier))
+
+
+def test_capacity_multiplier_steers_around_busy_nodes():
+    graph = _graph(hop_penalty=0)
+    busy = graph.index["C"]
+
+    def multiplier(node: int) -> float:
+        return 10.0 if node == busy else 1.0
+
+    paths = graph.k_shortest_paths(graph.index["A"], graph.index["D"], 1, multiplier)
+    assert busy not in paths[0]
+
+
+def test_unreachable_target_has_no_paths():
+    graph = _graph()
+    target = graph.index["D"]
+    assert graph.k_shortest_paths(graph.index["A"], target, 3, lambda node: None if node != target else 1.0) == []
+
+
+def test_with_endpoints_leaves_the_graph_untouched():
+    graph = _graph()
+    edges = [dict(node_edges) for node_edges in graph.edges]
+    extended = graph.with_endpoints([("G", to_unit_vectors(0.5, 3.5))], 2)
+    assert graph.edges == edges and len(graph.labels) == 6
+    assert set(extended.edges[extended.index["G"]]) == {graph.index["D"], graph.index["F"]}
+    paths = extended.k_shortest_paths(extended.index["A"], extended.index["G"], 2, _unit)
+    assert _labels(extended, paths[:1]) == ["ABCDG"]
+    assert np.array_equal(extended.points[:6], graph.points)
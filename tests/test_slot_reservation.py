@@ -0,0 +1,74 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.models.db_models import RegionType
+from app.services.slot_service import InsufficientCapacity, release_slots_bulk, reserve_slots_bulk, reserve_slots_bulk_async
+
+
+def test_reserve_takes_one_slot_per_occurrence(db, add_slots, remaining, slot_time):
+    add_slots({"FR": (3, 0), "DE": (3, 1)})
+    reserve_slots_bulk(db, RegionType.country, ["FR", "DE", "FR"], slot_time)
+    db.commit()
+    assert remaining(["FR", "DE"]) == {"FR": 1, "DE": 1}
+
+
+def test_reserve_creates_missing_slots(db, remaining, slot_time):
+    reserve_slots_bulk(db, RegionType.country, ["PT"], slot_time, {"PT": "Europe"})
+    db.commit()
+    assert set(remaining(["PT"])) == {"PT"}
+
+
+def test_reserve_reports_every_full_region_and_reserves_nothing(db, add_slots, remaining, slot_time):
+    add_slots({"FR": (2, 0), "DE": (1, 1), "ES": (1, 0)})
+    with pytest.raises(InsufficientCapacity) as error:
+        reserve_slots_bulk(db, RegionType.country, ["FR", "DE", "ES", "ES"], slot_time)
+    assert sorted(error.value.regions) == ["DE", "ES"]
+    db.rollback()
+    assert remaining(["FR", "DE", "ES"]) == {"FR": 2, "DE": 0, "ES": 1}
+
+
+def test_reserve_until_exhausted(db, add_slots, remaining, slot_time):
+    add_slots({"FR": (2, 0)})
+    for _ in range(2):
+        reserve_slots_bulk(db, RegionType.country, ["FR"], slot_time)
+        db.commit()
+    with pytest.raises(InsufficientCapacity):
+        reserve_slots_bulk(db, RegionType.country, ["FR"], slot_time)
+    db.rollback()
+    assert remaining(["FR"]) == {"FR": 0}
+
+
+def test_release_returns_regions_that_had_a_reservation(db, add_slots, remaining, slot_time):
+    add_slots({"FR": (3, 2), "DE": (3, 0)})
+    released = release_slots_bulk(db, RegionType.country, ["FR", "FR", "DE", "IT"], slot_time)
+    db.commit()
+    assert released == ["FR"]
+    assert remaining(["FR", "DE"]) == {"FR": 3, "DE": 3}
+
+
+def test_release_never_goes_below_zero(db, add_slots, remaining, slot_time):
+    add_slots({"FR": (3, 1)})
+    assert release_slots_bulk(db, RegionType.country, ["FR", "FR", "FR"], slot_time) == ["FR"]
+    db.commit()
+    assert remaining(["FR"]) == {"FR": 3}
+
+
+def test_async_reserve_matches_sync(db, add_slots, remaining, slot_time):
+    add_slots({"FR": (1, 0), "DE": (1, 1)})
+
+    async def reserve(regions: list[str]) -> None:
+        engine = create_async_engine(os.environ["TEST_DATABASE_URL"], isolation_level="SERIALIZABLE")
+        try:
+            async with AsyncSession(engine) as session:
+                async with session.begin():
+                    await reserve_slots_bulk_async(session, RegionType.country, regions, slot_time)
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(InsufficientCapacity) as error:
+        asyncio.run(reserve(["FR", "DE"]))
+    assert error.value.regions == ["DE"]
+    asyncio.run(reserve(["FR"]))
+    db.rollback()
+    assert remaining(["FR", "DE"]) == {"FR": 0, "DE": 0}
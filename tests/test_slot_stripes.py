@@ -0,0 +1,94 @@
+from collections import Counter
+import uuid
+import pytest
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.models.db_models import RegionType, Slot, SlotStripe
+from app.services.slot_service import (InsufficientCapacity, _spread, release_slots_bulk,
+                                       reserve_slots_bulk, sync_stripes)
+
+
+def _stripes(db, region: str) -> list[tuple[int, int]]:
+    return db.execute(select(SlotStripe.slots, SlotStripe.reserved).where(
+        SlotStripe.region_identifier == region).order_by(SlotStripe.stripe)).all()
+
+
+def _slot(db, region: str) -> Slot:
+    return db.execute(select(Slot).where(Slot.region_identifier == region)).scalar_one()
+
+
+def test_spread_fills_roomiest_stripes_first():
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    rows = [(a, "FR", 5, 4), (b, "FR", 5, 1), (c, "FR", 5, 3)]
+    changes, short = _spread(Counter({"FR": 5}), rows, reserve=True)
+    assert changes == [(b, 4), (c, 1)]
+    assert short == []
+    changes, short = _spread(Counter({"FR": 8}), rows, reserve=True)
+    assert sum(delta for _, delta in changes) == 7
+    assert short == ["FR"]
+
+
+def test_spread_releases_from_stripes_holding_reservations():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    changes, short = _spread(Counter({"FR": 3}), [(a, "FR", 5, 0), (b, "FR", 5, 2)], reserve=False)
+    assert changes == [(b, -2)]
+    assert short == ["FR"]
+
+
+def test_striping_splits_existing_counters(db, add_slots, remaining, slot_time, monkeypatch):
+    add_slots({"FR": (10, 3)})
+    monkeypatch.setattr(settings, "SLOT_STRIPES", "country=4")
+    sync_stripes(db, RegionType.country, ["FR"], slot_time)
+    db.commit()
+    assert _stripes(db, "FR") == [(3, 1), (3, 1), (2, 1), (2, 0)]
+    assert _slot(db, "FR").stripes == 4
+    assert remaining(["FR"]) == {"FR": 7}
+
+
+def test_striped_reservations_use_all_capacity(db, add_slots, remaining, slot_time, monkeypatch):
+    add_slots({"FR": (10, 3), "DE": (2, 0)})
+    monkeypatch.setattr(settings, "SLOT_STRIPES", "country=4")
+    for _ in range(7):
+        reserve_slots_bulk(db, RegionType.country, ["FR"], slot_time)
+        db.commit()
+    with pytest.raises(InsufficientCapacity) as error:
+        reserve_slots_bulk(db, RegionType.country, ["DE", "FR"], slot_time)
+    assert error.value.regions == ["FR"]
+    db.rollback()
+    assert remaining(["FR", "DE"]) == {"FR": 0, "DE": 2}
+    assert sum(reserved for _, reserved in _stripes(db, "FR")) == 10
+
+
+def test_stripe_count_changes_keep_totals(db, add_slots, remaining, slot_time, monkeypatch):
+    add_slots({"FR": (10, 0)})
+    expected = 10
+    for stripes, reservations, releases in [("4", 3, 0), ("8", 2, 1), ("2", 1, 0), ("1", 1, 2), ("3", 4, 0)]:
+        monkeypatch.setattr(settings, "SLOT_STRIPES", f"country={stripes}")
+        for _ in range(reservations):
+            reserve_slots_bulk(db, RegionType.country, ["FR"], slot_time)
+            db.commit()
+        for _ in range(releases):
+            assert release_slots_bulk(db, RegionType.country, ["FR"], slot_time) == ["FR"]
+            db.commit()
+        expected += releases - reservations
+        assert remaining(["FR"]) == {"FR": expected}
+        if stripes == "1":
+            assert _stripes(db, "FR") == []
+            assert (_slot(db, "FR").slots, _slot(db, "FR").reserved) == (10, 10 - expected)
+            assert _slot(db, "FR").stripes is None
+        else:
+            assert len(_stripes(db, "FR")) == int(stripes)
+            assert db.execute(select(func.sum(SlotStripe.slots))).scalar_one() == 10
+
+
+def test_unstriped_release_folds_stale_stripes(db, add_slots, remaining, slot_time, monkeypatch):
+    add_slots({"FR": (4, 0)})
+    monkeypatch.setattr(settings, "SLOT_STRIPES", "country=2")
+    reserve_slots_bulk(db, RegionType.country, ["FR", "FR"], slot_time)
+    db.commit()
+    monkeypatch.setattr(settings, "SLOT_STRIPES", "")
+    assert release_slots_bulk(db, RegionType.country, ["FR"], slot_time) == ["FR"]
+    db.commit()
+    assert _stripes(db, "FR") == []
+    assert (_slot(db, "FR").reserved, _slot(db, "FR").stripes) == (1, None)
+    assert remaining(["FR"]) == {"FR": 3}